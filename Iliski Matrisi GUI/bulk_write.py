@@ -0,0 +1,29 @@
+# Tek executemany çağrısında gönderilecek en fazla satır
+BULK_BATCH_SIZE = 1000
+
+
+def bulk_insert(cursor, table_name, columns, rows, batch_size=None):
+    """Satırları fast_executemany ile batch_size'lık gruplar halinde ekler, eklenen satır sayısını döndürür.
+    rows bir generator olabilir; bellekte en fazla bir batch tutulur."""
+    batch_size = batch_size or BULK_BATCH_SIZE
+    column_list = ", ".join(f"[{column}]" for column in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    query = f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders});"
+
+    # Parametreler sunucuya tek bir dizi olarak gönderilir
+    cursor.fast_executemany = True
+
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(query, batch)
+            inserted += len(batch)
+            batch = []
+
+    if batch:
+        cursor.executemany(query, batch)
+        inserted += len(batch)
+
+    return inserted
@@ -0,0 +1,100 @@
+from connection_pool import get_connection
+from report_pipeline import run_report_pipeline
+from snapshot import load_snapshot
+
+# Yazma işlemleri etkiledikleri dersi ChangeJournal'a ekler.
+# regenerate_changed_lessons() yalnızca işaretten (watermark) sonraki kayıtların derslerini yeniden üretir.
+CHANGE_JOURNAL_DDL = [
+    """
+    IF OBJECT_ID(N'dbo.ChangeJournal', N'U') IS NULL
+    CREATE TABLE ChangeJournal (
+        id BIGINT IDENTITY(1,1) PRIMARY KEY,
+        lesson_id INT NOT NULL,
+        entity NVARCHAR(50) NOT NULL,
+        changed_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.ReportWatermark', N'U') IS NULL
+    CREATE TABLE ReportWatermark (
+        name VARCHAR(20) PRIMARY KEY,
+        last_change_id BIGINT NOT NULL
+    );
+    """,
+]
+
+WATERMARK_NAME = "reports"
+
+
+def ensure_change_journal(cursor):
+    for statement in CHANGE_JOURNAL_DDL:
+        cursor.execute(statement)
+
+
+def record_change(cursor, lesson_id, entity):
+    """Yazma işlemiyle aynı bağlantı üzerinden dersin değiştiğini kaydeder"""
+    if lesson_id is None:
+        return
+    cursor.execute("INSERT INTO ChangeJournal (lesson_id, entity) VALUES (?, ?);", int(lesson_id), entity)
+
+
+def read_watermark(cursor):
+    """Son işlenen journal kaydının id'si; hiç üretim yapılmadıysa None"""
+    cursor.execute("SELECT last_change_id FROM ReportWatermark WHERE name = ?;", WATERMARK_NAME)
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def write_watermark(cursor, change_id):
+    cursor.execute("UPDATE ReportWatermark SET last_change_id = ? WHERE name = ?;", change_id, WATERMARK_NAME)
+    if cursor.rowcount == 0:
+        cursor.execute(
+            "INSERT INTO ReportWatermark (name, last_change_id) VALUES (?, ?);", WATERMARK_NAME, change_id
+        )
+
+
+def pending_changes(cursor, watermark):
+    """İşaretten sonra değişen dersler ve en son journal id'si: (ders kümesi, son id)"""
+    cursor.execute(
+        "SELECT lesson_id, MAX(id) FROM ChangeJournal WHERE id > ? GROUP BY lesson_id;", watermark or 0
+    )
+    rows = cursor.fetchall()
+    lesson_ids = {row[0] for row in rows}
+    last_change_id = max((row[1] for row in rows), default=watermark)
+    return lesson_ids, last_change_id
+
+
+def regenerate_changed_lessons(workers=1, max_workers=None):
+    """Journal'daki değişikliklerden etkilenen derslerin Tablo 1-5 ve not çıktılarını yeniden üretir.
+    İşaret hiç yazılmamışsa bütün dersler üretilir. Üretilen ders kümesini döndürür (hepsi için None).
+    workers > 1 verilirse Excel sayfaları toplam o kadar işçi süreçte oluşturulur (bkz. parallel_reports);
+    max_workers aynı anda çalışan aşama sayısıdır (bkz. report_pipeline)."""
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    watermark = read_watermark(cursor)
+    if watermark is None:
+        cursor.execute("SELECT MAX(id) FROM ChangeJournal;")
+        last_change_id = cursor.fetchone()[0] or 0
+        lesson_ids = None
+    else:
+        lesson_ids, last_change_id = pending_changes(cursor, watermark)
+    conn.close()
+
+    if lesson_ids is not None and not lesson_ids:
+        print("No changed lessons since the last report generation.")
+        return lesson_ids
+
+    # Aşamalar bağımlılıklarına göre aynı anda çalışır; girdileri değişmeyen Excel aşamaları atlanır
+    snapshot = load_snapshot(lesson_ids)
+    run_report_pipeline(snapshot, lesson_ids, workers, max_workers)
+
+    # İşaret ancak bütün çıktılar yazıldıktan sonra ilerler; yarıda kalan iş bir sonraki çağrıda tekrarlanır
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = True
+    cursor = conn.cursor()
+    write_watermark(cursor, last_change_id)
+    conn.close()
+
+    return lesson_ids
@@ -0,0 +1,199 @@
+import importlib.util
+import os
+import shutil
+
+import pandas as pd
+
+from report_calc import Table4Result, note_rows, table1_rows, table2_rows, table3_rows, table5_rows
+from snapshot import load_snapshot, normalize_lesson_ids
+
+# Tablo 1-5 ve not çıktıları Excel'in yanında ders bazında bölümlenmiş sütunlu dosyalara da yazılır:
+# exports/<tablo>/lesson_id=<ders>/part.parquet (pyarrow kurulu değilse part.csv).
+# Değerler Excel raporlarıyla aynı hesaplardan (report_calc) gelir. Her ders ayrı dosyadır; sütunlar sayfanın
+# 2. satırındaki başlıklardır (matris sütunları derse göre değişir).
+# Excel'de yorum olarak yazılan metinler "Text" sütunundadır.
+EXPORT_DIR = "exports"
+EXPORT_TABLES = ("table1", "table2", "table3", "notes", "table4", "table5")
+EXPORT_FORMAT = "parquet" if importlib.util.find_spec("pyarrow") is not None else "csv"
+EXPORT_FORMATS = ("parquet", "csv")
+
+
+def _table1_frame(lesson):
+    course_ids = [course_id for course_id, _ in lesson.course_outcomes]
+    relations = {(program_id, course_id): value for program_id, course_id, value in lesson.program_course_relations}
+    averages = dict(table1_rows(lesson))
+    columns = ["Program Outcomes", "Text", *map(str, course_ids), "Rel Value"]
+    rows = [
+        [program_id, text, *(relations.get((program_id, course_id)) for course_id in course_ids), averages[program_id]]
+        for program_id, text in lesson.program_outcomes
+    ]
+    return columns, rows
+
+
+def _table2_frame(lesson):
+    criteria = [name for name, _ in lesson.evaluation_criteria]
+    relations = {(course_id, name): value for course_id, name, value in lesson.course_evaluation_relations}
+    columns = ["Course Outcomes", "Text", *criteria, "Total"]
+    rows = [
+        [course_id, text, *(relations.get((course_id, name)) for name in criteria), total]
+        for (course_id, text), (_, total) in zip(lesson.course_outcomes, table2_rows(lesson))
+    ]
+    return columns, rows
+
+
+def _table3_frame(lesson):
+    # create_table3 gibi yalnızca ilişkisi olan kriterler
+    criteria = [
+        name for name in dict.fromkeys(name for _, name, _ in lesson.course_evaluation_relations)
+        if name in lesson.criteria_weights
+    ]
+    total_rows, criteria_rows = table3_rows(lesson, criteria)
+    columns = ["Course Outcomes", "Text", *criteria, "Total"]
+    rows = [
+        [course_id, text, *(value for _, _, value in criteria_rows[index * len(criteria):(index + 1) * len(criteria)]),
+         total]
+        for index, ((course_id, text), (_, total)) in enumerate(zip(lesson.course_outcomes, total_rows))
+    ]
+    return columns, rows
+
+
+def _notes_frame(lesson):
+    columns = ["Student", *lesson.criteria_weights.keys(), "Average"]
+    rows = [[student_id, *scores, average] for student_id, scores, average in note_rows(lesson)]
+    return columns, rows
+
+
+def _table4_frame(lesson):
+    columns = ["Student ID", "Course Outcome ID", "Course Outcomes", *lesson.criteria_weights.keys(),
+               "Total", "Max", "% Success"]
+    result = Table4Result(lesson)
+    rows = [
+        [student_id, course_id, text, *weighted, total, max_score, success_rate]
+        for student_id, _ in lesson.students
+        for (_, text), (course_id, weighted, total, max_score, success_rate)
+        in zip(lesson.course_outcomes, result.rows(student_id))
+    ]
+    return columns, rows
+
+
+def _table5_frame(lesson):
+    program_texts = dict(lesson.program_outcomes)
+    columns = ["Student ID", "Program Outcome ID", "Program Outcomes",
+               *(str(course_id) for course_id, _ in lesson.course_outcomes), "Success Rate"]
+    rows = [
+        [student_id, program_id, program_texts[program_id], *values, ratio]
+        for student_id, program_id, values, ratio in table5_rows(lesson)
+    ]
+    return columns, rows
+
+
+# Tablo adı -> dersin (sütunlar, satırlar) bilgisini üreten fonksiyon
+FRAMES = {
+    "table1": _table1_frame,
+    "table2": _table2_frame,
+    "table3": _table3_frame,
+    "notes": _notes_frame,
+    "table4": _table4_frame,
+    "table5": _table5_frame,
+}
+
+
+def _partition_dir(table, lesson_id):
+    return os.path.join(EXPORT_DIR, table, f"lesson_id={lesson_id}")
+
+
+def _write_partition(table, lesson_id, frame, export_format):
+    """Dosya önce geçici adla yazılır, sonra yerine taşınır; okuyan taraf yarım dosya görmez"""
+    directory = _partition_dir(table, lesson_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part.{export_format}")
+    temporary = path + ".tmp"
+    if export_format == "parquet":
+        frame.to_parquet(temporary, index=False)
+    else:
+        frame.to_csv(temporary, index=False)
+    os.replace(temporary, path)
+
+    # Biçim değiştiyse eski dosya kalmasın
+    for other_format in EXPORT_FORMATS:
+        other = os.path.join(directory, f"part.{other_format}")
+        if other_format != export_format and os.path.exists(other):
+            os.remove(other)
+
+
+def _stored_lessons(table):
+    directory = os.path.join(EXPORT_DIR, table)
+    if not os.path.isdir(directory):
+        return set()
+    return {
+        int(name.split("=", 1)[1]) for name in os.listdir(directory)
+        if name.startswith("lesson_id=") and name.split("=", 1)[1].isdigit()
+    }
+
+
+def export_lessons(snapshot=None, lesson_ids=None, tables=EXPORT_TABLES, export_format=None):
+    """Tabloların ders bölümlerini yazar. Tablo 4 / Tablo 5 snapshot'taki Table3 / Table4 değerlerini kullanır,
+    bu yüzden save_table3_to_database / save_table4_to_database'ten sonra çağrılmalıdır.
+    Kapsamdaki (lesson_ids None ise bütün) derslerden artık olmayanların bölümleri silinir.
+    Yazılan dosya sayısını döndürür."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    export_format = export_format or EXPORT_FORMAT
+
+    lessons = set(snapshot.lesson_names) | set(snapshot.student_lesson_ids())
+    if lesson_ids is not None:
+        lessons &= lesson_ids
+
+    written = 0
+    for table in tables:
+        for lesson_id in sorted(lessons):
+            columns, rows = FRAMES[table](snapshot.lesson(lesson_id))
+            _write_partition(table, lesson_id, pd.DataFrame(rows, columns=columns), export_format)
+            written += 1
+
+        stale = _stored_lessons(table) - lessons
+        if lesson_ids is not None:
+            stale &= lesson_ids
+        for lesson_id in stale:
+            shutil.rmtree(_partition_dir(table, lesson_id))
+    return written
+
+
+def _partition_format(table, lesson_id):
+    """Dersin bölümünün mevcut biçimi; dosya yoksa None"""
+    for export_format in EXPORT_FORMATS:
+        if os.path.exists(os.path.join(_partition_dir(table, lesson_id), f"part.{export_format}")):
+            return export_format
+    return None
+
+
+def read_lesson(table, lesson_id):
+    """Dersin bölümünü DataFrame olarak okur; dosya yoksa None"""
+    lesson_id = int(lesson_id)
+    export_format = _partition_format(table, lesson_id)
+    if export_format is None:
+        return None
+    path = os.path.join(_partition_dir(table, lesson_id), f"part.{export_format}")
+    return pd.read_parquet(path) if export_format == "parquet" else pd.read_csv(path)
+
+
+def replace_student_partitions(snapshot, lesson_id, student_id, tables=("notes", "table4", "table5")):
+    """recompute_student için: snapshot dersin yalnızca bu öğrencisini içerir.
+    Öğrencinin satırları bölümde ilk eski satırının yerine yazılır (yoksa sona eklenir).
+    Dosya yoksa ya da sütunlar değiştiyse bölüm atlanır; dersin tamamı bir sonraki üretimde yazılır."""
+    lesson = snapshot.lesson(lesson_id)
+    for table in tables:
+        stored = read_lesson(table, lesson_id)
+        columns, rows = FRAMES[table](lesson)
+        if stored is None or list(stored.columns) != columns:
+            continue
+
+        # İlk sütun öğrenci numarasıdır
+        removed = (stored[columns[0]] == student_id).to_numpy()
+        kept = stored[~removed]
+        position = int(removed.argmax()) if removed.any() else len(kept)
+        frame = pd.concat(
+            [kept.iloc[:position], pd.DataFrame(rows, columns=columns), kept.iloc[position:]],
+            ignore_index=True,
+        )
+        _write_partition(table, lesson_id, frame, _partition_format(table, lesson_id))
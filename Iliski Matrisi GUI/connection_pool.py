@@ -0,0 +1,301 @@
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+import pyodbc
+
+CONNECTION_STRING = (
+    "Driver={{ODBC Driver 17 for SQL Server}};"
+    "Server=ASUS\\SQLEXPRESS;"
+    "Database={database};"
+    "Trusted_Connection=yes;"
+)
+
+# Havuz ayarları configure_pool() ile değiştirilebilir
+POOL_SETTINGS = {
+    "min_size": 1,               # her veritabanı için sıcak tutulacak bağlantı sayısı
+    "max_size": 5,               # aynı anda açık olabilecek en fazla bağlantı
+    "idle_timeout": 300,         # bu kadar saniye boşta kalan bağlantı kapatılır
+    "health_check_interval": 30, # bu kadar saniye boşta kalan bağlantı kullanılmadan önce test edilir
+    "acquire_timeout": 30,       # havuz doluyken bağlantı için beklenecek en uzun süre
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+_query_counters = []
+
+
+class QueryCounter:
+    """count_queries() bloğu boyunca veritabanına gönderilen komut sayısı"""
+
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def count_queries():
+    """Blok içinde havuzdan alınan bağlantılarla çalıştırılan execute/executemany çağrılarını sayar"""
+    counter = QueryCounter()
+    _query_counters.append(counter)
+    try:
+        yield counter
+    finally:
+        _query_counters.remove(counter)
+
+
+class CountingCursor:
+    """pyodbc imlecini sarar, çalıştırılan her komutu etkin sayaçlara ekler"""
+
+    def __init__(self, raw):
+        object.__setattr__(self, "_raw", raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def _count(self):
+        for counter in list(_query_counters):
+            counter.count += 1
+
+    def execute(self, *args):
+        self._count()
+        self._raw.execute(*args)
+        return self
+
+    def executemany(self, *args):
+        self._count()
+        self._raw.executemany(*args)
+        return self
+
+
+class PooledConnection:
+    """Havuzdan ödünç alınan bağlantı. close() bağlantıyı kapatmaz, havuza geri verir."""
+
+    def __init__(self, pool, raw):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "_cursors", weakref.WeakSet())
+
+    def _open_raw(self):
+        raw = object.__getattribute__(self, "_raw")
+        if raw is None:
+            raise pyodbc.ProgrammingError("Attempt to use a closed connection.")
+        return raw
+
+    def __getattr__(self, name):
+        return getattr(self._open_raw(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._open_raw(), name, value)
+
+    def cursor(self):
+        cursor = CountingCursor(self._open_raw().cursor())
+        self._cursors.add(cursor)
+        return cursor
+
+    def close(self):
+        raw = object.__getattribute__(self, "_raw")
+        if raw is None:
+            return
+        object.__setattr__(self, "_raw", None)
+
+        # Önceki kullanıcının bekleyen sonuçları bir sonraki kullanıcıyı meşgul etmesin
+        for cursor in list(self._cursors):
+            try:
+                cursor.close()
+            except pyodbc.Error:
+                pass
+
+        self._pool.release(raw)
+
+    def __del__(self):
+        # close() çağırmayı unutan çağrılar bağlantıyı sızdırmasın
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Tek bir veritabanı için açık ODBC bağlantılarını saklar ve yeniden kullandırır"""
+
+    def __init__(self, database, min_size, max_size, idle_timeout, health_check_interval, acquire_timeout):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.database = database
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = deque()  # (bağlantı, son kullanım zamanı)
+        self._size = 0        # boşta + ödünç verilmiş toplam bağlantı
+        self._closed = False
+        self._condition = threading.Condition()
+
+        for _ in range(min_size):
+            self._size += 1
+            try:
+                self._idle.append((self._connect(), time.monotonic()))
+            except pyodbc.Error:
+                self._size -= 1
+                raise
+
+    def _connect(self):
+        return pyodbc.connect(CONNECTION_STRING.format(database=self.database))
+
+    def _is_healthy(self, raw, last_used):
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except pyodbc.Error:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _evict_idle_locked(self):
+        # En eski bağlantılar deque'nin başında durur
+        now = time.monotonic()
+        expired = []
+        while self._idle and self._size - len(expired) > self.min_size:
+            raw, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            expired.append(raw)
+        return expired
+
+    def evict_idle(self):
+        """idle_timeout süresini aşan boştaki bağlantıları kapatır (min_size korunur)"""
+        with self._condition:
+            expired = self._evict_idle_locked()
+        for raw in expired:
+            self._discard(raw)
+
+    def acquire(self, timeout=None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise pyodbc.ProgrammingError(f"Connection pool for {self.database} is closed.")
+
+                expired = self._evict_idle_locked()
+                candidate = None
+                open_new = False
+
+                if self._idle:
+                    # En son kullanılan (en sıcak) bağlantı tercih edilir
+                    candidate, last_used = self._idle.pop()
+                elif self._size - len(expired) < self.max_size:
+                    self._size += 1
+                    open_new = True
+                elif not expired:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No free connection for {self.database} after {timeout} seconds.")
+                    self._condition.wait(remaining)
+                    continue
+
+            for raw in expired:
+                self._discard(raw)
+
+            if candidate is not None:
+                if self._is_healthy(candidate, last_used):
+                    return PooledConnection(self, candidate)
+                self._discard(candidate)
+                continue
+
+            if open_new:
+                try:
+                    return PooledConnection(self, self._connect())
+                except pyodbc.Error:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+
+    def release(self, raw):
+        try:
+            # Yarım kalan işlemler geri alınır, bağlantı varsayılan moduna döner
+            if not raw.autocommit:
+                raw.rollback()
+            raw.autocommit = False
+        except pyodbc.Error:
+            self._discard(raw)
+            return
+
+        with self._condition:
+            if self._closed:
+                discard = True
+            else:
+                discard = False
+                self._idle.append((raw, time.monotonic()))
+                self._condition.notify()
+
+        if discard:
+            self._discard(raw)
+        else:
+            self.evict_idle()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle = [raw for raw, _ in self._idle]
+            self._idle.clear()
+        for raw in idle:
+            self._discard(raw)
+
+
+def get_pool(database=None):
+    database = database or "master"
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = ConnectionPool(database, **POOL_SETTINGS)
+            _pools[database] = pool
+        return pool
+
+
+def get_connection(database=None):
+    """Havuzdan hazır bir bağlantı ödünç verir. İşi biten çağrı conn.close() ile geri bırakır."""
+    return get_pool(database).acquire()
+
+
+def configure_pool(**settings):
+    """Havuz ayarlarını değiştirir; açık havuzlar kapatılır ve yeni ayarlarla yeniden kurulur"""
+    unknown = set(settings) - set(POOL_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown pool settings: {', '.join(sorted(unknown))}")
+    POOL_SETTINGS.update(settings)
+    close_all_pools()
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
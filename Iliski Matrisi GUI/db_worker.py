@@ -0,0 +1,116 @@
+import queue
+import threading
+import traceback
+
+# Arka plan iş parçacığı sayısı; her iş havuzdan kendi bağlantısını alır (connection_pool.max_size'ı aşmamalı)
+WORKER_COUNT = 2
+# Tk thread'inin sonuç kuyruğunu kontrol etme aralığı (ms); ~60 fps
+POLL_INTERVAL = 16
+
+
+class DatabaseRequest:
+    """Kuyruğa verilmiş tek bir iş. cancel() ile iptal edilen işin sonucu teslim edilmez."""
+
+    def __init__(self, func, args, kwargs, on_success, on_error, on_done, key):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_success = on_success
+        self.on_error = on_error
+        self.on_done = on_done
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DatabaseWorker:
+    """Veritabanı ve dosya işlerini arka plan thread'lerinde çalıştırır.
+    Sonuçlar bir kuyruğa bırakılır ve root.after ile Tk thread'inde geri çağrılara iletilir;
+    widget'lara yalnızca geri çağrılardan dokunulmalıdır."""
+
+    def __init__(self, root, worker_count=None, poll_interval=None):
+        self.root = root
+        self.poll_interval = poll_interval or POLL_INTERVAL
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = {}  # anahtar -> o anahtarla verilen son iş
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f"db-worker-{index}", daemon=True)
+            for index in range(worker_count or WORKER_COUNT)
+        ]
+        for thread in self._threads:
+            thread.start()
+        self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, func, *args, on_success=None, on_error=None, on_done=None, key=None, **kwargs):
+        """func(*args, **kwargs) arka planda çalışır; sonuç on_success(result), hata on_error(exception) ile
+        Tk thread'inde teslim edilir, ardından on_done() çağrılır. Aynı key ile yeni bir iş verilirse
+        önceki iş eskimiş sayılır: henüz başlamadıysa hiç çalışmaz, bittiyse sonucu teslim edilmez."""
+        request = DatabaseRequest(func, args, kwargs, on_success, on_error, on_done, key)
+        if key is not None:
+            with self._lock:
+                previous = self._latest.get(key)
+                if previous is not None:
+                    previous.cancel()
+                self._latest[key] = request
+        self._requests.put(request)
+        return request
+
+    def cancel(self, key):
+        """Anahtara ait bekleyen ya da çalışan işi iptal eder"""
+        with self._lock:
+            request = self._latest.pop(key, None)
+        if request is not None:
+            request.cancel()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            if request.cancelled:
+                self._results.put((request, False, None))
+                continue
+            try:
+                result = request.func(*request.args, **request.kwargs)
+                self._results.put((request, True, result))
+            except Exception as e:
+                traceback.print_exc()
+                self._results.put((request, False, e))
+
+    def _poll(self):
+        while True:
+            try:
+                request, succeeded, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._deliver(request, succeeded, result)
+
+        if not self._closed:
+            self.root.after(self.poll_interval, self._poll)
+
+    def _deliver(self, request, succeeded, result):
+        if request.key is not None:
+            with self._lock:
+                if self._latest.get(request.key) is request:
+                    del self._latest[request.key]
+        try:
+            if not request.cancelled:
+                if succeeded and request.on_success is not None:
+                    request.on_success(result)
+                elif not succeeded and result is not None and request.on_error is not None:
+                    request.on_error(result)
+        finally:
+            # Yükleniyor göstergeleri iptal edilen işlerde de kaldırılır
+            if request.on_done is not None:
+                request.on_done()
+
+    def shutdown(self):
+        self._closed = True
+        for _ in self._threads:
+            self._requests.put(None)
@@ -0,0 +1,174 @@
+import csv
+import os
+from itertools import islice
+
+import pyodbc
+from openpyxl import load_workbook
+
+from bulk_write import BULK_BATCH_SIZE, bulk_insert
+from change_journal import record_change
+from connection_pool import get_connection
+
+# Not dosyası: ilk satır başlık, ilk sütun öğrenci numarası, diğer sütunlar dersin kriterleri
+MIN_SCORE = 0
+MAX_SCORE = 100
+
+ERROR_REPORT_COLUMNS = ["line", "student", "error"]
+
+
+class GradeImportError(ValueError):
+    """Dosya bütünüyle reddedildi (başlık hatalı, ders kriteri yok vb.)"""
+
+
+def _read_rows(path):
+    """Dosyanın satırlarını sırayla üretir; dosyanın tamamı belleğe alınmaz"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            yield from csv.reader(file)
+    elif extension in (".xlsx", ".xlsm"):
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        raise GradeImportError(f"Unsupported grade file type: {extension}")
+
+
+def _lesson_state(cursor, lesson_id):
+    """Dersin kriterleri ve derste zaten kayıtlı öğrenciler"""
+    cursor.execute("""
+        SET NOCOUNT ON;
+        SELECT Criteria FROM EvaluationCriteria WHERE LessonID = ?;
+        SELECT Student FROM Students WHERE lesson_id = ?;
+    """, lesson_id, lesson_id)
+    criteria = [row[0] for row in cursor.fetchall()]
+    cursor.nextset()
+    enrolled = {row[0] for row in cursor.fetchall()}
+    return criteria, enrolled
+
+
+def _criteria_columns(header, criteria):
+    """Başlıktaki kriter sütunlarını doğrular; (sütun indeksi, kriter) listesi döndürür"""
+    names = [str(name).strip() if name is not None else "" for name in header[1:]]
+    unknown = [name for name in names if name and name not in criteria]
+    missing = [name for name in criteria if name not in names]
+    if unknown or missing:
+        problems = []
+        if unknown:
+            problems.append(f"unknown criteria columns: {', '.join(unknown)}")
+        if missing:
+            problems.append(f"missing criteria columns: {', '.join(missing)}")
+        raise GradeImportError("; ".join(problems))
+    return [(index, name) for index, name in enumerate(names, start=1) if name]
+
+
+def validate_grade_row(row, columns, enrolled, seen):
+    """Tek bir satırı doğrular; (öğrenci no, {kriter: not}) ya da hata mesajı döndürür"""
+    student = row[0] if row else None
+    # Excel sayıları float olarak okunabilir (12345.0)
+    if isinstance(student, float) and student.is_integer():
+        student = int(student)
+    text = str(student).strip() if student is not None else ""
+    if not text.isdigit() or int(text) == 0:
+        return None, f"invalid student number: {student!r}"
+    student_id = int(text)
+
+    if student_id in enrolled:
+        return None, "student already has grades for this lesson"
+    if student_id in seen:
+        return None, "duplicate student number in file"
+
+    scores = {}
+    for index, criteria in columns:
+        value = row[index] if index < len(row) else None
+        if value is None or str(value).strip() == "":
+            return None, f"missing score for {criteria}"
+        try:
+            score = float(str(value).strip().replace(",", "."))
+        except ValueError:
+            return None, f"score for {criteria} is not a number: {value!r}"
+        if not MIN_SCORE <= score <= MAX_SCORE:
+            return None, f"score for {criteria} must be between {MIN_SCORE} and {MAX_SCORE}: {score}"
+        scores[criteria] = score
+
+    return student_id, scores
+
+
+def _default_report_path(path):
+    base, _ = os.path.splitext(path)
+    return f"{base}_errors.csv"
+
+
+def import_grades(path, lesson_id, chunk_size=None, error_report_path=None):
+    """Not dosyasını (CSV/XLSX) chunk_size'lık parçalar halinde okuyup geçerli satırları toplu yükler.
+    Geçersiz satırlar yüklenmez, hata raporuna (CSV) yazılır. Yükleme tek transaction'dır.
+    (yüklenen öğrenci sayısı, reddedilen satır sayısı, hata raporu yolu ya da None) döndürür."""
+    chunk_size = chunk_size or BULK_BATCH_SIZE
+    lesson_id = int(lesson_id)
+    error_report_path = error_report_path or _default_report_path(path)
+
+    rows = _read_rows(path)
+    header = next(rows, None)
+    if not header:
+        raise GradeImportError(f"Grade file is empty: {path}")
+
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+
+    imported = 0
+    rejected = 0
+    report = None
+    try:
+        criteria, enrolled = _lesson_state(cursor, lesson_id)
+        if not criteria:
+            raise GradeImportError(f"Lesson ID {lesson_id} has no evaluation criteria.")
+        columns = _criteria_columns(header, criteria)
+
+        seen = set()
+        line = 1
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            students = []
+            scores = []
+            for row in chunk:
+                line += 1
+                if not any(value not in (None, "") for value in row):
+                    continue
+                student_id, result = validate_grade_row(row, columns, enrolled, seen)
+                if student_id is None:
+                    if report is None:
+                        report_file = open(error_report_path, "w", newline="", encoding="utf-8")
+                        report = csv.writer(report_file)
+                        report.writerow(ERROR_REPORT_COLUMNS)
+                    report.writerow([line, row[0] if row else "", result])
+                    rejected += 1
+                    continue
+                seen.add(student_id)
+                students.append((student_id, lesson_id))
+                scores.extend((student_id, lesson_id, name, score) for name, score in result.items())
+
+            bulk_insert(cursor, "Students", ["Student", "lesson_id"], students, chunk_size)
+            bulk_insert(cursor, "StudentScores", ["Student", "LessonID", "Criteria", "Score"], scores, chunk_size)
+            imported += len(students)
+
+        if imported:
+            record_change(cursor, lesson_id, "Students")
+        conn.commit()
+    except pyodbc.Error:
+        conn.rollback()
+        print(f"Grade import failed for Lesson ID {lesson_id}.")
+        raise
+    finally:
+        conn.close()
+        rows.close()
+        if report is not None:
+            report_file.close()
+
+    print(f"{imported} students imported for Lesson ID {lesson_id}, {rejected} rows rejected.")
+    return imported, rejected, error_report_path if rejected else None
@@ -0,0 +1,157 @@
+"""Index'lerin etkisini ölçen küçük benchmark.
+
+Ayrı bir RelationMatrixBenchmark veritabanında gerçekçi büyüklükte veri üretir,
+sık kullanılan sorguları index'siz ve index'li çalıştırır; her sorgu için plan
+operatörünü (scan / seek) ve ortalama süreyi yazdırır.
+
+    python index_benchmark.py [ders sayısı] [ders başına öğrenci]
+"""
+import random
+import sys
+import time
+
+from bulk_write import bulk_insert
+from connection_pool import get_connection
+from schema_indexes import INDEXES, index_statement
+from student_scores import ensure_student_tables
+
+DATABASE = "RelationMatrixBenchmark"
+OUTCOMES_PER_LESSON = 8
+CRITERIA = ["Vize", "Final", "Odev", "Quiz", "Proje"]
+REPEAT = 20
+
+# Students ve StudentScores uygulamanın şemasıyla (student_scores.ensure_student_tables) oluşturulur
+TABLES_DDL = [
+    "CREATE TABLE CourseOutcomes (id INT PRIMARY KEY IDENTITY(1,1), data TEXT NOT NULL, LessonID INT NOT NULL);",
+    "CREATE TABLE ProgramOutcomes (id INT PRIMARY KEY IDENTITY(1,1), data TEXT NOT NULL, LessonID INT NOT NULL);",
+    """CREATE TABLE ProgramCourseRelations (ProgramOutcomeID INT NOT NULL, CourseOutcomeID INT NOT NULL,
+        RelationValue FLOAT NOT NULL, LessonID INT NOT NULL,
+        PRIMARY KEY (ProgramOutcomeID, CourseOutcomeID, LessonID));""",
+    """CREATE TABLE EvaluationCriteria (Criteria NVARCHAR(25) NOT NULL, Weight INT NOT NULL, LessonID INT NOT NULL,
+        PRIMARY KEY (Criteria, LessonID));""",
+    """CREATE TABLE CourseEvaluationRelations (CourseOutcomeID INT NOT NULL, Criteria NVARCHAR(25),
+        RelationValue INT NOT NULL, LessonID INT NOT NULL, PRIMARY KEY (CourseOutcomeID, Criteria, LessonID));""",
+    """CREATE TABLE Table4 (student_id INT NOT NULL, lesson_id INT NOT NULL, course_outcome_id INT NOT NULL,
+        total_score FLOAT NOT NULL, max_score FLOAT, success_rate FLOAT,
+        PRIMARY KEY (lesson_id, student_id, course_outcome_id));""",
+]
+
+# (açıklama, sorgu, parametre üreten fonksiyon)
+QUERIES = [
+    ("CourseOutcomes WHERE LessonID", "SELECT id, LessonID FROM CourseOutcomes WHERE LessonID = ?;", "lesson"),
+    ("CourseEvaluationRelations WHERE LessonID",
+     "SELECT CourseOutcomeID, Criteria, RelationValue FROM CourseEvaluationRelations WHERE LessonID = ?;", "lesson"),
+    ("Students WHERE lesson_id", "SELECT Student, lesson_id FROM Students WHERE lesson_id = ?;", "lesson"),
+    ("StudentScores WHERE LessonID",
+     "SELECT Student, Criteria, Score FROM StudentScores WHERE LessonID = ?;", "lesson"),
+    ("Table4 WHERE student_id", "SELECT lesson_id FROM Table4 WHERE student_id = ?;", "student"),
+]
+
+
+def create_database():
+    conn = get_connection("master")
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute(f"IF DB_ID(N'{DATABASE}') IS NOT NULL DROP DATABASE {DATABASE};")
+    cursor.execute(f"CREATE DATABASE {DATABASE};")
+    conn.close()
+
+
+def generate_data(lesson_count, students_per_lesson):
+    conn = get_connection(DATABASE)
+    conn.autocommit = False
+    cursor = conn.cursor()
+    for statement in TABLES_DDL:
+        cursor.execute(statement)
+    ensure_student_tables(cursor)
+    conn.commit()
+
+    rng = random.Random(0)
+    lessons = range(1, lesson_count + 1)
+    outcome_ids = {
+        lesson_id: range((lesson_id - 1) * OUTCOMES_PER_LESSON + 1, lesson_id * OUTCOMES_PER_LESSON + 1)
+        for lesson_id in lessons
+    }
+
+    bulk_insert(cursor, "CourseOutcomes", ["data", "LessonID"],
+                ((f"DÇ {i}", lesson_id) for lesson_id in lessons for i in range(OUTCOMES_PER_LESSON)))
+    bulk_insert(cursor, "ProgramOutcomes", ["data", "LessonID"],
+                ((f"PÇ {i}", lesson_id) for lesson_id in lessons for i in range(OUTCOMES_PER_LESSON)))
+    bulk_insert(cursor, "ProgramCourseRelations",
+                ["ProgramOutcomeID", "CourseOutcomeID", "RelationValue", "LessonID"],
+                ((po, co, rng.choice([0, 0.5, 1]), lesson_id)
+                 for lesson_id in lessons for po in outcome_ids[lesson_id] for co in outcome_ids[lesson_id]))
+    bulk_insert(cursor, "EvaluationCriteria", ["Criteria", "Weight", "LessonID"],
+                ((criteria, 20, lesson_id) for lesson_id in lessons for criteria in CRITERIA))
+    bulk_insert(cursor, "CourseEvaluationRelations", ["CourseOutcomeID", "Criteria", "RelationValue", "LessonID"],
+                ((co, criteria, rng.choice([0, 1]), lesson_id)
+                 for lesson_id in lessons for co in outcome_ids[lesson_id] for criteria in CRITERIA))
+    bulk_insert(cursor, "Students", ["Student", "lesson_id"],
+                ((1000 + s, lesson_id) for lesson_id in lessons for s in range(students_per_lesson)))
+    bulk_insert(cursor, "StudentScores", ["Student", "LessonID", "Criteria", "Score"],
+                ((1000 + s, lesson_id, criteria, rng.randint(0, 100))
+                 for lesson_id in lessons for s in range(students_per_lesson) for criteria in CRITERIA))
+    bulk_insert(cursor, "Table4",
+                ["student_id", "lesson_id", "course_outcome_id", "total_score", "max_score", "success_rate"],
+                ((1000 + s, lesson_id, co, 50.0, 100.0, 50.0)
+                 for lesson_id in lessons for s in range(students_per_lesson) for co in outcome_ids[lesson_id]))
+    conn.commit()
+    cursor.execute("UPDATE STATISTICS Students; UPDATE STATISTICS StudentScores; UPDATE STATISTICS Table4;")
+    conn.commit()
+    conn.close()
+
+
+def plan_operators(cursor, query, param):
+    """Tahmini planda tablo erişimi yapan operatörler (Index Seek, Clustered Index Scan, ...)"""
+    cursor.execute("SET SHOWPLAN_ALL ON;")
+    cursor.execute(query.replace("?", str(int(param))))
+    rows = cursor.fetchall()
+    cursor.execute("SET SHOWPLAN_ALL OFF;")
+    return sorted({row.PhysicalOp for row in rows if row.PhysicalOp and ("Scan" in row.PhysicalOp or "Seek" in row.PhysicalOp)})
+
+
+def measure(cursor, lesson_count, students_per_lesson):
+    rng = random.Random(1)
+    results = []
+    for label, query, kind in QUERIES:
+        params = [
+            rng.randint(1, lesson_count) if kind == "lesson" else 1000 + rng.randrange(students_per_lesson)
+            for _ in range(REPEAT)
+        ]
+        operators = plan_operators(cursor, query, params[0])
+
+        start = time.perf_counter()
+        for param in params:
+            cursor.execute(query, param)
+            cursor.fetchall()
+        elapsed = (time.perf_counter() - start) / REPEAT * 1000
+
+        results.append((label, ", ".join(operators), elapsed))
+    return results
+
+
+def main():
+    lesson_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    students_per_lesson = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    print(f"Generating {lesson_count} lessons x {students_per_lesson} students in {DATABASE}...")
+    create_database()
+    generate_data(lesson_count, students_per_lesson)
+
+    conn = get_connection(DATABASE)
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    without = measure(cursor, lesson_count, students_per_lesson)
+    for index in INDEXES:
+        cursor.execute(index_statement(*index))
+    with_indexes = measure(cursor, lesson_count, students_per_lesson)
+    conn.close()
+
+    print(f"{'Query':45} {'Without indexes':35} {'With indexes':35}")
+    for (label, plan_before, time_before), (_, plan_after, time_after) in zip(without, with_indexes):
+        print(f"{label:45} {plan_before:24} {time_before:8.2f} ms  {plan_after:24} {time_after:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
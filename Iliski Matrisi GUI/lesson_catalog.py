@@ -0,0 +1,64 @@
+import threading
+import time
+
+from connection_pool import get_connection
+
+# Önbelleğin geçerlilik süresi (saniye). None: yalnızca invalidate_lessons() ile yenilenir.
+# Aynı veritabanını birden fazla kullanıcı değiştiriyorsa configure_lesson_cache(ttl=...) ile süre verilir.
+CACHE_SETTINGS = {"ttl": None}
+
+_lock = threading.Lock()
+_lessons = None     # {ders id: ders adı}
+_loaded_at = 0.0
+
+
+def configure_lesson_cache(ttl=None):
+    CACHE_SETTINGS["ttl"] = ttl
+    invalidate_lessons()
+
+
+def invalidate_lessons():
+    """Lessons tablosuna yazan her işlemden sonra çağrılır; bir sonraki okuma veritabanından yapılır"""
+    global _lessons
+    with _lock:
+        _lessons = None
+
+
+def _expired():
+    ttl = CACHE_SETTINGS["ttl"]
+    return _lessons is None or (ttl is not None and time.monotonic() - _loaded_at >= ttl)
+
+
+def _load():
+    global _lessons, _loaded_at
+    conn = get_connection("RelationMatrix")
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name FROM Lessons ORDER BY id;")
+    lessons = {lesson_id: name for lesson_id, name in cursor.fetchall()}
+    conn.close()
+
+    _lessons = lessons
+    _loaded_at = time.monotonic()
+    return lessons
+
+
+def get_lessons():
+    """{ders id: ders adı}; önbellek geçerliyse veritabanına gidilmez"""
+    with _lock:
+        lessons = _load() if _expired() else _lessons
+        return dict(lessons)
+
+
+def get_lesson_name(lesson_id):
+    """Dersin adı ya da None. Önbellekte olmayan ID için katalog bir kez yeniden okunur
+    (başka bir kullanıcının eklediği ders de bulunur)."""
+    try:
+        lesson_id = int(lesson_id)
+    except (TypeError, ValueError):
+        return None
+
+    with _lock:
+        lessons = _load() if _expired() else _lessons
+        if lesson_id not in lessons:
+            lessons = _load()
+        return lessons.get(lesson_id)
@@ -0,0 +1,117 @@
+import numpy as np
+
+# Bir dersin verileri yoğun dizilere çevrilir, Tablo 1-5 hesapları dizi işlemleriyle yapılır.
+# Toplamlar kriter / ders çıktısı ekseninde sırayla biriktirilir; sonuçlar eski döngülerle bit bit aynıdır.
+# Yuvarlama (round) değerler yazılırken Python'un round'u ile yapılır.
+
+
+def _sequential_sum(array, axis):
+    """Verilen eksende soldan sağa toplama (np.sum'ın ikili toplaması sonuçları değiştirebilir)"""
+    array = np.moveaxis(array, axis, -1)
+    total = np.zeros(array.shape[:-1])
+    for index in range(array.shape[-1]):
+        total = total + array[..., index]
+    return total
+
+
+class LessonMatrices:
+    """Bir dersin ilişki matrisleri, ağırlık vektörü ve not matrisi.
+    program_course: P×C, course_criteria: C×K, weights: K, scores: S×K (eksik not NaN)."""
+
+    def __init__(self, lesson):
+        self.program_ids = [program_id for program_id, _ in lesson.program_outcomes]
+        self.course_ids = [course_id for course_id, _ in lesson.course_outcomes]
+        self.criteria = [criteria for criteria, _ in lesson.evaluation_criteria]
+        self.student_ids = [student_id for student_id, _ in lesson.students]
+
+        program_index = {program_id: i for i, program_id in enumerate(self.program_ids)}
+        course_index = {course_id: i for i, course_id in enumerate(self.course_ids)}
+        criteria_index = {criteria: i for i, criteria in enumerate(self.criteria)}
+
+        self.weights = np.array([weight for _, weight in lesson.evaluation_criteria], dtype=float)
+
+        self.program_course = np.zeros((len(self.program_ids), len(self.course_ids)))
+        for program_id, course_id, relation_value in lesson.program_course_relations:
+            if program_id in program_index and course_id in course_index:
+                self.program_course[program_index[program_id], course_index[course_id]] = relation_value or 0
+
+        self.course_criteria = np.zeros((len(self.course_ids), len(self.criteria)))
+        for course_id, criteria, relation_value in lesson.course_evaluation_relations:
+            if course_id in course_index and criteria in criteria_index:
+                self.course_criteria[course_index[course_id], criteria_index[criteria]] = relation_value or 0
+
+        self.scores = np.array(
+            [[np.nan if scores.get(criteria) is None else scores[criteria] for criteria in self.criteria]
+             for _, scores in lesson.students],
+            dtype=float,
+        ).reshape(len(self.student_ids), len(self.criteria))
+
+        self.table3 = np.array([lesson.table3.get(course_id, 0) for course_id in self.course_ids], dtype=float)
+        self.table4 = np.array(
+            [[lesson.table4.get((student_id, course_id), 0) for course_id in self.course_ids]
+             for student_id in self.student_ids],
+            dtype=float,
+        ).reshape(len(self.student_ids), len(self.course_ids))
+
+    # Tablo 1: program çıktısı başına ilişki ortalaması (P)
+    def table1_averages(self):
+        count = len(self.course_ids)
+        if not count:
+            return np.zeros(len(self.program_ids))
+        return _sequential_sum(self.program_course, axis=1) / count
+
+    # Tablo 2: ders çıktısı başına ilişki toplamı (C)
+    def table2_totals(self):
+        return _sequential_sum(self.course_criteria, axis=1)
+
+    # Tablo 3: ağırlıklı ilişki (C×K) ve ders çıktısı başına toplam (C)
+    def table3_weighted(self):
+        return self.course_criteria * self.weights[None, :] / 100
+
+    def table3_totals(self):
+        return _sequential_sum(self.table3_weighted(), axis=1)
+
+    # Not tablosu: öğrenci başına ağırlıklı ortalama (S); eksik notlar ağırlığa katılmaz
+    def note_averages(self):
+        present = ~np.isnan(self.scores)
+        total = _sequential_sum(np.where(present, self.scores * self.weights[None, :], 0), axis=1)
+        weight_sum = _sequential_sum(np.where(present, self.weights[None, :], 0), axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average = np.where(weight_sum == 100, total / 100, np.where(weight_sum != 0, total / weight_sum, 0))
+        return average
+
+    # Tablo 4: öğrenci × ders çıktısı × kriter ağırlıklı notlar (S×C×K), toplam (S×C), en yüksek (C), başarı (S×C)
+    def table4_weighted(self):
+        scores = self.scores[:, None, :]
+        relations = self.course_criteria[None, :, :]
+        with np.errstate(invalid="ignore"):
+            weighted = scores * self.weights[None, None, :] * relations / 100
+        return np.where(np.isnan(scores) | (relations == 0), 0.0, weighted)
+
+    def table4_totals(self, weighted=None):
+        weighted = self.table4_weighted() if weighted is None else weighted
+        return _sequential_sum(weighted, axis=2)
+
+    def table4_max_scores(self):
+        return self.table3 * 100
+
+    def table4_success_rates(self, totals=None):
+        totals = self.table4_totals() if totals is None else totals
+        max_scores = self.table4_max_scores()[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(max_scores > 0, totals / max_scores * 100, 0.0)
+
+    # Tablo 5: öğrenci × program çıktısı × ders çıktısı ağırlıklı başarı (S×P×C) ve oran (S×P)
+    def table5_weighted(self, success_rates=None):
+        success_rates = self.table4 if success_rates is None else success_rates
+        return self.program_course[None, :, :] * success_rates[:, None, :]
+
+    def table5_ratios(self, weighted=None):
+        weighted = self.table5_weighted() if weighted is None else weighted
+        count = len(self.course_ids)
+        if not count:
+            return np.zeros(weighted.shape[:2])
+        average_success = _sequential_sum(weighted, axis=2) / count
+        average_relation = _sequential_sum(self.program_course, axis=1) / count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(average_relation[None, :] != 0, average_success / average_relation[None, :], 0.0)
@@ -0,0 +1,190 @@
+import pyodbc
+
+from change_journal import ensure_change_journal
+from connection_pool import get_connection
+from report_store import drop_table3_criteria, ensure_report_tables, widen_fingerprint_stage
+from report_views import drop_unused_view_objects, ensure_report_views
+from schema_indexes import INDEXES, index_statement
+from student_scores import ensure_student_tables, move_wide_scores
+
+DATABASE = "RelationMatrix"
+
+# Sürüm tablosu yoksa 0 döner; normal açılışta çalışan tek sorgu budur
+VERSION_QUERY = """
+    IF OBJECT_ID(N'dbo.SchemaVersion', N'U') IS NULL
+        SELECT 0;
+    ELSE
+        SELECT MAX(version) FROM SchemaVersion;
+"""
+
+SCHEMA_VERSION_DDL = """
+    IF OBJECT_ID(N'dbo.SchemaVersion', N'U') IS NULL
+    CREATE TABLE SchemaVersion (
+        version INT PRIMARY KEY,
+        description NVARCHAR(200) NOT NULL,
+        applied_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    );
+"""
+
+# Sürüm öncesi veritabanlarında tablolar zaten olabilir; bu yüzden her CREATE koşulludur
+BASE_TABLES_DDL = [
+    """
+    IF OBJECT_ID(N'dbo.Lessons', N'U') IS NULL
+    CREATE TABLE Lessons (
+        id INT PRIMARY KEY IDENTITY(1,1),
+        name NVARCHAR(255) NOT NULL
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.CourseOutcomes', N'U') IS NULL
+    CREATE TABLE CourseOutcomes (
+        id INT PRIMARY KEY IDENTITY(1,1),
+        data TEXT NOT NULL,
+        LessonID INT NOT NULL,
+        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.ProgramOutcomes', N'U') IS NULL
+    CREATE TABLE ProgramOutcomes (
+        id INT PRIMARY KEY IDENTITY(1,1),
+        data TEXT NOT NULL,
+        LessonID INT NOT NULL,
+        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.ProgramCourseRelations', N'U') IS NULL
+    CREATE TABLE ProgramCourseRelations (
+        ProgramOutcomeID INT NOT NULL,
+        CourseOutcomeID INT NOT NULL,
+        RelationValue FLOAT NOT NULL CHECK (RelationValue BETWEEN 0 AND 1),
+        LessonID INT NOT NULL,
+        PRIMARY KEY (ProgramOutcomeID, CourseOutcomeID, LessonID),
+        FOREIGN KEY (ProgramOutcomeID) REFERENCES ProgramOutcomes(id),
+        FOREIGN KEY (CourseOutcomeID) REFERENCES CourseOutcomes(id),
+        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.EvaluationCriteria', N'U') IS NULL
+    CREATE TABLE EvaluationCriteria (
+        Criteria NVARCHAR(25) NOT NULL,
+        Weight INT NOT NULL,
+        LessonID INT NOT NULL,
+        PRIMARY KEY (Criteria, LessonID),
+        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.CourseEvaluationRelations', N'U') IS NULL
+    CREATE TABLE CourseEvaluationRelations (
+        CourseOutcomeID INT NOT NULL,
+        Criteria NVARCHAR(25),
+        RelationValue INT NOT NULL,
+        LessonID INT NOT NULL,
+        PRIMARY KEY (CourseOutcomeID, Criteria, LessonID),
+        FOREIGN KEY (CourseOutcomeID) REFERENCES CourseOutcomes(id),
+        FOREIGN KEY (Criteria, LessonID) REFERENCES EvaluationCriteria(Criteria, LessonID),
+        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
+    );
+    """,
+]
+
+# Arayüzün oluşturduğu tabloda bu kısıt vardı, konsol betiğininkinde yoktu.
+# Mevcut satırlar kontrol edilmez (WITH NOCHECK); kısıt yeni yazılan değerler için geçerlidir.
+RELATION_VALUE_CHECK = """
+    IF NOT EXISTS (
+        SELECT 1 FROM sys.check_constraints
+        WHERE parent_object_id = OBJECT_ID(N'dbo.CourseEvaluationRelations')
+    )
+    ALTER TABLE CourseEvaluationRelations WITH NOCHECK
+        ADD CONSTRAINT CK_CourseEvaluationRelations_RelationValue CHECK (RelationValue IN (0, 1));
+"""
+
+
+def _base_tables(cursor):
+    for statement in BASE_TABLES_DDL:
+        cursor.execute(statement)
+    cursor.execute(RELATION_VALUE_CHECK)
+
+
+def _student_scores(cursor):
+    ensure_student_tables(cursor)
+    moved = move_wide_scores(cursor)
+    if moved:
+        print(f"Moved {moved} score columns from Students to StudentScores.")
+
+
+def _indexes(cursor):
+    for index in INDEXES:
+        cursor.execute(index_statement(*index))
+    # Önceki sürümün ayrı index sürüm tablosu artık kullanılmaz
+    cursor.execute("IF OBJECT_ID(N'dbo.SchemaIndexVersion', N'U') IS NOT NULL DROP TABLE SchemaIndexVersion;")
+
+
+# (sürüm, açıklama, adım). Yeni şema değişikliği listenin sonuna yeni bir sürüm olarak eklenir;
+# uygulanmış adımlar değiştirilmez.
+MIGRATIONS = [
+    (1, "Base relation tables", _base_tables),
+    (2, "Students roster and long-format StudentScores", _student_scores),
+    (3, "Permanent Table3/Table4 and report fingerprints", ensure_report_tables),
+    (4, "Change journal and report watermark", ensure_change_journal),
+    (5, "Lookup indexes", _indexes),
+    (6, "Table3/Table5 views and Table5 summary", ensure_report_views),
+    (7, "Wider ReportFingerprints stage names", widen_fingerprint_stage),
+    (8, "Drop unused Table3Criteria", drop_table3_criteria),
+    (9, "Drop unused Table3View and Table5 student index", drop_unused_view_objects),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _connect():
+    """Veritabanına bağlanır; veritabanı yoksa master üzerinden oluşturur"""
+    try:
+        return get_connection(DATABASE)
+    except pyodbc.Error:
+        conn = get_connection("master")
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute(f"IF DB_ID(N'{DATABASE}') IS NULL CREATE DATABASE {DATABASE};")
+        conn.close()
+        print(f"{DATABASE} database created")
+        return get_connection(DATABASE)
+
+
+def migrate_schema():
+    """Şemayı son sürüme getirir. Güncel veritabanında tek bir sorgu çalışır.
+    Her sürüm kendi transaction'ında uygulanır; hata olursa o sürüm geri alınır ve hata yukarı iletilir."""
+    conn = _connect()
+    conn.autocommit = False
+    cursor = conn.cursor()
+
+    cursor.execute(VERSION_QUERY)
+    current = cursor.fetchone()[0] or 0
+    if current >= LATEST_VERSION:
+        conn.close()
+        return current
+
+    cursor.execute(SCHEMA_VERSION_DDL)
+    conn.commit()
+
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            step(cursor)
+            cursor.execute(
+                "INSERT INTO SchemaVersion (version, description) VALUES (?, ?);", version, description
+            )
+            conn.commit()
+        except pyodbc.Error:
+            conn.rollback()
+            print(f"Schema migration {version} ({description}) failed.")
+            conn.close()
+            raise
+        print(f"Schema migration {version} applied: {description}")
+
+    conn.close()
+    return LATEST_VERSION
@@ -0,0 +1,232 @@
+import datetime
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import openpyxl
+from openpyxl import Workbook
+from openpyxl.comments.author import AuthorList
+from openpyxl.comments.comment_sheet import CommentSheet
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import Relationship, RelationshipList
+from openpyxl.worksheet._writer import WorksheetWriter
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.xml.functions import tostring
+
+from reports import (
+    OUTCOME_TEXTS, REPORTS, STREAMED_REPORTS, _create_sheet, _drop_default_sheet, _open_workbook, _remove_sheet,
+    _report_plan, _stream_report, _use_streaming, _write_lookup_sheet, _write_report,
+)
+from snapshot import load_snapshot, normalize_lesson_ids
+
+# Excel raporlarının sayfaları işçi süreçlerde oluşturulur ve XML olarak seri hale getirilir;
+# ana süreç yalnızca kitapları birleştirip kaydeder. Sonuç seri üretimle aynıdır.
+# İşçiler snapshot'ı havuz açılırken bir kez alır. Windows'ta işçiler ana betiği yeniden içe aktardığı için
+# çağıran betik if __name__ == "__main__": korumasıyla çalışmalıdır.
+REPORT_WORKERS = os.cpu_count() or 1
+
+# İşçiler iş parçacıkları çalışan rapor sürecinden fork ile kopyalanmaz (kilitli kopyalanan kilitler işçiyi
+# kilitleyebilir); forkserver olan platformlarda tek iş parçacıklı sunucudan, diğerlerinde spawn ile başlatılır.
+# Her iki yöntemde de ana betik yeniden içe aktarıldığından yukarıdaki koruma Linux'ta da gereklidir.
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+# Sayfaların işçide yazılması ve kitapta birleştirilmesi openpyxl'in iç API'lerine dayanır
+# (WorksheetWriter, ExcelWriter'ın yorum yazımı, sayfaların özel alanları) ve yalnızca bu sürümde doğrulanmıştır.
+# Başka bir sürüm kuruluysa raporlar seri üretilir. openpyxl yükseltilirken test_parallel_reports
+# (check_parallel_output) yeni sürümle geçtikten sonra sürüm burada ve requirements.txt'te güncellenir.
+OPENPYXL_VERSION = "3.1.5"
+
+# Kaydetme zamanını içerir, her kaydetmede değişir
+_VOLATILE_PARTS = {"docProps/core.xml"}
+
+_snapshot = None
+
+
+def _set_snapshot(snapshot):
+    global _snapshot
+    _snapshot = snapshot
+
+
+class SheetPart:
+    """İşçide seri hale getirilmiş bir sayfa: sayfa XML'i, varsa yorumlar ve yorum çizimi (VML)"""
+
+    def __init__(self, sheet_xml, comments_xml=None, vml=None):
+        self.sheet_xml = sheet_xml
+        self.comments_xml = comments_xml
+        self.vml = vml
+
+
+def _render_sheet(title, build, args):
+    """İşçide çalışır: sayfayı seri üretimdeki fonksiyonla doldurur ve XML'e çevirir"""
+    workbook = Workbook()
+    sheet = workbook.create_sheet(title)
+    build(sheet, _snapshot, *args)
+
+    writer = WorksheetWriter(sheet, out=BytesIO())
+    writer.write()
+    sheet_xml = writer.read()
+
+    # Yorumlar sayfa yazılırken toplanır
+    if not sheet._comments:
+        return SheetPart(sheet_xml)
+    comment_sheet = CommentSheet.from_comments(sheet._comments)
+    return SheetPart(sheet_xml, tostring(comment_sheet.to_tree()), comment_sheet.write_shapes())
+
+
+class _AssemblingWriter(ExcelWriter):
+    """İşçilerin ürettiği sayfaları olduğu gibi arşive yazar; diğer sayfalar (kapsam dışındaki dersler) normal yazılır"""
+
+    def __init__(self, workbook, archive, parts):
+        super().__init__(workbook, archive)
+        self.parts = parts  # id(sayfa) -> SheetPart
+
+    def write_worksheet(self, ws):
+        part = self.parts.get(id(ws))
+        if part is None:
+            return super().write_worksheet(ws)
+
+        ws._drawing = SpreadsheetDrawing()
+        ws._drawing.charts = ws._charts
+        ws._drawing.images = ws._images
+        ws._rels = RelationshipList()
+        # _write_comment'in çağrılması için yorum listesinin boş olmaması yeterlidir
+        ws._comments = [part] if part.comments_xml is not None else []
+        self._archive.writestr(ws.path[1:], part.sheet_xml)
+        self.manifest.append(ws)
+
+    def _write_comment(self, ws):
+        part = self.parts.get(id(ws))
+        if part is None:
+            return super()._write_comment(ws)
+
+        # Yalnızca dosya yolu ve içerik türü için; içerik işçide yazıldı
+        comment_sheet = CommentSheet(authors=AuthorList(), commentList=[])
+        self._comments.append(comment_sheet)
+        comment_sheet._id = len(self._comments)
+        self._archive.writestr(comment_sheet.path[1:], part.comments_xml)
+        self.manifest.append(comment_sheet)
+
+        ws.legacy_drawing = f"xl/drawings/commentsDrawing{comment_sheet._id}.vml"
+        self._archive.writestr(ws.legacy_drawing, part.vml)
+        self.vba_modified.add(ws.legacy_drawing)
+        ws._rels.append(Relationship(Id="comments", type=comment_sheet._rel_type, Target=comment_sheet.path))
+
+
+def _assemble(name, filename, plan, snapshot, lesson_ids, lookup, futures):
+    workbook = _open_workbook(filename, lesson_ids)
+    sheets = []
+    for (title, build, _), future in zip(plan, futures):
+        if build is None:
+            _remove_sheet(workbook, title)
+        else:
+            sheets.append((_create_sheet(workbook, title), future))
+    # Arama sayfası küçüktür, ana süreçte normal sayfa olarak yazılır
+    if name in OUTCOME_TEXTS:
+        _write_lookup_sheet(workbook, name, snapshot, lesson_ids, lookup)
+    _drop_default_sheet(workbook)
+
+    # Sayfa nesneleri listede tutulduğu için id'leri kaydetme boyunca tekildir
+    parts = {id(sheet): future.result() for sheet, future in sheets}
+    # workbook.save ile aynı adımlar, yalnızca yazıcı farklı
+    workbook.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    archive = ZipFile(filename, "w", ZIP_DEFLATED, allowZip64=True)
+    _AssemblingWriter(workbook, archive, parts).save()
+
+
+def create_reports_parallel(names, snapshot=None, lesson_ids=None, workers=None):
+    """REPORTS'taki raporları (ör. ["table1", "table2", "table3"]) ders sayfaları işçi süreçlerde oluşturularak üretir.
+    Bütün raporların sayfaları aynı havuza verilir, kitaplar verilen sırayla kaydedilir.
+    workers=1 ya da tek çekirdekli makinede seri üretim yapılır.
+    Büyük Tablo 4 / Tablo 5 kitapları (bkz. reports.STREAMING_ENROLLMENTS) işçilere verilmez, akış modunda yazılır."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    workers = workers or REPORT_WORKERS
+    if workers > 1 and openpyxl.__version__ != OPENPYXL_VERSION:
+        print(f"Parallel reports are verified with openpyxl {OPENPYXL_VERSION}, "
+              f"found {openpyxl.__version__}; writing reports serially.")
+        workers = 1
+    _create_reports(names, snapshot, lesson_ids, workers)
+
+
+def _create_reports(names, snapshot, lesson_ids, workers):
+    streaming = _use_streaming(snapshot, lesson_ids)
+
+    plans = []
+    for name in names:
+        filename, plan, lookup = _report_plan(name, snapshot, lesson_ids)
+        if plan is None:
+            continue
+        if streaming and name in STREAMED_REPORTS:
+            _stream_report(name, filename, plan, snapshot, lesson_ids, lookup)
+        else:
+            plans.append((name, filename, plan, lookup))
+
+    if workers <= 1:
+        for name, filename, plan, lookup in plans:
+            _write_report(filename, plan, snapshot, lesson_ids, name, lookup)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_MP_CONTEXT, initializer=_set_snapshot,
+                             initargs=(snapshot,)) as executor:
+        submitted = [
+            (name, filename, plan, lookup, [
+                executor.submit(_render_sheet, title, build, args) if build is not None else None
+                for title, build, args in plan
+            ])
+            for name, filename, plan, lookup in plans
+        ]
+        for name, filename, plan, lookup, futures in submitted:
+            _assemble(name, filename, plan, snapshot, lesson_ids, lookup, futures)
+
+
+def _archive_differences(serial_dir, parallel_dir, filenames):
+    differences = []
+    for filename in filenames:
+        serial_path = os.path.join(serial_dir, filename)
+        parallel_path = os.path.join(parallel_dir, filename)
+        if not os.path.exists(serial_path) and not os.path.exists(parallel_path):
+            continue
+        if not os.path.exists(serial_path) or not os.path.exists(parallel_path):
+            differences.append((filename, None))
+            continue
+
+        with ZipFile(serial_path) as serial, ZipFile(parallel_path) as parallel:
+            serial_parts = set(serial.namelist())
+            parallel_parts = set(parallel.namelist())
+            for part in sorted((serial_parts | parallel_parts) - _VOLATILE_PARTS):
+                if part not in serial_parts or part not in parallel_parts or serial.read(part) != parallel.read(part):
+                    differences.append((filename, part))
+    return differences
+
+
+def check_parallel_output(names, snapshot=None, lesson_ids=None, workers=2):
+    """Raporları geçici klasörlerde seri ve paralel üretip kitap arşivlerini parça parça karşılaştırır.
+    Farklı olan (dosya, arşiv parçası) listesini döndürür; dosya yalnızca birinde varsa parça None'dır.
+    Kapsamlı üretimde mevcut rapor dosyaları iki klasöre de kopyalanır. Çalışma dizini geçici olarak değiştirilir."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    filenames = [REPORTS[name][0] for name in names]
+
+    cwd = os.getcwd()
+    directories = []
+    try:
+        for count in (1, max(workers, 2)):
+            directory = tempfile.mkdtemp()
+            directories.append(directory)
+            for filename in filenames:
+                if os.path.exists(filename):
+                    shutil.copy(filename, directory)
+            os.chdir(directory)
+            try:
+                _create_reports(names, snapshot, lesson_ids, count)
+            finally:
+                os.chdir(cwd)
+        return _archive_differences(*directories, filenames)
+    finally:
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,162 @@
+import pyodbc
+
+from bulk_write import bulk_insert
+from change_journal import record_change
+from connection_pool import get_connection
+
+# İlişki matrisi tabloları: (satır anahtarı, sütun anahtarı, anahtar tipleri, değer tipi, geçerli değer kontrolü)
+RELATION_TABLES = {
+    "ProgramCourseRelations": {
+        "keys": ("ProgramOutcomeID", "CourseOutcomeID"),
+        "key_types": ("INT", "INT"),
+        "value_type": "FLOAT",
+        "valid_value": lambda value: 0 <= value <= 1,
+        "value_message": "between 0 and 1",
+    },
+    "CourseEvaluationRelations": {
+        "keys": ("CourseOutcomeID", "Criteria"),
+        "key_types": ("INT", "NVARCHAR(25)"),
+        "value_type": "INT",
+        "valid_value": lambda value: value in (0, 1),
+        "value_message": "0 or 1",
+    },
+}
+
+# Dersin geçerli anahtarları tek batch ile okunur
+LESSON_KEYS_QUERY = """
+    SET NOCOUNT ON;
+    SELECT id FROM ProgramOutcomes WHERE LessonID = ?;
+    SELECT id FROM CourseOutcomes WHERE LessonID = ?;
+    SELECT Criteria FROM EvaluationCriteria WHERE LessonID = ?;
+"""
+
+
+class RelationMatrixError(ValueError):
+    """Matris doğrulanamadı; errors hücre bazında hata mesajlarını içerir"""
+
+    def __init__(self, table_name, lesson_id, errors):
+        self.errors = errors
+        super().__init__(
+            f"{len(errors)} invalid cells for {table_name}, Lesson ID {lesson_id}:\n" + "\n".join(errors)
+        )
+
+
+def _lesson_keys(cursor, lesson_id):
+    cursor.execute(LESSON_KEYS_QUERY, lesson_id, lesson_id, lesson_id)
+    program_outcomes = {row[0] for row in cursor.fetchall()}
+    cursor.nextset()
+    course_outcomes = {row[0] for row in cursor.fetchall()}
+    cursor.nextset()
+    criteria = {row[0] for row in cursor.fetchall()}
+    return {
+        "ProgramOutcomeID": program_outcomes,
+        "CourseOutcomeID": course_outcomes,
+        "Criteria": criteria,
+    }
+
+
+def _cells(matrix):
+    """{(satır, sütun): değer} sözlüğünü ya da (satır, sütun, değer) üçlülerini kabul eder"""
+    if isinstance(matrix, dict):
+        return [(row, column, value) for (row, column), value in matrix.items()]
+    return [tuple(cell) for cell in matrix]
+
+
+def validate_relation_matrix(table_name, lesson_keys, cells):
+    """Hücreleri tek geçişte doğrular; (temiz hücreler, hata mesajları) döndürür"""
+    spec = RELATION_TABLES[table_name]
+    row_key, column_key = spec["keys"]
+    errors = []
+    clean = {}
+
+    for row, column, value in cells:
+        try:
+            row = int(row) if spec["key_types"][0] == "INT" else str(row).strip()
+            column = int(column) if spec["key_types"][1] == "INT" else str(column).strip()
+            value = float(value)
+        except (TypeError, ValueError):
+            errors.append(f"({row}, {column}): not a valid number")
+            continue
+
+        if row not in lesson_keys[row_key]:
+            errors.append(f"({row}, {column}): {row_key} {row} does not belong to this lesson")
+        elif column not in lesson_keys[column_key]:
+            errors.append(f"({row}, {column}): {column_key} {column} does not belong to this lesson")
+        elif not spec["valid_value"](value):
+            errors.append(f"({row}, {column}): value {value} must be {spec['value_message']}")
+        else:
+            # Aynı hücre birden fazla verilmişse sonuncusu geçerlidir
+            clean[(row, column)] = value if spec["value_type"] == "FLOAT" else int(value)
+
+    return clean, errors
+
+
+def upsert_relation_matrix(cursor, table_name, lesson_id, matrix):
+    """Matrisi doğrulayıp verilen cursor üzerinden MERGE ile yazar; transaction'ı çağıran yönetir.
+    Herhangi bir hücre geçersizse hiçbir şey yazılmaz ve RelationMatrixError fırlatılır.
+    Yazılan hücre sayısını döndürür."""
+    if table_name not in RELATION_TABLES:
+        raise ValueError(f"Unknown relation table: {table_name}")
+    spec = RELATION_TABLES[table_name]
+    row_key, column_key = spec["keys"]
+    lesson_id = int(lesson_id)
+
+    clean, errors = validate_relation_matrix(table_name, _lesson_keys(cursor, lesson_id), _cells(matrix))
+    if errors:
+        raise RelationMatrixError(table_name, lesson_id, errors)
+    if not clean:
+        return 0
+
+    # Hücreler geçici tabloya toplu yüklenir, tek MERGE ile hedefe yazılır.
+    # Havuzdaki bağlantı oturumu korur; önceki çağrıdan kalan tablo varsa silinir.
+    cursor.execute(f"""
+        IF OBJECT_ID(N'tempdb..#RelationCells', N'U') IS NOT NULL DROP TABLE #RelationCells;
+        CREATE TABLE #RelationCells (
+            {row_key} {spec["key_types"][0]} NOT NULL,
+            {column_key} {spec["key_types"][1]} NOT NULL,
+            RelationValue {spec["value_type"]} NOT NULL,
+            PRIMARY KEY ({row_key}, {column_key})
+        );
+    """)
+    bulk_insert(
+        cursor, "#RelationCells", [row_key, column_key, "RelationValue"],
+        ((row, column, value) for (row, column), value in clean.items()),
+    )
+    cursor.execute(f"""
+        MERGE {table_name} AS target
+        USING #RelationCells AS source
+            ON target.{row_key} = source.{row_key}
+           AND target.{column_key} = source.{column_key}
+           AND target.LessonID = ?
+        WHEN MATCHED THEN
+            UPDATE SET RelationValue = source.RelationValue
+        WHEN NOT MATCHED THEN
+            INSERT ({row_key}, {column_key}, RelationValue, LessonID)
+            VALUES (source.{row_key}, source.{column_key}, source.RelationValue, ?);
+    """, lesson_id, lesson_id)
+    cursor.execute("DROP TABLE #RelationCells;")
+
+    record_change(cursor, lesson_id, table_name)
+    return len(clean)
+
+
+def save_relation_matrix(table_name, lesson_id, matrix):
+    """Bir dersin ilişki matrisini (tamamı ya da bir kısmı) tek transaction içinde yazar.
+    Var olan hücreler güncellenir, olmayanlar eklenir. Herhangi bir hücre geçersizse hiçbir şey yazılmaz
+    ve RelationMatrixError fırlatılır. Yazılan hücre sayısını döndürür."""
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+
+    try:
+        written = upsert_relation_matrix(cursor, table_name, lesson_id, matrix)
+        conn.commit()
+    except pyodbc.Error:
+        conn.rollback()
+        print(f"Saving {table_name} matrix failed for Lesson ID {lesson_id}.")
+        raise
+    finally:
+        conn.close()
+
+    print(f"{written} cells of {table_name} saved for Lesson ID {lesson_id}.")
+    return written
@@ -0,0 +1,118 @@
+from matrix_engine import LessonMatrices
+
+# Tablo 1-5 sonuç satırları. Bu modül veritabanına ve Excel'e dokunmaz:
+# girdi bir ders kaydıdır (snapshot.LessonSnapshot ya da aynı alanlara sahip herhangi bir nesne:
+# program_outcomes, course_outcomes, program_course_relations, evaluation_criteria,
+# course_evaluation_relations, students, table3, table4), çıktı düz Python değerlerinden oluşan satırlardır.
+# reports.py'deki Excel / veritabanı fonksiyonları bu satırları yalnızca yazar.
+
+
+def table1_rows(lesson):
+    """[(program_outcome_id, ortalama ilişki)]; değerler 2 basamağa yuvarlanmıştır"""
+    matrices = LessonMatrices(lesson)
+    if not matrices.course_ids:
+        return [(program_id, 0) for program_id in matrices.program_ids]
+    averages = matrices.table1_averages()
+    return [(program_id, round(float(average), 2)) for program_id, average in zip(matrices.program_ids, averages)]
+
+
+def table2_rows(lesson):
+    """[(course_outcome_id, ilişki toplamı)]; RelationValue INT olduğundan toplam tamsayı olarak döner"""
+    matrices = LessonMatrices(lesson)
+    return [(course_id, int(total)) for course_id, total in zip(matrices.course_ids, matrices.table2_totals())]
+
+
+def table3_rows(lesson, criteria=None):
+    """Dersin (course_outcome_id, total_score) ve (course_outcome_id, kriter, ağırlıklı değer) satırları.
+    criteria verilirse yalnızca o kriterler, o sırayla kullanılır (toplam da o sırayla alınır)."""
+    matrices = LessonMatrices(lesson)
+    weighted = matrices.table3_weighted()
+    criteria_index = {name: index for index, name in enumerate(matrices.criteria)}
+
+    total_rows = []
+    criteria_rows = []
+    if criteria is None:
+        totals = matrices.table3_totals()
+        for row, course_outcome_id in enumerate(matrices.course_ids):
+            for column, name in enumerate(matrices.criteria):
+                criteria_rows.append((course_outcome_id, name, float(weighted[row, column])))
+            total_rows.append((course_outcome_id, float(totals[row])))
+        return total_rows, criteria_rows
+
+    for row, course_outcome_id in enumerate(matrices.course_ids):
+        total = 0
+        for name in criteria:
+            value = float(weighted[row, criteria_index[name]])
+            criteria_rows.append((course_outcome_id, name, value))
+            total += value
+        total_rows.append((course_outcome_id, total))
+    return total_rows, criteria_rows
+
+
+def note_rows(lesson):
+    """[(student_id, [kriter notları], ağırlıklı ortalama)]; eksik not 0 yazılır, ortalama 2 basamak"""
+    matrices = LessonMatrices(lesson)
+    averages = matrices.note_averages()
+    rows = []
+    for (student_id, scores), average in zip(lesson.students, averages):
+        values = [scores.get(criteria) if scores.get(criteria) is not None else 0 for criteria in matrices.criteria]
+        rows.append((student_id, values, round(float(average), 2)))
+    return rows
+
+
+class Table4Result:
+    """Bir dersin bütün öğrencileri için Tablo 4 dizileri; satırlar öğrenci bazında istenir"""
+
+    def __init__(self, lesson):
+        matrices = LessonMatrices(lesson)
+        self.course_ids = matrices.course_ids
+        self.weighted = matrices.table4_weighted()
+        self.totals = matrices.table4_totals(self.weighted)
+        self.max_scores = matrices.table4_max_scores()
+        self.success_rates = matrices.table4_success_rates(self.totals)
+        self.student_index = {student_id: index for index, student_id in enumerate(matrices.student_ids)}
+
+    def rows(self, student_id):
+        """[(course_outcome_id, [kriter başına ağırlıklı not], total, max, başarı %)]; başarı 1 basamak"""
+        index = self.student_index[student_id]
+        return [
+            (
+                course_id,
+                [float(value) for value in self.weighted[index, column]],
+                float(self.totals[index, column]),
+                float(self.max_scores[column]),
+                round(float(self.success_rates[index, column]), 1),
+            )
+            for column, course_id in enumerate(self.course_ids)
+        ]
+
+
+def table4_rows(lesson, student_ids=None):
+    """Table4 tablosunun (student_id, course_outcome_id, total_score, max_score, success_rate) satırları.
+    student_ids verilmezse dersin bütün öğrencileri, ders sırasıyla."""
+    result = Table4Result(lesson)
+    if student_ids is None:
+        student_ids = [student_id for student_id, _ in lesson.students]
+    return [
+        (student_id, course_id, total, max_score, success_rate)
+        for student_id in student_ids
+        for course_id, _, total, max_score, success_rate in result.rows(student_id)
+    ]
+
+
+def table5_rows(lesson):
+    """[(student_id, program_outcome_id, [ders çıktısı başına ağırlıklı başarı], oran)]; değerler 1 basamak.
+    Başarı oranları lesson.table4'ten okunur."""
+    matrices = LessonMatrices(lesson)
+    weighted = matrices.table5_weighted()
+    ratios = matrices.table5_ratios(weighted)
+    return [
+        (
+            student_id,
+            program_id,
+            [round(float(value), 1) for value in weighted[student_index, program_index]],
+            round(float(ratios[student_index, program_index]), 1),
+        )
+        for student_index, student_id in enumerate(matrices.student_ids)
+        for program_index, program_id in enumerate(matrices.program_ids)
+    ]
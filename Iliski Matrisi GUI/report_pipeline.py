@@ -0,0 +1,280 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from columnar_export import EXPORT_DIR, export_lessons
+from connection_pool import get_connection
+from parallel_reports import create_reports_parallel
+from report_store import (
+    FINGERPRINT_STAGE_LENGTH, LESSON_LEVEL, fingerprint, load_fingerprints, save_fingerprints,
+)
+from report_views import refresh_table5
+from reports import REPORTS, save_table3_to_database, save_table4_to_database
+
+# Tablo 1-5 üretimi bağımlılıkları tanımlı aşamalardan oluşur; bağımsız aşamalar aynı anda çalışır.
+# Yalnızca Tablo 4 Table3'e, Tablo 5 Table4'e bağlıdır (veritabanına yazılmış değerler snapshot'a da işlenir).
+# Aynı anda çalışacak aşama sayısı; her aşama havuzdan en fazla bir bağlantı kullanır (connection_pool.max_size)
+STAGE_WORKERS = 3
+
+# save_table4 aşamasının Table4 motoru (bkz. reports.save_table4_to_database):
+# "python" yalnızca değişen öğrencilerin satırlarını yazar; "sql" kapsamı veritabanında tek INSERT ... SELECT ile
+# yeniden hesaplar (notlar istemciye indirilmez, büyük ve çoğu değişmiş kapsamlarda daha hızlıdır).
+TABLE4_ENGINE = "python"
+
+
+class PipelineStage:
+    """Bir üretim aşaması. run(snapshot, lesson_ids) çalıştırılır.
+    inputs(lesson) verilirse aşama, girdileri son çalıştırmadan beri değişen derslerle sınırlanır
+    (hiçbiri değişmediyse atlanır); output dosyası yoksa kapsam daraltılmaz."""
+
+    def __init__(self, name, run, depends=(), inputs=None, output=None):
+        if len(f"x:{name}") > FINGERPRINT_STAGE_LENGTH:
+            raise ValueError(f"Stage name {name!r} is longer than {FINGERPRINT_STAGE_LENGTH - 2} characters.")
+        self.name = name
+        self.run = run
+        self.depends = tuple(depends)
+        self.inputs = inputs
+        self.output = output
+
+    @property
+    def fingerprint_stage(self):
+        # Önek, Table3 / Table4'ün kendi parmak izleriyle karışmasını önler
+        return f"x:{self.name}"
+
+
+class PipelineRun:
+    """Aşamaların zamanlaması: {ad: (başlangıç, bitiş)}, atlananlar, her aşamanın çalıştığı kapsam"""
+
+    def __init__(self):
+        self.timings = {}
+        self.skipped = set()
+        self.scopes = {}
+        self.wall_time = 0.0
+
+    def duration(self, name):
+        start, end = self.timings.get(name, (0.0, 0.0))
+        return end - start
+
+    def critical_path(self, stages):
+        """Bağımlılık zinciri boyunca süreleri toplamı en büyük aşama dizisi: (aşamalar, toplam süre)"""
+        finish = {}
+        previous = {}
+        for stage in stages:
+            before = max(stage.depends, key=lambda name: finish[name], default=None)
+            finish[stage.name] = (finish[before] if before else 0.0) + self.duration(stage.name)
+            previous[stage.name] = before
+
+        name = max(finish, key=finish.get, default=None)
+        total = finish.get(name, 0.0)
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1], total
+
+    def summary(self, stages):
+        lines = []
+        for stage in stages:
+            if stage.name in self.skipped:
+                lines.append(f"  {stage.name:<14} skipped (inputs unchanged)")
+                continue
+            scope = self.scopes.get(stage.name)
+            scope_text = "all lessons" if scope is None else f"lessons {sorted(scope)}"
+            lines.append(f"  {stage.name:<14} {self.duration(stage.name):7.2f} s  {scope_text}")
+        path, total = self.critical_path(stages)
+        lines.append(f"Critical path: {' -> '.join(path)} ({total:.2f} s of {self.wall_time:.2f} s wall time)")
+        return "\n".join(lines)
+
+
+def _lesson_candidates(snapshot, lesson_ids):
+    lessons = set(snapshot.lesson_names) | set(snapshot.student_lesson_ids())
+    return lessons if lesson_ids is None else lessons & lesson_ids
+
+
+def _stage_scope(stage, snapshot, lesson_ids):
+    """Aşamanın çalışacağı kapsam ve kaydedilecek parmak izleri: (kapsam, {ders: parmak izi}, silinecek dersler).
+    Kapsam False ise aşama atlanır."""
+    current = {
+        lesson_id: stage.inputs(snapshot.lesson(lesson_id))
+        for lesson_id in _lesson_candidates(snapshot, lesson_ids)
+    }
+
+    conn = get_connection("RelationMatrix")
+    cursor = conn.cursor()
+    stored = load_fingerprints(cursor, stage.fingerprint_stage, lesson_ids)
+    conn.close()
+
+    removed = {lesson_id for lesson_id, _ in stored} - set(current)
+    changed = {
+        lesson_id for lesson_id, value in current.items()
+        if stored.get((lesson_id, LESSON_LEVEL)) != value
+    }
+    # İlk çalıştırmada, dosya yoksa ya da ders silinmişse aşama verilen kapsamla (eski sayfalar temizlenerek) çalışır
+    if not stored or removed or (stage.output and not os.path.exists(stage.output)) or changed == set(current):
+        return lesson_ids, current, removed
+    if not changed:
+        return False, current, removed
+    return changed, {lesson_id: current[lesson_id] for lesson_id in changed}, removed
+
+
+def _save_stage_fingerprints(stage, fingerprints, removed):
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+    try:
+        for lesson_id in removed:
+            save_fingerprints(cursor, stage.fingerprint_stage, lesson_id, {})
+        for lesson_id, value in fingerprints.items():
+            save_fingerprints(cursor, stage.fingerprint_stage, lesson_id, {LESSON_LEVEL: value})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _run_stage(stage, snapshot, lesson_ids, run):
+    start = time.perf_counter()
+    fingerprints = removed = None
+    scope = lesson_ids
+    if stage.inputs is not None:
+        scope, fingerprints, removed = _stage_scope(stage, snapshot, lesson_ids)
+
+    if scope is False:
+        run.skipped.add(stage.name)
+    else:
+        stage.run(snapshot, scope)
+        run.scopes[stage.name] = scope
+        if fingerprints is not None:
+            _save_stage_fingerprints(stage, fingerprints, removed)
+    run.timings[stage.name] = (start, time.perf_counter())
+
+
+def run_pipeline(stages, snapshot, lesson_ids=None, max_workers=None):
+    """Aşamaları bağımlılık sırasına uyarak çalıştırır; bağımlılıkları bitmiş aşamalar aynı anda başlar.
+    Bir aşama hata verirse yeni aşama başlatılmaz, çalışanlar beklenir ve hata yeniden fırlatılır."""
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = [name for name in stage.depends if name not in names]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(missing)}")
+
+    run = PipelineRun()
+    pending = list(stages)
+    done = set()
+    running = {}
+    error = None
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers or STAGE_WORKERS, thread_name_prefix="report-stage") as executor:
+        while pending or running:
+            if error is None:
+                for stage in [stage for stage in pending if set(stage.depends) <= done]:
+                    pending.remove(stage)
+                    running[executor.submit(_run_stage, stage, snapshot, lesson_ids, run)] = stage
+            if not running:
+                if error is None:
+                    raise ValueError(f"Stages have circular dependencies: {', '.join(s.name for s in pending)}")
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    future.result()
+                    done.add(stage.name)
+                except Exception as e:
+                    print(f"Report stage {stage.name} failed: {e}")
+                    error = error or e
+
+    run.wall_time = time.perf_counter() - started
+    if error is not None:
+        raise error
+    return run
+
+
+def _workbook_stage(name, workers):
+    return lambda snapshot, lesson_ids: create_reports_parallel([name], snapshot, lesson_ids, workers)
+
+
+def _save_table3(snapshot, lesson_ids):
+    save_table3_to_database(snapshot, lesson_ids=lesson_ids)
+
+
+def _save_table4(snapshot, lesson_ids):
+    save_table4_to_database(snapshot, lesson_ids=lesson_ids, engine=TABLE4_ENGINE)
+
+
+def _refresh_table5(snapshot, lesson_ids):
+    refresh_table5(lesson_ids)
+
+
+def _export(snapshot, lesson_ids):
+    export_lessons(snapshot, lesson_ids)
+
+
+# Aşamaların girdileri; ders adı sayfa adı ve başlığında kullanıldığı için hepsine eklenir
+def _table1_inputs(lesson):
+    return fingerprint(lesson.name, lesson.program_outcomes, lesson.course_outcomes,
+                       sorted(lesson.program_course_relations))
+
+
+def _table2_inputs(lesson):
+    return fingerprint(lesson.name, lesson.course_outcomes, lesson.evaluation_criteria,
+                       sorted(lesson.course_evaluation_relations))
+
+
+def _notes_inputs(lesson):
+    return fingerprint(lesson.name, lesson.evaluation_criteria,
+                       [(student_id, sorted(scores.items())) for student_id, scores in lesson.students])
+
+
+def _table4_inputs(lesson):
+    return fingerprint(_table2_inputs(lesson), sorted(lesson.table3.items()),
+                       [(student_id, sorted(scores.items())) for student_id, scores in lesson.students])
+
+
+def _table5_inputs(lesson):
+    return fingerprint(_table1_inputs(lesson), [student_id for student_id, _ in lesson.students],
+                       sorted(lesson.table4.items()))
+
+
+def _export_inputs(lesson):
+    # Tablo 4 girdileri Tablo 2 / not girdilerini, Tablo 5 girdileri Tablo 1 girdilerini kapsar
+    return fingerprint(_table4_inputs(lesson), _table5_inputs(lesson))
+
+
+def report_stages(workers=1):
+    """Tablo 1-5 ve not çıktılarının aşamaları; workers Excel sayfalarını oluşturan işçi süreç sayısıdır"""
+    return [
+        PipelineStage("table1", _workbook_stage("table1", workers), inputs=_table1_inputs,
+                      output=REPORTS["table1"][0]),
+        PipelineStage("table2", _workbook_stage("table2", workers), inputs=_table2_inputs,
+                      output=REPORTS["table2"][0]),
+        # Tablo 3 sayfası Tablo 2 ile aynı girdilerden hesaplanır
+        PipelineStage("table3", _workbook_stage("table3", workers), inputs=_table2_inputs,
+                      output=REPORTS["table3"][0]),
+        PipelineStage("notes", _workbook_stage("notes", workers), inputs=_notes_inputs,
+                      output=REPORTS["notes"][0]),
+        # Veritabanı aşamaları kendi parmak izleriyle zaten yalnızca değişen satırları yazar
+        PipelineStage("save_table3", _save_table3),
+        PipelineStage("table4", _workbook_stage("table4", workers), depends=["save_table3"],
+                      inputs=_table4_inputs, output=REPORTS["table4"][0]),
+        PipelineStage("save_table4", _save_table4, depends=["save_table3"]),
+        PipelineStage("table5", _workbook_stage("table5", workers), depends=["save_table4"],
+                      inputs=_table5_inputs, output=REPORTS["table5"][0]),
+        PipelineStage("refresh_table5", _refresh_table5, depends=["save_table4"]),
+        # Sütunlu dosyalar bütün tabloları içerir; Table3 / Table4 yazıldıktan sonra üretilir
+        PipelineStage("export", _export, depends=["save_table4"], inputs=_export_inputs, output=EXPORT_DIR),
+    ]
+
+
+def run_report_pipeline(snapshot, lesson_ids=None, workers=1, max_workers=None):
+    """Rapor aşamalarını çalıştırır ve zamanlama özetini (kritik yol dahil) yazdırır; PipelineRun döndürür.
+    workers toplam işçi süreç sayısıdır: aynı anda çalışan kitap aşamaları arasında bölünür."""
+    stages = report_stages(max(1, workers // (max_workers or STAGE_WORKERS)))
+    run = run_pipeline(stages, snapshot, lesson_ids, max_workers)
+    print("Report stages:")
+    print(run.summary(stages))
+    return run
@@ -0,0 +1,169 @@
+import hashlib
+
+from bulk_write import bulk_insert
+from snapshot import load_scope, scope_condition
+
+# Table3 / Table4 artık her çalıştırmada silinip yeniden oluşturulmaz; şema kalıcıdır.
+# Eski (id IDENTITY + kriter sütunlu) Table3 / Table4 bir kez kaldırılır, içerik yeniden hesaplanır.
+REPORT_TABLES_DDL = [
+    """
+    IF OBJECT_ID(N'dbo.Table3', N'U') IS NOT NULL AND COL_LENGTH('dbo.Table3', 'id') IS NOT NULL
+        DROP TABLE Table3;
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Table4', N'U') IS NOT NULL AND COL_LENGTH('dbo.Table4', 'id') IS NOT NULL
+        DROP TABLE Table4;
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Table3', N'U') IS NULL
+    CREATE TABLE Table3 (
+        lesson_id INT NOT NULL,
+        course_outcome_id INT NOT NULL,
+        total_score FLOAT NOT NULL,
+        PRIMARY KEY (lesson_id, course_outcome_id)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Table3Criteria', N'U') IS NULL
+    CREATE TABLE Table3Criteria (
+        lesson_id INT NOT NULL,
+        course_outcome_id INT NOT NULL,
+        criteria NVARCHAR(25) NOT NULL,
+        weighted_value FLOAT NOT NULL,
+        PRIMARY KEY (lesson_id, course_outcome_id, criteria)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Table4', N'U') IS NULL
+    CREATE TABLE Table4 (
+        student_id INT NOT NULL,
+        lesson_id INT NOT NULL,
+        course_outcome_id INT NOT NULL,
+        total_score FLOAT NOT NULL,
+        max_score FLOAT,
+        success_rate FLOAT,
+        PRIMARY KEY (lesson_id, student_id, course_outcome_id)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.ReportFingerprints', N'U') IS NULL
+    CREATE TABLE ReportFingerprints (
+        stage VARCHAR(10) NOT NULL,
+        lesson_id INT NOT NULL,
+        student_id INT NOT NULL,
+        fingerprint CHAR(40) NOT NULL,
+        PRIMARY KEY (stage, lesson_id, student_id)
+    );
+    """,
+]
+
+# Ders düzeyindeki parmak izleri student_id = 0 ile saklanır
+LESSON_LEVEL = 0
+
+# ReportFingerprints.stage uzunluğu; ilk sürümde VARCHAR(10) idi, widen_fingerprint_stage genişletir
+FINGERPRINT_STAGE_LENGTH = 40
+
+# Sütun birincil anahtarın parçası olduğu için anahtar kaldırılıp sütun genişletildikten sonra yeniden eklenir
+WIDEN_FINGERPRINT_STAGE = f"""
+    IF COL_LENGTH('dbo.ReportFingerprints', 'stage') < {FINGERPRINT_STAGE_LENGTH}
+    BEGIN
+        DECLARE @primary_key SYSNAME = (
+            SELECT name FROM sys.key_constraints
+            WHERE parent_object_id = OBJECT_ID(N'dbo.ReportFingerprints') AND type = 'PK'
+        );
+        EXEC(N'ALTER TABLE ReportFingerprints DROP CONSTRAINT ' + QUOTENAME(@primary_key));
+        ALTER TABLE ReportFingerprints ALTER COLUMN stage VARCHAR({FINGERPRINT_STAGE_LENGTH}) NOT NULL;
+        ALTER TABLE ReportFingerprints
+            ADD CONSTRAINT PK_ReportFingerprints PRIMARY KEY (stage, lesson_id, student_id);
+    END
+"""
+
+
+def ensure_report_tables(cursor):
+    for statement in REPORT_TABLES_DDL:
+        cursor.execute(statement)
+
+
+def widen_fingerprint_stage(cursor):
+    cursor.execute(WIDEN_FINGERPRINT_STAGE)
+
+
+def drop_table3_criteria(cursor):
+    # Kriter bazındaki ağırlıklı değerler hiçbir yerde okunmuyordu; raporlar onları snapshot'tan hesaplar
+    cursor.execute("IF OBJECT_ID(N'dbo.Table3Criteria', N'U') IS NOT NULL DROP TABLE Table3Criteria;")
+
+
+def fingerprint(*parts):
+    """Girdilerin değişip değişmediğini anlamak için kararlı bir özet üretir"""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def table3_fingerprint(lesson):
+    return fingerprint(
+        sorted(lesson.evaluation_criteria),
+        [outcome_id for outcome_id, _ in lesson.course_outcomes],
+        sorted(lesson.course_evaluation_relations),
+    )
+
+
+def table4_fingerprints(lesson):
+    """Dersin her öğrencisi için {student_id: parmak izi}; ders girdileri değişirse hepsi değişir"""
+    lesson_part = fingerprint(
+        sorted(lesson.evaluation_criteria),
+        [outcome_id for outcome_id, _ in lesson.course_outcomes],
+        sorted(lesson.course_evaluation_relations),
+        sorted(lesson.table3.items()),
+    )
+    criteria = sorted(criteria for criteria, _ in lesson.evaluation_criteria)
+    return {
+        student_id: fingerprint(lesson_part, [scores.get(criterion) for criterion in criteria])
+        for student_id, scores in lesson.students
+    }
+
+
+def load_fingerprints(cursor, stage, lesson_ids=None):
+    """Saklanan parmak izlerini {(lesson_id, student_id): parmak izi} olarak döndürür"""
+    query = "SELECT lesson_id, student_id, fingerprint FROM ReportFingerprints WHERE stage = ?"
+    params = [stage]
+    if lesson_ids is not None:
+        if not lesson_ids:
+            return {}
+        load_scope(cursor, lesson_ids)
+        query += f" AND {scope_condition('lesson_id', lesson_ids)}"
+
+    cursor.execute(query + ";", *params)
+    return {(lesson_id, student_id): value for lesson_id, student_id, value in cursor.fetchall()}
+
+
+def delete_rows(cursor, table_name, lesson_id, student_ids=None):
+    """Dersin satırlarını siler; student_ids verilirse yalnızca o öğrencilerinkini"""
+    if student_ids is None:
+        cursor.execute(f"DELETE FROM {table_name} WHERE lesson_id = ?;", lesson_id)
+        return
+
+    student_ids = list(student_ids)
+    if student_ids:
+        cursor.fast_executemany = True
+        cursor.executemany(
+            f"DELETE FROM {table_name} WHERE lesson_id = ? AND student_id = ?;",
+            [(lesson_id, student_id) for student_id in student_ids],
+        )
+
+
+def save_fingerprints(cursor, stage, lesson_id, fingerprints, student_ids=None):
+    """Dersin student_ids için saklanan parmak izlerini (None ise hepsini) siler, {student_id: parmak izi} kayıtlarını ekler"""
+    if student_ids is None:
+        cursor.execute("DELETE FROM ReportFingerprints WHERE stage = ? AND lesson_id = ?;", stage, lesson_id)
+    else:
+        student_ids = list(student_ids)
+        if student_ids:
+            cursor.fast_executemany = True
+            cursor.executemany(
+                "DELETE FROM ReportFingerprints WHERE stage = ? AND lesson_id = ? AND student_id = ?;",
+                [(stage, lesson_id, student_id) for student_id in student_ids],
+            )
+
+    bulk_insert(
+        cursor, "ReportFingerprints", ["stage", "lesson_id", "student_id", "fingerprint"],
+        ((stage, lesson_id, student_id, value) for student_id, value in fingerprints.items()),
+    )
@@ -0,0 +1,130 @@
+import pyodbc
+
+from connection_pool import get_connection
+from snapshot import load_scope, normalize_lesson_ids, scope_condition
+
+# Şema sürüm 6'da Table3View indexed view olarak (unique clustered index) oluşturulur; sürüm 9 kaldırır
+MATERIALIZE_VIEWS = True
+
+# Table3: her ders çıktısı için kriter ağırlıklarıyla çarpılmış ilişki toplamı.
+# İlişkisi olmayan ders çıktıları view'da yer almaz, okuyucular 0 kabul eder.
+TABLE3_VIEW = """
+    CREATE VIEW dbo.Table3View WITH SCHEMABINDING AS
+    SELECT cer.LessonID AS lesson_id,
+           cer.CourseOutcomeID AS course_outcome_id,
+           SUM(CAST(cer.RelationValue AS FLOAT) * ec.Weight / 100) AS total_score,
+           COUNT_BIG(*) AS relation_count
+    FROM dbo.CourseEvaluationRelations cer
+    JOIN dbo.EvaluationCriteria ec ON ec.LessonID = cer.LessonID AND ec.Criteria = cer.Criteria
+    GROUP BY cer.LessonID, cer.CourseOutcomeID
+"""
+
+TABLE3_VIEW_INDEX = """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Table3View' AND object_id = OBJECT_ID(N'dbo.Table3View'))
+    CREATE UNIQUE CLUSTERED INDEX IX_Table3View ON dbo.Table3View (lesson_id, course_outcome_id);
+"""
+
+# Table5: öğrencinin her program çıktısındaki başarısı.
+# create_table5'teki ortalama(ilişki * başarı) / ortalama(ilişki) oranı, toplamların oranına eşittir.
+TABLE5_VIEW = """
+    CREATE VIEW dbo.Table5View AS
+    SELECT s.Student AS student_id,
+           s.lesson_id,
+           po.id AS program_outcome_id,
+           CASE WHEN SUM(COALESCE(pcr.RelationValue, 0)) <> 0
+                THEN SUM(COALESCE(pcr.RelationValue * t4.success_rate, 0)) / SUM(COALESCE(pcr.RelationValue, 0))
+                ELSE 0 END AS success_rate
+    FROM dbo.Students s
+    JOIN dbo.ProgramOutcomes po ON po.LessonID = s.lesson_id
+    LEFT JOIN (dbo.ProgramCourseRelations pcr
+               JOIN dbo.CourseOutcomes co ON co.id = pcr.CourseOutcomeID AND co.LessonID = pcr.LessonID)
+        ON pcr.LessonID = s.lesson_id AND pcr.ProgramOutcomeID = po.id
+    LEFT JOIN dbo.Table4 t4
+        ON t4.lesson_id = s.lesson_id AND t4.student_id = s.Student AND t4.course_outcome_id = pcr.CourseOutcomeID
+    GROUP BY s.Student, s.lesson_id, po.id
+"""
+
+# Table5View'ın kalıcı kopyası; ders ya da öğrenci bazında indeksli okunur
+TABLE5_SUMMARY_DDL = [
+    """
+    IF OBJECT_ID(N'dbo.Table5', N'U') IS NULL
+    CREATE TABLE Table5 (
+        student_id INT NOT NULL,
+        lesson_id INT NOT NULL,
+        program_outcome_id INT NOT NULL,
+        success_rate FLOAT NOT NULL,
+        PRIMARY KEY (lesson_id, student_id, program_outcome_id)
+    );
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Table5_student' AND object_id = OBJECT_ID(N'dbo.Table5'))
+    CREATE NONCLUSTERED INDEX IX_Table5_student ON Table5 (student_id) INCLUDE (program_outcome_id, success_rate);
+    """,
+]
+
+
+def _create_view(cursor, name, definition):
+    # CREATE VIEW batch'in tek komutu olmalıdır, bu yüzden EXEC ile gönderilir
+    cursor.execute(f"""
+        IF OBJECT_ID(N'dbo.{name}', N'V') IS NULL
+        EXEC(N'{definition.replace("'", "''")}');
+    """)
+
+
+# Table3 raporları Python'da hesaplanıp Table3 tablosuna yazıldığı için Table3View okunmuyordu;
+# Table5 de ders bazında yenilenir, öğrenci bazında okunmaz
+DROP_UNUSED_VIEW_OBJECTS = [
+    "IF OBJECT_ID(N'dbo.Table3View', N'V') IS NOT NULL DROP VIEW dbo.Table3View;",
+    """
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Table5_student' AND object_id = OBJECT_ID(N'dbo.Table5'))
+    DROP INDEX IX_Table5_student ON Table5;
+    """,
+]
+
+
+def ensure_report_views(cursor, materialize=None):
+    """Table3View, Table5View ve Table5 özet tablosunu oluşturur (Students ve Table4 önceden oluşturulmuş olmalı)"""
+    materialize = MATERIALIZE_VIEWS if materialize is None else materialize
+
+    _create_view(cursor, "Table3View", TABLE3_VIEW)
+    if materialize:
+        cursor.execute(TABLE3_VIEW_INDEX)
+
+    for statement in TABLE5_SUMMARY_DDL:
+        cursor.execute(statement)
+    _create_view(cursor, "Table5View", TABLE5_VIEW)
+
+
+def drop_unused_view_objects(cursor):
+    for statement in DROP_UNUSED_VIEW_OBJECTS:
+        cursor.execute(statement)
+
+
+def _lesson_filter(column, lesson_ids):
+    condition = scope_condition(column, lesson_ids)
+    return "" if condition is None else f" WHERE {condition}"
+
+
+def refresh_table5(lesson_ids=None):
+    """Kapsamdaki derslerin Table5 satırlarını Table5View'dan tek transaction içinde yeniler"""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    where = _lesson_filter("lesson_id", lesson_ids)
+
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+    try:
+        load_scope(cursor, lesson_ids)
+        cursor.execute(f"DELETE FROM Table5{where};")
+        cursor.execute(f"""
+            INSERT INTO Table5 (student_id, lesson_id, program_outcome_id, success_rate)
+            SELECT student_id, lesson_id, program_outcome_id, success_rate FROM Table5View{where};
+        """)
+        conn.commit()
+    except pyodbc.Error:
+        conn.rollback()
+        print("Refreshing Table5 failed.")
+        raise
+    finally:
+        conn.close()
+
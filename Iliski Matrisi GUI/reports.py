@@ -0,0 +1,842 @@
+import os
+import threading
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.comments import Comment
+
+import pyodbc
+
+from bulk_write import bulk_insert
+from columnar_export import replace_student_partitions
+from connection_pool import get_connection
+from report_calc import Table4Result, note_rows, table1_rows, table2_rows, table3_rows, table4_rows, table5_rows
+from report_store import (
+    LESSON_LEVEL, delete_rows, load_fingerprints, save_fingerprints,
+    table3_fingerprint, table4_fingerprints,
+)
+from snapshot import load_snapshot, normalize_lesson_ids
+from table4_sql import save_table4_set_based, stream_table4
+
+
+def _selected_lessons(snapshot, lesson_ids):
+    """Snapshot'taki dersleri (id, ad) olarak döndürür; lesson_ids verilmişse yalnızca onları"""
+    return [
+        (lesson_id, lesson_name) for lesson_id, lesson_name in snapshot.lesson_names.items()
+        if lesson_ids is None or lesson_id in lesson_ids
+    ]
+
+
+def _open_workbook(filename, lesson_ids):
+    """Ders kapsamı verilmişse mevcut dosya açılır (diğer derslerin sayfaları korunur), yoksa boş kitap döner"""
+    if lesson_ids is not None and os.path.exists(filename):
+        return load_workbook(filename)
+    return Workbook()
+
+
+def _create_sheet(workbook, title):
+    """Aynı adlı sayfa varsa yerini koruyarak yenisiyle değiştirir"""
+    if title in workbook.sheetnames:
+        index = workbook.sheetnames.index(title)
+        del workbook[title]
+        return workbook.create_sheet(title, index)
+    return workbook.create_sheet(title)
+
+
+def _remove_sheet(workbook, title):
+    if title in workbook.sheetnames:
+        del workbook[title]
+
+
+def _drop_default_sheet(workbook):
+    if 'Sheet' in workbook.sheetnames:
+        if len(workbook.sheetnames) == 1:
+            # Yeni bir sayfa eklemeden önce varsayılan sayfayı silmeyin
+            workbook.create_sheet(title="DefaultSheet")
+        del workbook['Sheet']
+
+
+def _save_workbook(workbook, filename):
+    _drop_default_sheet(workbook)
+    workbook.save(filename)
+
+
+def _write_row(sheet, row_idx, values):
+    for col_index, value in enumerate(values, start=1):
+        sheet.cell(row=row_idx, column=col_index, value=value)
+
+
+def _write_report(filename, plan, snapshot, lesson_ids, name=None, lookup=False):
+    """Planı (sayfa adı, sayfayı dolduran fonksiyon, argümanlar) sırasıyla uygular ve kitabı kaydeder.
+    Fonksiyonu None olan adımlar o sayfayı kaldırır.
+    name OUTCOME_TEXTS'teki bir raporsa arama sayfası da yenilenir."""
+    workbook = _open_workbook(filename, lesson_ids)
+    for title, build, args in plan:
+        if build is None:
+            _remove_sheet(workbook, title)
+        else:
+            build(_create_sheet(workbook, title), snapshot, *args)
+    if name in OUTCOME_TEXTS:
+        _write_lookup_sheet(workbook, name, snapshot, lesson_ids, lookup)
+    _save_workbook(workbook, filename)
+
+
+# Çıktı metinleri her hücreye yorum olarak eklenmek yerine kitabın arama sayfasına bir kez yazılabilir;
+# veri hücrelerinde yalnızca çıktı kimliği kalır (yorumlar kitabın en pahalı nesneleridir: sayfa başına VML çizimi)
+LOOKUP_SHEET = "Outcome Texts"
+LOOKUP_HEADERS = ["Lesson ID", "Type", "ID", "Text"]
+# Bu sayıdan fazla hücre yorumu gerektiren kitaplar arama sayfasıyla yazılır
+LOOKUP_COMMENTS = 5000
+
+# Çıktı metnini hücre yorumu olarak yazan raporlar ve metinleri yazılan çıktı türleri
+OUTCOME_TEXTS = {
+    "table1": ("Program", "Course"),
+    "table2": ("Course",),
+    "table3": ("Course",),
+    "table4": ("Course",),
+}
+
+
+def _comment_count(name, snapshot, lesson_ids):
+    """Kitap yorumlarla yazılsaydı eklenecek yorum sayısı"""
+    count = 0
+    for lesson_id, _ in _selected_lessons(snapshot, lesson_ids):
+        lesson = snapshot.lesson(lesson_id)
+        outcomes = len(lesson.course_outcomes) + (len(lesson.program_outcomes) if name == "table1" else 0)
+        count += outcomes * (len(lesson.students) if name == "table4" else 1)
+    return count
+
+
+def _use_lookup(name, filename, snapshot, lesson_ids, lookup=None):
+    """lookup None ise kapsamlı üretimde mevcut dosyanın düzeni korunur, tam üretimde yorum sayısına göre seçilir"""
+    if name not in OUTCOME_TEXTS:
+        return False
+    if lookup is not None:
+        return lookup
+    if lesson_ids is not None and os.path.exists(filename):
+        workbook = load_workbook(filename, read_only=True)
+        try:
+            return LOOKUP_SHEET in workbook.sheetnames
+        finally:
+            workbook.close()
+    return _comment_count(name, snapshot, lesson_ids) > LOOKUP_COMMENTS
+
+
+def _lookup_sheet_rows(previous, name, snapshot, lesson_ids, lookup):
+    """Arama sayfasının satırları: kapsam dışındaki derslerin eski satırları ve lookup ise kapsamdaki derslerin
+    çıktı metinleri; ders kimliğine göre sıralı"""
+    rows = []
+    if previous is not None and lesson_ids is not None:
+        rows = [list(row) for row in previous.iter_rows(min_row=2, values_only=True) if row[0] not in lesson_ids]
+    if lookup:
+        for lesson_id, _ in _selected_lessons(snapshot, lesson_ids):
+            lesson = snapshot.lesson(lesson_id)
+            for kind in OUTCOME_TEXTS[name]:
+                outcomes = lesson.program_outcomes if kind == "Program" else lesson.course_outcomes
+                rows.extend([lesson_id, kind, outcome_id, text] for outcome_id, text in outcomes)
+    return sorted(rows, key=lambda row: row[0])
+
+
+def _write_lookup_sheet(workbook, name, snapshot, lesson_ids, lookup):
+    """Arama sayfasını kitabın sonuna yeniden yazar; satırı kalmadıysa kaldırır"""
+    previous = workbook[LOOKUP_SHEET] if LOOKUP_SHEET in workbook.sheetnames else None
+    rows = _lookup_sheet_rows(previous, name, snapshot, lesson_ids, lookup)
+    _remove_sheet(workbook, LOOKUP_SHEET)
+    if rows:
+        sheet = workbook.create_sheet(LOOKUP_SHEET)
+        for row_idx, values in enumerate([LOOKUP_HEADERS, *rows], start=1):
+            _write_row(sheet, row_idx, values)
+
+
+# Tablo 4 / Tablo 5 kitapları bu sayıdan fazla öğrenci-ders kaydı için akış (write-only) modunda yazılır:
+# satırlar üretildikçe geçici dosyaya aktarılır, kitap bellekte tutulmaz
+STREAMING_ENROLLMENTS = 20000
+
+
+def _use_streaming(snapshot, lesson_ids, streaming=None):
+    """streaming None ise kapsamdaki öğrenci-ders kaydı sayısına göre karar verilir"""
+    if streaming is not None:
+        return streaming
+    enrollments = sum(1 for row in snapshot.students if lesson_ids is None or row[1] in lesson_ids)
+    return enrollments > STREAMING_ENROLLMENTS
+
+
+def _append_rows(sheet, rows, comment_column=None):
+    """Satırları akış sayfasına ekler; comment_column verilirse 3. satırdan itibaren o sütunun metni
+    yorum olarak da eklenir"""
+    for row_idx, values in enumerate(rows, start=1):
+        if comment_column is not None and row_idx >= 3:
+            # Yorumlu hücreden sonraki değerler de hücre olarak verilmezse openpyxl yorumu onlara da kopyalar
+            cells = [WriteOnlyCell(sheet, value) for value in values]
+            cells[comment_column - 1].comment = Comment(values[comment_column - 1], "System")
+            values = cells
+        sheet.append(values)
+
+
+def _stream_report(name, filename, plan, snapshot, lesson_ids, lookup=False):
+    """Planı write-only kitaba yazar. Ders kapsamı verilmişse kapsam dışındaki sayfalar eski dosyadan
+    aynı düzenle aktarılır (sayfa sırası korunur, yeni sayfalar sona eklenir)."""
+    values, merged, comment_column = STREAMED_REPORTS[name]
+    if lookup:
+        comment_column = None
+    built = {title: args for title, build, args in plan if build is not None}
+    removed = {title for title, build, _ in plan if build is None}
+
+    workbook = Workbook(write_only=True)
+    previous = None
+    if lesson_ids is not None and os.path.exists(filename):
+        previous = load_workbook(filename, read_only=True)
+    try:
+        titles = previous.sheetnames if previous is not None else []
+        for title in titles + [title for title in built if title not in titles]:
+            # Boş kitap için eklenen yer tutucu sayfa taşınmaz, arama sayfası en sona yeniden yazılır
+            if title in removed or title in ("DefaultSheet", LOOKUP_SHEET):
+                continue
+            sheet = workbook.create_sheet(title)
+            sheet.merged_cells.add(merged)
+            if title in built:
+                _append_rows(sheet, values(snapshot, *built[title]), comment_column)
+            else:
+                _append_rows(sheet, previous[title].iter_rows(values_only=True), comment_column)
+
+        if name in OUTCOME_TEXTS:
+            previous_lookup = previous[LOOKUP_SHEET] if previous is not None and LOOKUP_SHEET in titles else None
+            rows = _lookup_sheet_rows(previous_lookup, name, snapshot, lesson_ids, lookup)
+            if rows:
+                sheet = workbook.create_sheet(LOOKUP_SHEET)
+                for values in [LOOKUP_HEADERS, *rows]:
+                    sheet.append(values)
+    finally:
+        if previous is not None:
+            previous.close()
+
+    if not workbook.sheetnames:
+        workbook.create_sheet("DefaultSheet")
+    workbook.save(filename)
+
+
+def _table1_sheet(sheet, snapshot, lesson_id, lesson_name, lookup=False):
+    lesson = snapshot.lesson(lesson_id)
+
+    program_outcomes = lesson.program_outcomes
+    course_outcomes = lesson.course_outcomes
+    course_row_count = len(course_outcomes)
+
+    sheet.merge_cells('A1:B1')
+    sheet['A1'] = f"Table 1 - {lesson_name}"
+    sheet.merge_cells('A2:B2')
+    sheet['A2'] = "Program Outcomes"
+    if course_row_count > 1:
+        sheet.merge_cells(start_row=1, start_column=3, end_row=1, end_column=course_row_count + 2)
+    sheet['C1'] = "Course Outcomes"
+
+    # Satır / sütun yerleri dersin kendi çıktılarına göre belirlenir
+    program_rows = {}
+    for i, (program_id, program_text) in enumerate(program_outcomes, start=1):
+        sheet.merge_cells(f"A{i + 2}:B{i + 2}")
+        cell = sheet[f"A{i + 2}"]
+        cell.value = program_id
+        if not lookup:
+            comment = Comment(program_text, "Database")
+            cell.comment = comment
+        program_rows[program_id] = i + 2
+
+    course_columns = {}
+    for j, (course_id, course_text) in enumerate(course_outcomes, start=1):
+        c = sheet.cell(row=2, column=j + 2)
+        c.value = course_id
+        if not lookup:
+            comment = Comment(course_text, "Database")
+            c.comment = comment
+        course_columns[course_id] = j + 2
+
+    # Program-Course relations'ın sheet'e eklenmesi
+    for program_outcome_id, course_outcome_id, relation_value in lesson.program_course_relations:
+        row = program_rows.get(program_outcome_id)
+        col = course_columns.get(course_outcome_id)
+        if row and col:
+            sheet.cell(row=row, column=col, value=relation_value)
+
+    # Course outcomes'a ilişkin her program outcome için ortalama rel value
+    for (_, average), row in zip(table1_rows(lesson), program_rows.values()):
+        sheet.cell(row=row, column=course_row_count + 3, value=average)
+
+    sheet.cell(row=2, column=course_row_count + 3, value="Rel Value")
+
+
+def _table1_plan(snapshot, lesson_ids, lookup=False):
+    # LessonID'lere göre her derse sheet oluşturma
+    return [
+        (lesson_name, _table1_sheet, (lesson_id, lesson_name, lookup))
+        for lesson_id, lesson_name in _selected_lessons(snapshot, lesson_ids)
+    ]
+
+
+def create_table1(snapshot=None, lesson_ids=None, lookup=None):
+    """lookup=True çıktı metinlerini yorum yerine arama sayfasına yazar; None ise LOOKUP_COMMENTS'e göre seçilir"""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    _create_report("table1", snapshot, lesson_ids, lookup=lookup)
+
+
+def _table2_sheet(sheet, snapshot, lesson_id, lesson_name, lookup=False):
+    lesson = snapshot.lesson(lesson_id)
+
+    # Başlıkların eklenmesi
+    sheet.merge_cells('A1:B1')
+    sheet['A1'] = f"Table 2 - {lesson_name}"
+    sheet.merge_cells('A2:B2')
+    sheet['A2'] = "Course Outcomes"
+
+    # İlgili dersin Course Outcomes verilerinin getirilmesi
+    filtered_course_outcomes = lesson.course_outcomes
+    course_rows = {}
+    for i, (course_id, course_text) in enumerate(filtered_course_outcomes, start=1):
+        sheet.merge_cells(f"A{i + 2}:B{i + 2}")
+        cell = sheet[f"A{i + 2}"]
+        cell.value = course_id
+        if not lookup:
+            comment = Comment(course_text, "Database")
+            cell.comment = comment
+        course_rows.setdefault(course_id, i + 2)
+
+    filtered_criteria = lesson.evaluation_criteria
+    criteria_columns = {}
+    for index, (criteria, weight) in enumerate(filtered_criteria, start=3):
+        sheet.cell(row=1, column=index, value=weight)  # Ağırlık
+        sheet.cell(row=2, column=index, value=criteria)  # Kriter adı
+        criteria_columns.setdefault(criteria, index)
+
+    for course_outcome_id, criteria, relation_value in lesson.course_evaluation_relations:
+        row = course_rows.get(course_outcome_id)
+        col = criteria_columns.get(criteria)
+        if row and col:
+            sheet.cell(row=row, column=col, value=relation_value)
+
+    # Her satır için toplam
+    total_col = len(filtered_criteria) + 3
+    sheet.cell(row=2, column=total_col, value="Total")
+    for row_idx, (_, total) in enumerate(table2_rows(lesson), start=3):
+        sheet.cell(row=row_idx, column=total_col, value=total)
+
+
+def _table2_plan(snapshot, lesson_ids, lookup=False):
+    return [
+        (lesson_name, _table2_sheet, (lesson_id, lesson_name, lookup))
+        for lesson_id, lesson_name in _selected_lessons(snapshot, lesson_ids)
+    ]
+
+
+def create_table2(snapshot=None, lesson_ids=None, lookup=None):
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    _create_report("table2", snapshot, lesson_ids, lookup=lookup)
+
+
+def _table3_sheet(sheet, snapshot, lesson_id, lesson_name, columns, lookup=False):
+    sheet.merge_cells('A1:B1')
+    sheet['A1'] = f"Table 3 - {lesson_name}"
+    sheet['C1'] = "Weighted Evaluation"
+
+    sheet.merge_cells('A2:B2')
+    sheet['A2'] = "Course Outcomes"
+
+    for col, criteria in enumerate(columns, start=3):
+        sheet.cell(row=2, column=col, value=criteria)
+
+    total_col = len(columns) + 3
+    sheet.cell(row=2, column=total_col, value="Total")
+
+    lesson = snapshot.lesson(lesson_id)
+    total_rows, criteria_rows = table3_rows(lesson, columns)
+
+    for row_idx, (course_outcome_id, program_text) in enumerate(lesson.course_outcomes, start=3):
+        sheet.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=2)
+        cell = sheet.cell(row=row_idx, column=1, value=course_outcome_id)
+        if not lookup:
+            comment = Comment(program_text, "Database")
+            cell.comment = comment
+
+        # Her kriterin değerinin eklenmesi
+        offset = (row_idx - 3) * len(columns)
+        for col_idx, (_, _, value) in enumerate(criteria_rows[offset:offset + len(columns)], start=3):
+            sheet.cell(row=row_idx, column=col_idx, value=value)
+
+        sheet.cell(row=row_idx, column=total_col, value=total_rows[row_idx - 3][1])
+
+
+def _table3_plan(snapshot, lesson_ids, lookup=False):
+    # Ders ID'lerine göre veri filtreleme işlemi
+    course_evaluation_relations = snapshot.course_evaluation_relations
+    evaluation_criteria = snapshot.evaluation_criteria
+
+    # EvaluationCriteria verilerinin LessonID bazında gruplanması
+    criteria_weights = {
+        (lesson_id, criteria): weight
+        for criteria, weight, lesson_id in evaluation_criteria
+    }
+
+    plan = []
+    for lesson_id, lesson_name in _selected_lessons(snapshot, lesson_ids):
+        filtered_criteria = [
+            criteria for _, criteria, _, relation_lesson_id in course_evaluation_relations
+            if relation_lesson_id == lesson_id and (relation_lesson_id, criteria) in criteria_weights
+        ]
+        # Sütunlar kriterlerin ilişkilerdeki ilk görülme sırasıdır (columnar_export._table3_frame ile aynı);
+        # sıra plan içinde belirlendiği için sayfa başka bir süreçte oluşturulsa da değişmez
+        columns = list(dict.fromkeys(filtered_criteria))
+        plan.append((lesson_name, _table3_sheet, (lesson_id, lesson_name, columns, lookup)))
+    return plan
+
+
+def create_table3(snapshot=None, lesson_ids=None, lookup=None):
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    _create_report("table3", snapshot, lesson_ids, lookup=lookup)
+
+
+def _delete_stale_lessons(cursor, stage, stored, lesson_ids, table_names):
+    """Snapshot'ta artık bulunmayan derslerin satırlarını ve parmak izlerini siler"""
+    for lesson_id in {lesson_id for lesson_id, _ in stored} - set(lesson_ids):
+        for table_name in table_names:
+            delete_rows(cursor, table_name, lesson_id)
+        cursor.execute("DELETE FROM ReportFingerprints WHERE stage = ? AND lesson_id = ?;", stage, lesson_id)
+
+
+def save_table3_to_database(snapshot=None, batch_size=None, lesson_ids=None, incremental=True):
+    """Table3'ü yalnızca girdileri (kriterler, ağırlıklar, ilişkiler, çıktılar) değişen dersler için yeniden yazar.
+    incremental=False verilirse kapsamdaki bütün dersler yeniden hesaplanır."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    scope = [lesson_id for lesson_id, _ in _selected_lessons(snapshot, lesson_ids)]
+
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+
+    stored = load_fingerprints(cursor, "table3", lesson_ids)
+    updated = 0
+
+    for lesson_id in scope:
+        lesson = snapshot.lesson(lesson_id)
+        lesson_fingerprint = table3_fingerprint(lesson)
+        if incremental and stored.get((lesson_id, LESSON_LEVEL)) == lesson_fingerprint:
+            continue
+
+        total_rows, _ = table3_rows(lesson)
+        try:
+            # Ders anahtarıyla sil + toplu ekle, tek transaction
+            delete_rows(cursor, "Table3", lesson_id)
+            bulk_insert(
+                cursor, "Table3", ["lesson_id", "course_outcome_id", "total_score"],
+                ((lesson_id, *row) for row in total_rows), batch_size,
+            )
+            save_fingerprints(cursor, "table3", lesson_id, {LESSON_LEVEL: lesson_fingerprint})
+            conn.commit()
+        except pyodbc.Error:
+            conn.rollback()
+            print(f"Updating Table3 failed for Lesson ID {lesson_id}.")
+            raise
+
+        # Aynı snapshot ile devam eden Tablo 4 / Tablo 5 adımları yeni değerleri görsün
+        snapshot.replace_table3_rows(lesson_id, total_rows)
+        updated += 1
+
+    if lesson_ids is None:
+        _delete_stale_lessons(cursor, "table3", stored, scope, ["Table3"])
+        conn.commit()
+
+    cursor.close()
+    conn.close()
+    return updated
+
+
+def _notes_sheet(sheet, snapshot, lesson_id, lesson_name):
+    lesson = snapshot.lesson(lesson_id)
+
+    sheet.merge_cells('A1:B1')
+    sheet['A1'] = f"Table Note - {lesson_name}"
+    sheet['C1'] = "Notes"
+
+    criteria_weights = lesson.criteria_weights
+
+    if not criteria_weights:
+        print(f"No criteria found for Lesson ID {lesson_id}.")
+        return
+
+    rows = lesson.students
+
+    if not rows:
+        print(f"No data found for Lesson ID {lesson_id}.")
+        return
+
+    columns = ["Student "] + list(criteria_weights.keys()) + ["Average"]
+    for col_idx, column_name in enumerate(columns, start=1):
+        sheet.cell(row=2, column=col_idx, value=column_name)
+
+    for row_idx, (student_id, scores, average) in enumerate(note_rows(lesson), start=3):
+        _write_row(sheet, row_idx, [student_id, *scores, average])
+
+
+def _notes_plan(snapshot, lesson_ids):
+    """Öğrencisi olan dersler yoksa ve kapsam verilmemişse None (kitap yazılmaz)"""
+    lesson_names = snapshot.lesson_names
+
+    # Öğrenciler tablosundaki derslerin alınması
+    student_lesson_ids = [
+        lesson_id for lesson_id in snapshot.student_lesson_ids()
+        if lesson_ids is None or lesson_id in lesson_ids
+    ]
+
+    if not student_lesson_ids:
+        print("No lessons found in Students table.")
+        if lesson_ids is None:
+            return None
+
+    # Kapsamdaki dersin öğrencisi kalmadıysa eski sayfası da kaldırılır
+    plan = [(f"Lesson {lesson_id}", None, ()) for lesson_id in (lesson_ids or set()) - set(student_lesson_ids)]
+    plan.extend(
+        (f"Lesson {lesson_id}", _notes_sheet, (lesson_id, lesson_names.get(lesson_id, "Unknown Lesson")))
+        for lesson_id in student_lesson_ids
+    )
+    return plan
+
+
+def create_notes(snapshot=None, lesson_ids=None):
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    _create_report("notes", snapshot, lesson_ids)
+
+
+def _table4_values(snapshot, lesson_id, lesson_name, lookup=False):
+    """Tablo 4 sayfasının satırları: başlık, sütun başlıkları (kriterler, toplam, maksimum, başarı oranı),
+    sonra öğrenci başına ders çıktısı satırları. Satırlar öğrenci öğrenci üretilir."""
+    lesson = snapshot.lesson(lesson_id)
+    yield [f"{lesson_name} - Table 4"]
+    yield ["Student ID", "Course Outcomes", *lesson.criteria_weights.keys(), "Total", "Max", "% Success"]
+
+    # Dersin bütün öğrencilerinin değerleri bir kez hesaplanır
+    result = Table4Result(lesson)
+    for student_id, _ in lesson.students:
+        yield from _table4_sheet_rows(lesson, result, student_id, lookup)
+
+
+def _table4_sheet(sheet, snapshot, lesson_id, lesson_name, lookup=False):
+    sheet.merge_cells("A1:B1")
+    for row_idx, values in enumerate(_table4_values(snapshot, lesson_id, lesson_name, lookup), start=1):
+        if row_idx < 3 or lookup:
+            _write_row(sheet, row_idx, values)
+        else:
+            _write_table4_row(sheet, row_idx, values)
+
+
+def _table4_plan(snapshot, lesson_ids, lookup=False):
+    lesson_names = snapshot.lesson_names
+    # Sayfalar, öğrencisi olan dersler için Students tablosundaki sırayla açılır
+    student_lesson_ids = [
+        lesson_id for lesson_id in snapshot.student_lesson_ids()
+        if lesson_ids is None or lesson_id in lesson_ids
+    ]
+    plan = []
+    for lesson_id in student_lesson_ids:
+        lesson_name = lesson_names.get(lesson_id, f"Lesson {lesson_id}")
+        plan.append((lesson_name, _table4_sheet, (lesson_id, lesson_name, lookup)))
+
+    # Kapsamdaki dersin öğrencisi kalmadıysa eski sayfası da kaldırılır
+    for lesson_id in (lesson_ids or set()) - set(student_lesson_ids):
+        plan.append((lesson_names.get(lesson_id, f"Lesson {lesson_id}"), None, ()))
+    return plan
+
+
+def create_table4(snapshot=None, lesson_ids=None, streaming=None, lookup=None):
+    """streaming=True kitabı akış modunda yazar; None ise STREAMING_ENROLLMENTS'e göre seçilir.
+    lookup=True B sütununa metin yerine ders çıktısı kimliğini yazar, metinler arama sayfasında bulunur."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    _create_report("table4", snapshot, lesson_ids, streaming, lookup)
+
+
+def _table4_sheet_rows(lesson, result, student_id, lookup=False):
+    """table4.xlsx'teki öğrenci satırları: öğrenci, ders çıktısı metni (lookup ise kimliği), kriterler,
+    toplam, en yüksek, başarı"""
+    return [
+        [student_id, course_id if lookup else outcome_text, *weighted, total, max_score, success_rate]
+        for (_, outcome_text), (course_id, weighted, total, max_score, success_rate)
+        in zip(lesson.course_outcomes, result.rows(student_id))
+    ]
+
+
+def _write_table4_row(sheet, row_idx, values):
+    for col_index, value in enumerate(values, start=1):
+        sheet.cell(row=row_idx, column=col_index, value=value)
+    sheet.cell(row=row_idx, column=2).comment = Comment(values[1], "System")
+
+
+def _table5_sheet_rows(lesson):
+    """table5.xlsx'teki satırlar: öğrenci, program çıktısı metni, ders çıktıları, başarı oranı"""
+    program_texts = dict(lesson.program_outcomes)
+    return [
+        [student_id, program_texts[program_outcome_id], *row_values, ratio]
+        for student_id, program_outcome_id, row_values, ratio in table5_rows(lesson)
+    ]
+
+
+def _save_table4_sql(snapshot, lesson_ids):
+    """Table4'ü veritabanında hesaplar; snapshot verildiyse başarı oranlarını satır satır okuyarak günceller"""
+    inserted = save_table4_set_based(lesson_ids)
+    if snapshot is None:
+        return inserted
+
+    rows_by_lesson = {}
+    for student_id, lesson_id, outcome_id, _, _, success_rate in stream_table4(lesson_ids):
+        rows_by_lesson.setdefault(lesson_id, []).append((student_id, outcome_id, success_rate))
+
+    for lesson_id, lesson in list(snapshot.lessons.items()):
+        if lesson_ids is not None and lesson_id not in lesson_ids:
+            continue
+        student_ids = {student_id for student_id, _ in lesson.students} | {key[0] for key in lesson.table4}
+        snapshot.replace_table4_rows(lesson_id, student_ids, rows_by_lesson.get(lesson_id, []))
+    return inserted
+
+
+def save_table4_to_database(snapshot=None, batch_size=None, lesson_ids=None, incremental=True, engine="python"):
+    """Table4'te yalnızca notları ya da dersin girdileri değişen öğrencilerin satırlarını yeniden yazar.
+    incremental=False verilirse kapsamdaki bütün öğrenciler yeniden hesaplanır.
+    engine="sql" verilirse kapsam tek bir INSERT ... SELECT ile veritabanında hesaplanır."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    if engine == "sql":
+        return _save_table4_sql(snapshot, lesson_ids)
+    if engine != "python":
+        raise ValueError(f"Unknown Table4 engine: {engine}")
+
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    scope = [
+        lesson_id for lesson_id in snapshot.student_lesson_ids()
+        if lesson_ids is None or lesson_id in lesson_ids
+    ]
+
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+
+    stored = load_fingerprints(cursor, "table4", lesson_ids)
+    columns = ["student_id", "lesson_id", "course_outcome_id", "total_score", "max_score", "success_rate"]
+    updated = 0
+
+    for lesson_id in scope:
+        lesson = snapshot.lesson(lesson_id)
+        current = table4_fingerprints(lesson) if lesson.course_outcomes else {}
+        previous = {
+            student_id: value for (stored_lesson_id, student_id), value in stored.items()
+            if stored_lesson_id == lesson_id
+        }
+
+        if incremental:
+            changed = {student_id for student_id, value in current.items() if previous.get(student_id) != value}
+        else:
+            changed = set(current)
+        removed = set(previous) - set(current)
+        if not changed and not removed:
+            continue
+
+        rows = table4_rows(lesson, [student_id for student_id, _ in lesson.students if student_id in changed])
+        # Bütün öğrenciler değiştiyse ders tek komutla silinir
+        stale = changed | removed
+        stale_ids = None if stale >= set(previous) else stale
+        try:
+            delete_rows(cursor, "Table4", lesson_id, stale_ids)
+            bulk_insert(
+                cursor, "Table4", columns,
+                ((student_id, lesson_id, *row) for student_id, *row in rows), batch_size,
+            )
+            save_fingerprints(
+                cursor, "table4", lesson_id,
+                {student_id: current[student_id] for student_id in changed}, stale_ids,
+            )
+            conn.commit()
+        except pyodbc.Error:
+            conn.rollback()
+            print(f"Updating Table4 failed for Lesson ID {lesson_id}.")
+            raise
+
+        snapshot.replace_table4_rows(
+            lesson_id, stale,
+            [(student_id, outcome_id, success_rate) for student_id, outcome_id, _, _, success_rate in rows],
+        )
+        updated += len(changed)
+
+    if lesson_ids is None:
+        _delete_stale_lessons(cursor, "table4", stored, scope, ["Table4"])
+        conn.commit()
+
+    cursor.close()
+    conn.close()
+    return updated
+
+
+def _table5_values(snapshot, lesson_id, lesson_name):
+    """Tablo 5 sayfasının satırları: başlık, sütun başlıkları (ders çıktıları, başarı oranı), öğrenci satırları"""
+    lesson = snapshot.lesson(lesson_id)
+    yield [f"{lesson_name} - Table 5"]
+    yield ["Student ID", "Program Outcomes", *(text for _, text in lesson.course_outcomes), "Success Rate"]
+    yield from _table5_sheet_rows(lesson)
+
+
+def _table5_sheet(sheet, snapshot, lesson_id, lesson_name):
+    sheet.merge_cells("A1:C1")
+    for row_idx, values in enumerate(_table5_values(snapshot, lesson_id, lesson_name), start=1):
+        _write_row(sheet, row_idx, values)
+
+
+def _table5_plan(snapshot, lesson_ids):
+    return [
+        (f"{lesson_name}", _table5_sheet, (lesson_id, lesson_name))
+        for lesson_id, lesson_name in _selected_lessons(snapshot, lesson_ids)
+    ]
+
+
+def create_table5(snapshot=None, lesson_ids=None, streaming=None):
+    """streaming=True kitabı akış modunda yazar; None ise STREAMING_ENROLLMENTS'e göre seçilir"""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    snapshot = snapshot or load_snapshot(lesson_ids)
+    _create_report("table5", snapshot, lesson_ids, streaming)
+
+
+# Excel raporları: dosya adı ve sayfa planını çıkaran fonksiyon (parallel_reports da bunları kullanır)
+REPORTS = {
+    "table1": ("table1.xlsx", _table1_plan),
+    "table2": ("table2.xlsx", _table2_plan),
+    "table3": ("table3.xlsx", _table3_plan),
+    "notes": ("notlar.xlsx", _notes_plan),
+    "table4": ("table4.xlsx", _table4_plan),
+    "table5": ("table5.xlsx", _table5_plan),
+}
+
+# Akış modunda yazılabilen raporlar: sayfa satırlarını üreten fonksiyon, birleştirilmiş başlık hücreleri
+# ve (arama sayfası kullanılmıyorsa) metni yorum olarak da eklenen sütun
+STREAMED_REPORTS = {
+    "table4": (_table4_values, "A1:B1", 2),
+    "table5": (_table5_values, "A1:C1", None),
+}
+
+
+def _report_plan(name, snapshot, lesson_ids, lookup=None):
+    """REPORTS'taki raporun (dosya adı, plan, arama sayfası kullanılıyor mu) bilgisi; plan None olabilir"""
+    filename, make_plan = REPORTS[name]
+    if name not in OUTCOME_TEXTS:
+        return filename, make_plan(snapshot, lesson_ids), False
+    lookup = _use_lookup(name, filename, snapshot, lesson_ids, lookup)
+    return filename, make_plan(snapshot, lesson_ids, lookup), lookup
+
+
+def _create_report(name, snapshot, lesson_ids, streaming=False, lookup=None):
+    filename, plan, lookup = _report_plan(name, snapshot, lesson_ids, lookup)
+    if plan is None:
+        return
+    if name in STREAMED_REPORTS and _use_streaming(snapshot, lesson_ids, streaming):
+        _stream_report(name, filename, plan, snapshot, lesson_ids, lookup)
+    else:
+        _write_report(filename, plan, snapshot, lesson_ids, name, lookup)
+
+
+# Tek öğrencinin notları kaydedildiğinde bütün rapor yerine yalnızca o öğrencinin satırları yenilenir.
+# Aynı anda iki kayıt aynı Excel dosyasını açıp yazmasın diye dosya güncellemeleri sıraya alınır.
+_workbook_lock = threading.Lock()
+
+
+def _replace_student_rows(filename, title, student_id, rows, write_row, lookup_rows=None):
+    """Sayfadaki öğrenci satırlarını yenileriyle değiştirir; satır sayısı aynıysa yerinde yazılır,
+    değilse eski satırlar silinip yeniler sona eklenir. Kitapta arama sayfası varsa lookup_rows yorumsuz yazılır.
+    Dosya ya da sayfa yoksa False döner."""
+    if not os.path.exists(filename):
+        return False
+    workbook = load_workbook(filename)
+    if title not in workbook.sheetnames:
+        return False
+    sheet = workbook[title]
+    if lookup_rows is not None and LOOKUP_SHEET in workbook.sheetnames:
+        rows, write_row = lookup_rows, _write_row
+
+    existing = [
+        row_idx for row_idx in range(3, sheet.max_row + 1)
+        if sheet.cell(row=row_idx, column=1).value == student_id
+    ]
+    if existing and len(existing) == len(rows) and existing[-1] - existing[0] == len(rows) - 1:
+        positions = existing
+    else:
+        for row_idx in reversed(existing):
+            sheet.delete_rows(row_idx)
+        start = sheet.max_row + 1
+        positions = range(start, start + len(rows))
+
+    for row_idx, values in zip(positions, rows):
+        write_row(sheet, row_idx, values)
+    workbook.save(filename)
+    return True
+
+
+def recompute_student(student_id, lesson_id, update_workbooks=True):
+    """Notları kaydedilen öğrencinin Table4 / Table5 satırlarını veritabanında ve (istenirse)
+    table4.xlsx / table5.xlsx / notlar.xlsx ile sütunlu dosyalarda yeniler.
+    Dersin diğer öğrencileri okunmaz ve yeniden hesaplanmaz.
+    Yazılan Table4 satır sayısını döndürür."""
+    student_id = int(student_id)
+    lesson_id = int(lesson_id)
+    snapshot = load_snapshot({lesson_id}, {student_id})
+    lesson = snapshot.lesson(lesson_id)
+    if not any(row_student_id == student_id for row_student_id, _ in lesson.students):
+        raise ValueError(f"Student {student_id} is not enrolled in Lesson ID {lesson_id}.")
+
+    result = Table4Result(lesson)
+    rows = table4_rows(lesson, [student_id]) if lesson.course_outcomes else []
+    fingerprints = table4_fingerprints(lesson) if lesson.course_outcomes else {}
+
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+    try:
+        delete_rows(cursor, "Table4", lesson_id, [student_id])
+        bulk_insert(
+            cursor, "Table4",
+            ["student_id", "lesson_id", "course_outcome_id", "total_score", "max_score", "success_rate"],
+            ((student_id, lesson_id, *row) for _, *row in rows),
+        )
+        save_fingerprints(cursor, "table4", lesson_id, fingerprints, [student_id])
+        delete_rows(cursor, "Table5", lesson_id, [student_id])
+        cursor.execute("""
+            INSERT INTO Table5 (student_id, lesson_id, program_outcome_id, success_rate)
+            SELECT student_id, lesson_id, program_outcome_id, success_rate FROM Table5View
+            WHERE lesson_id = ? AND student_id = ?;
+        """, lesson_id, student_id)
+        conn.commit()
+    except pyodbc.Error:
+        conn.rollback()
+        print(f"Updating Table4/Table5 failed for Student ID {student_id} in Lesson ID {lesson_id}.")
+        raise
+    finally:
+        conn.close()
+
+    snapshot.replace_table4_rows(
+        lesson_id, [student_id],
+        [(student_id, outcome_id, success_rate) for student_id, outcome_id, _, _, success_rate in rows],
+    )
+
+    if update_workbooks:
+        lesson_name = snapshot.lesson_names.get(lesson_id)
+        with _workbook_lock:
+            _replace_student_rows(
+                "table4.xlsx", lesson_name or f"Lesson {lesson_id}", student_id,
+                _table4_sheet_rows(lesson, result, student_id), _write_table4_row,
+                _table4_sheet_rows(lesson, result, student_id, lookup=True),
+            )
+            if lesson_name is not None:
+                _replace_student_rows("table5.xlsx", lesson_name, student_id, _table5_sheet_rows(lesson), _write_row)
+            if lesson.evaluation_criteria:
+                _replace_student_rows(
+                    "notlar.xlsx", f"Lesson {lesson_id}", student_id,
+                    [[row_student_id, *scores, average] for row_student_id, scores, average in note_rows(lesson)],
+                    _write_row,
+                )
+            replace_student_partitions(snapshot, lesson_id, student_id)
+
+    return len(rows)
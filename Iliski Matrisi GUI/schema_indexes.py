@@ -0,0 +1,28 @@
+# Sık kullanılan filtreler için nonclustered index'ler.
+# Listeye index eklendiğinde migrations.MIGRATIONS'a yeni bir sürüm eklenir.
+
+# (index adı, tablo, anahtar sütunlar, INCLUDE sütunları)
+INDEXES = [
+    # get_data_from_table_with_filter ve snapshot sorguları: WHERE LessonID = ?
+    ("IX_CourseOutcomes_LessonID", "CourseOutcomes", ["LessonID"], []),
+    ("IX_ProgramOutcomes_LessonID", "ProgramOutcomes", ["LessonID"], []),
+    ("IX_ProgramCourseRelations_LessonID", "ProgramCourseRelations", ["LessonID"],
+     ["ProgramOutcomeID", "CourseOutcomeID", "RelationValue"]),
+    ("IX_EvaluationCriteria_LessonID", "EvaluationCriteria", ["LessonID"], ["Weight"]),
+    ("IX_CourseEvaluationRelations_LessonID", "CourseEvaluationRelations", ["LessonID"],
+     ["CourseOutcomeID", "Criteria", "RelationValue"]),
+    # create_notes / create_table4: WHERE lesson_id = ? (birincil anahtar Student ile başlar)
+    ("IX_Students_lesson_id", "Students", ["lesson_id"], []),
+    # fetch_student_lessons ve öğrenci bazlı Table4 okumaları: WHERE student_id = ?
+    ("IX_Table4_student_id", "Table4", ["student_id"], ["course_outcome_id", "success_rate"]),
+]
+
+
+def index_statement(name, table, columns, include):
+    """Tablo varsa ve index yoksa oluşturan komut"""
+    include_clause = f" INCLUDE ({', '.join(include)})" if include else ""
+    return f"""
+        IF OBJECT_ID(N'dbo.{table}', N'U') IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID(N'dbo.{table}'))
+        CREATE NONCLUSTERED INDEX {name} ON {table} ({', '.join(columns)}){include_clause};
+    """
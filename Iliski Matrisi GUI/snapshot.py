@@ -0,0 +1,216 @@
+from bulk_write import bulk_insert
+from connection_pool import get_connection
+from student_scores import pivot_scores
+
+# Raporların ihtiyaç duyduğu bütün tablolar tek bir batch içinde okunur.
+# Table3 / Table4, Students ve StudentScores henüz oluşturulmamış olabilir; bu durumda boş sonuç kümesi döner.
+# {where} yerine ders filtresi gelir, üçüncü alan filtrelenecek sütunun adıdır.
+SNAPSHOT_QUERIES = [
+    ("lessons", "SELECT id, name FROM Lessons{where};", "id"),
+    ("course_outcomes", "SELECT id, data, LessonID FROM CourseOutcomes{where};", "LessonID"),
+    ("program_outcomes", "SELECT id, data, LessonID FROM ProgramOutcomes{where};", "LessonID"),
+    ("program_course_relations",
+     "SELECT ProgramOutcomeID, CourseOutcomeID, RelationValue, LessonID FROM ProgramCourseRelations{where};",
+     "LessonID"),
+    ("evaluation_criteria", "SELECT Criteria, Weight, LessonID FROM EvaluationCriteria{where};", "LessonID"),
+    ("course_evaluation_relations",
+     "SELECT CourseOutcomeID, Criteria, RelationValue, LessonID FROM CourseEvaluationRelations{where};",
+     "LessonID"),
+    ("students", """
+        IF OBJECT_ID(N'dbo.Students', N'U') IS NOT NULL
+            SELECT Student, lesson_id FROM Students{where};
+        ELSE
+            SELECT CAST(NULL AS INT) AS Student, CAST(NULL AS INT) AS lesson_id WHERE 1 = 0;
+    """, "lesson_id"),
+    ("student_scores", """
+        IF OBJECT_ID(N'dbo.StudentScores', N'U') IS NOT NULL
+            SELECT Student, LessonID, Criteria, Score FROM StudentScores{where};
+        ELSE
+            SELECT CAST(NULL AS INT) AS Student, CAST(NULL AS INT) AS LessonID,
+                   CAST(NULL AS NVARCHAR(25)) AS Criteria, CAST(NULL AS FLOAT) AS Score WHERE 1 = 0;
+    """, "LessonID"),
+    ("table3", """
+        IF OBJECT_ID(N'dbo.Table3', N'U') IS NOT NULL
+            SELECT lesson_id, course_outcome_id, total_score FROM Table3{where};
+        ELSE
+            SELECT CAST(NULL AS INT) AS lesson_id, CAST(NULL AS INT) AS course_outcome_id,
+                   CAST(NULL AS FLOAT) AS total_score WHERE 1 = 0;
+    """, "lesson_id"),
+    ("table4", """
+        IF OBJECT_ID(N'dbo.Table4', N'U') IS NOT NULL
+            SELECT student_id, lesson_id, course_outcome_id, success_rate FROM Table4{where};
+        ELSE
+            SELECT CAST(NULL AS INT) AS student_id, CAST(NULL AS INT) AS lesson_id,
+                   CAST(NULL AS INT) AS course_outcome_id, CAST(NULL AS FLOAT) AS success_rate WHERE 1 = 0;
+    """, "lesson_id"),
+]
+
+# Öğrenci kapsamı verildiğinde öğrenci bazındaki sonuç kümelerinin süzüleceği sütunlar
+STUDENT_COLUMNS = {"students": "Student", "student_scores": "Student", "table4": "student_id"}
+
+
+def normalize_lesson_ids(lesson_ids):
+    """Ders kapsamını int kümesine çevirir; None bütün dersler anlamına gelir"""
+    if lesson_ids is None:
+        return None
+    return {int(lesson_id) for lesson_id in lesson_ids}
+
+
+def load_scope(cursor, ids, table="#LessonScope"):
+    """Kimlikleri oturuma özel geçici tabloya toplu yükler; ids None ya da boşsa bir şey yapmaz.
+    SQL Server bir istekte en fazla 2100 parametre kabul eder, bu yüzden kapsam IN listesine yazılmaz."""
+    if not ids:
+        return
+    # Havuzdaki bağlantı oturumu korur; önceki çağrıdan kalan tablo varsa silinir
+    cursor.execute(f"""
+        IF OBJECT_ID(N'tempdb..{table}', N'U') IS NOT NULL DROP TABLE {table};
+        CREATE TABLE {table} (id INT NOT NULL PRIMARY KEY);
+    """)
+    bulk_insert(cursor, table, ["id"], ((value,) for value in sorted(ids)))
+
+
+def scope_condition(column, ids, table="#LessonScope"):
+    """column'u load_scope ile yüklenmiş kapsama sınırlayan koşul; ids None ise None, boşsa hiçbir satır seçilmez"""
+    if ids is None:
+        return None
+    if not ids:
+        return "1 = 0"
+    return f"{column} IN (SELECT id FROM {table})"
+
+
+class LessonSnapshot:
+    """Tek bir derse ait satırlar (tablolardaki sıra korunur)"""
+
+    def __init__(self, lesson_id, name=None):
+        self.id = lesson_id
+        self.name = name
+        self.course_outcomes = []              # (id, data)
+        self.program_outcomes = []             # (id, data)
+        self.program_course_relations = []     # (ProgramOutcomeID, CourseOutcomeID, RelationValue)
+        self.evaluation_criteria = []          # (Criteria, Weight)
+        self.course_evaluation_relations = []  # (CourseOutcomeID, Criteria, RelationValue)
+        self.students = []                     # (Student, {kriter: not})
+        self.table3 = {}                       # course_outcome_id -> total_score
+        self.table4 = {}                       # (student_id, course_outcome_id) -> success_rate
+
+    @property
+    def criteria_weights(self):
+        return dict(self.evaluation_criteria)
+
+
+class Snapshot:
+    """Veritabanının rapor üretimi için bellekteki kopyası, ders bazında indekslenmiş"""
+
+    def __init__(self):
+        self.lesson_names = {}
+        self.lessons = {}
+
+        # Ham satırlar, fetch_* fonksiyonlarının döndürdüğü biçimde
+        self.course_outcomes = []
+        self.program_outcomes = []
+        self.program_course_relations = []
+        self.evaluation_criteria = []
+        self.course_evaluation_relations = []
+        self.students = []
+        self.student_scores = []
+        self.table3 = []
+        self.table4 = []
+
+    def lesson(self, lesson_id):
+        """Dersin verilerini döndürür; Lessons tablosunda olmayan ID'ler için boş kayıt açar"""
+        if lesson_id not in self.lessons:
+            self.lessons[lesson_id] = LessonSnapshot(lesson_id, self.lesson_names.get(lesson_id))
+        return self.lessons[lesson_id]
+
+    def student_lesson_ids(self):
+        """Öğrencisi olan dersler, Students tablosundaki ilk görülme sırasıyla"""
+        return list(dict.fromkeys(row[1] for row in self.students))
+
+    def replace_table3_rows(self, lesson_id, rows):
+        """Bir dersin Table3 satırlarını (course_outcome_id, total_score) yenileriyle değiştirir"""
+        self.table3 = [row for row in self.table3 if row[0] != lesson_id]
+        self.table3.extend((lesson_id, course_outcome_id, total_score) for course_outcome_id, total_score in rows)
+        self.lesson(lesson_id).table3 = dict(rows)
+
+    def replace_table4_rows(self, lesson_id, student_ids, rows):
+        """Dersin verilen öğrencilerine ait Table4 satırlarını (student_id, course_outcome_id, success_rate) değiştirir"""
+        student_ids = set(student_ids)
+        self.table4 = [row for row in self.table4 if not (row[1] == lesson_id and row[0] in student_ids)]
+        self.table4.extend((student_id, lesson_id, outcome_id, rate) for student_id, outcome_id, rate in rows)
+
+        lesson_table4 = self.lesson(lesson_id).table4
+        for key in [key for key in lesson_table4 if key[0] in student_ids]:
+            del lesson_table4[key]
+        for student_id, outcome_id, rate in rows:
+            lesson_table4[(student_id, outcome_id)] = rate
+
+    def _build_index(self):
+        for lesson_id, name in self.lesson_names.items():
+            self.lessons[lesson_id] = LessonSnapshot(lesson_id, name)
+
+        for outcome_id, data, lesson_id in self.course_outcomes:
+            self.lesson(lesson_id).course_outcomes.append((outcome_id, data))
+        for outcome_id, data, lesson_id in self.program_outcomes:
+            self.lesson(lesson_id).program_outcomes.append((outcome_id, data))
+        for program_id, course_id, relation_value, lesson_id in self.program_course_relations:
+            self.lesson(lesson_id).program_course_relations.append((program_id, course_id, relation_value))
+        for criteria, weight, lesson_id in self.evaluation_criteria:
+            self.lesson(lesson_id).evaluation_criteria.append((criteria, weight))
+        for outcome_id, criteria, relation_value, lesson_id in self.course_evaluation_relations:
+            self.lesson(lesson_id).course_evaluation_relations.append((outcome_id, criteria, relation_value))
+
+        # Uzun biçimdeki notlar (Student, lesson_id, kriterler...) satırlarına çevrilir
+        columns, self.students = pivot_scores(
+            self.students, self.student_scores, [criteria for criteria, _, _ in self.evaluation_criteria]
+        )
+        for row in self.students:
+            scores = dict(zip(columns[2:], row[2:]))
+            self.lesson(row[1]).students.append((row[0], scores))
+
+        for lesson_id, course_outcome_id, total_score in self.table3:
+            self.lesson(lesson_id).table3[course_outcome_id] = total_score
+        for student_id, lesson_id, course_outcome_id, success_rate in self.table4:
+            self.lesson(lesson_id).table4[(student_id, course_outcome_id)] = success_rate
+
+
+def load_snapshot(lesson_ids=None, student_ids=None):
+    """Rapor tablolarının hepsini tek bir sorgu batch'i ile okur ve Snapshot olarak döndürür.
+    lesson_ids verilirse yalnızca o derslerin satırları okunur.
+    student_ids verilirse Students, StudentScores ve Table4'ten yalnızca o öğrencilerin satırları okunur."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    student_ids = None if student_ids is None else {int(student_id) for student_id in student_ids}
+
+    conn = get_connection("RelationMatrix")
+    cursor = conn.cursor()
+
+    # Kapsamlar bir kez geçici tablolara yazılır, her sorgu aynı tabloları okur
+    load_scope(cursor, lesson_ids, "#LessonScope")
+    load_scope(cursor, student_ids, "#StudentScope")
+
+    queries = []
+    for name, query, lesson_column in SNAPSHOT_QUERIES:
+        conditions = [scope_condition(lesson_column, lesson_ids, "#LessonScope")]
+        if name in STUDENT_COLUMNS:
+            conditions.append(scope_condition(STUDENT_COLUMNS[name], student_ids, "#StudentScope"))
+        conditions = [condition for condition in conditions if condition is not None]
+        queries.append(query.format(where=f" WHERE {' AND '.join(conditions)}" if conditions else ""))
+
+    batch = "SET NOCOUNT ON;\n" + "\n".join(queries)
+    cursor.execute(batch)
+
+    snapshot = Snapshot()
+    for index, (name, _, _) in enumerate(SNAPSHOT_QUERIES):
+        if index > 0 and not cursor.nextset():
+            raise RuntimeError(f"Snapshot batch ended before the {name} result set.")
+
+        rows = [tuple(row) for row in cursor.fetchall()]
+        if name == "lessons":
+            snapshot.lesson_names = dict(rows)
+        else:
+            setattr(snapshot, name, rows)
+
+    cursor.close()
+    conn.close()
+
+    snapshot._build_index()
+    return snapshot
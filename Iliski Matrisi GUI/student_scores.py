@@ -0,0 +1,84 @@
+from bulk_write import bulk_insert
+
+# Students yalnızca (Student, lesson_id) listesini tutar; notlar kriter başına bir satır olarak StudentScores'ta durur.
+# Yeni bir kriter eklemek şema değişikliği gerektirmez.
+STUDENT_TABLES_DDL = [
+    """
+    IF OBJECT_ID(N'dbo.Students', N'U') IS NULL
+    CREATE TABLE Students (
+        Student INT,
+        lesson_id INT,
+        PRIMARY KEY (Student, lesson_id)
+    );
+    """,
+    """
+    IF OBJECT_ID(N'dbo.StudentScores', N'U') IS NULL
+    CREATE TABLE StudentScores (
+        Student INT NOT NULL,
+        LessonID INT NOT NULL,
+        Criteria NVARCHAR(25) NOT NULL,
+        Score FLOAT NOT NULL,
+        PRIMARY KEY (LessonID, Student, Criteria)
+    );
+    """,
+]
+
+
+def ensure_student_tables(cursor):
+    for statement in STUDENT_TABLES_DDL:
+        cursor.execute(statement)
+
+
+def wide_score_columns(cursor):
+    """Eski geniş Students tablosunda kalan kriter sütunları"""
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = 'Students' AND COLUMN_NAME NOT IN ('Student', 'lesson_id');
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def move_wide_scores(cursor):
+    """Eski geniş Students tablosundaki kriter sütunlarını StudentScores satırlarına taşır ve sütunları kaldırır.
+    Transaction'ı çağıran yönetir. Taşınan sütun sayısını döndürür."""
+    columns = wide_score_columns(cursor)
+    for column in columns:
+        literal = column.replace("'", "''")
+        cursor.execute(f"""
+            INSERT INTO StudentScores (Student, LessonID, Criteria, Score)
+            SELECT s.Student, s.lesson_id, N'{literal}', CAST(s.[{column}] AS FLOAT)
+            FROM Students s
+            WHERE s.[{column}] IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM StudentScores sc
+                  WHERE sc.LessonID = s.lesson_id AND sc.Student = s.Student AND sc.Criteria = N'{literal}'
+              );
+        """)
+        cursor.execute(f"ALTER TABLE Students DROP COLUMN [{column}];")
+    return len(columns)
+
+
+def insert_student_scores(cursor, student_id, lesson_id, scores):
+    """Öğrenciyi derse ekler ve {kriter: not} değerlerini yazar (çağıran transaction'ı yönetir)"""
+    cursor.execute("INSERT INTO Students (Student, lesson_id) VALUES (?, ?);", student_id, lesson_id)
+    bulk_insert(
+        cursor, "StudentScores", ["Student", "LessonID", "Criteria", "Score"],
+        ((student_id, lesson_id, criteria, float(score)) for criteria, score in scores.items() if score is not None),
+    )
+
+
+def pivot_scores(students, score_rows, criteria_order=()):
+    """(Student, lesson_id) ve (Student, LessonID, Criteria, Score) satırlarını eski geniş biçime çevirir.
+    Sütunlar: Student, lesson_id ve criteria_order sırasıyla (listede olmayanlar sona) kriterler."""
+    scores = {}
+    criteria_seen = dict.fromkeys(criteria_order)
+    for student_id, lesson_id, criteria, score in score_rows:
+        scores.setdefault((student_id, lesson_id), {})[criteria] = score
+        criteria_seen.setdefault(criteria)
+
+    criteria_columns = list(criteria_seen)
+    rows = [
+        (student_id, lesson_id) + tuple(scores.get((student_id, lesson_id), {}).get(c) for c in criteria_columns)
+        for student_id, lesson_id in students
+    ]
+    return ["Student", "lesson_id", *criteria_columns], rows
@@ -0,0 +1,98 @@
+import pyodbc
+
+from bulk_write import BULK_BATCH_SIZE
+from connection_pool import get_connection
+from snapshot import load_scope, normalize_lesson_ids, scope_condition
+
+# Table4 veritabanı içinde tek bir INSERT ... SELECT ile hesaplanır
+TABLE4_INSERT = """
+    WITH scores AS (
+        SELECT Student, LessonID AS lesson_id, Criteria, Score FROM StudentScores{score_where}
+    ),
+    weighted AS (
+        SELECT sc.Student, sc.lesson_id, cer.CourseOutcomeID,
+               SUM(sc.Score * ec.Weight * cer.RelationValue / 100) AS total_score
+        FROM scores sc
+        JOIN EvaluationCriteria ec ON ec.LessonID = sc.lesson_id AND ec.Criteria = sc.Criteria
+        JOIN CourseEvaluationRelations cer ON cer.LessonID = sc.lesson_id AND cer.Criteria = sc.Criteria
+        WHERE cer.RelationValue <> 0
+        GROUP BY sc.Student, sc.lesson_id, cer.CourseOutcomeID
+    )
+    INSERT INTO Table4 (student_id, lesson_id, course_outcome_id, total_score, max_score, success_rate)
+    SELECT s.Student, s.lesson_id, co.id,
+           COALESCE(w.total_score, 0),
+           COALESCE(t3.total_score, 0) * 100,
+           CASE WHEN COALESCE(t3.total_score, 0) > 0
+                THEN ROUND(COALESCE(w.total_score, 0) / (t3.total_score * 100) * 100, 1)
+                ELSE 0 END
+    FROM Students s
+    JOIN CourseOutcomes co ON co.LessonID = s.lesson_id
+    LEFT JOIN weighted w ON w.Student = s.Student AND w.lesson_id = s.lesson_id AND w.CourseOutcomeID = co.id
+    LEFT JOIN Table3 t3 ON t3.lesson_id = s.lesson_id AND t3.course_outcome_id = co.id
+    {where};
+"""
+
+TABLE4_COLUMNS = ["student_id", "lesson_id", "course_outcome_id", "total_score", "max_score", "success_rate"]
+
+
+def _lesson_filter(column, lesson_ids):
+    """WHERE parçası; lesson_ids None ise filtre yoktur. Kapsam önce load_scope ile yüklenmelidir."""
+    condition = scope_condition(column, lesson_ids)
+    return "" if condition is None else f" WHERE {condition}"
+
+
+def save_table4_set_based(lesson_ids=None):
+    """Kapsamdaki derslerin Table4 satırlarını silip tek bir INSERT ... SELECT ile yeniden hesaplar.
+    Öğrenci notları istemciye hiç indirilmez. Eklenen satır sayısını döndürür."""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+
+    score_where = _lesson_filter("LessonID", lesson_ids)
+    where = _lesson_filter("s.lesson_id", lesson_ids)
+    delete_where = _lesson_filter("lesson_id", lesson_ids)
+
+    try:
+        load_scope(cursor, lesson_ids)
+        cursor.execute(f"DELETE FROM Table4{delete_where};")
+        # Python motorunun parmak izleri artık geçersizdir, bir sonraki artımlı çalıştırma yeniden yazar
+        fingerprint_where = delete_where.replace(" WHERE", " AND") if delete_where else ""
+        cursor.execute(f"DELETE FROM ReportFingerprints WHERE stage = 'table4'{fingerprint_where};")
+        cursor.execute(TABLE4_INSERT.format(score_where=score_where, where=where))
+        inserted = cursor.rowcount
+        conn.commit()
+    except pyodbc.Error:
+        conn.rollback()
+        print("Set-based Table4 computation failed.")
+        raise
+    finally:
+        conn.close()
+
+    return inserted
+
+
+def stream_table4(lesson_ids=None, batch_size=None):
+    """Table4 satırlarını (student_id, lesson_id, course_outcome_id, total_score, max_score, success_rate)
+    batch_size'lık parçalar halinde okuyarak tek tek üretir"""
+    lesson_ids = normalize_lesson_ids(lesson_ids)
+    batch_size = batch_size or BULK_BATCH_SIZE
+    where = _lesson_filter("lesson_id", lesson_ids)
+
+    conn = get_connection("RelationMatrix")
+    cursor = conn.cursor()
+    try:
+        load_scope(cursor, lesson_ids)
+        cursor.execute(
+            f"SELECT {', '.join(TABLE4_COLUMNS)} FROM Table4{where} "
+            "ORDER BY lesson_id, student_id, course_outcome_id;"
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(row)
+    finally:
+        conn.close()
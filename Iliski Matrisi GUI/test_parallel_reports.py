@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import openpyxl
+
+from parallel_reports import OPENPYXL_VERSION, check_parallel_output, create_reports_parallel
+from reports import REPORTS
+from snapshot import Snapshot
+
+CRITERIA = [("Vize", 40), ("Final", 60), ("Odev", 0)]
+
+
+def _snapshot():
+    """Veritabanı olmadan iki derslik küçük bir snapshot"""
+    snapshot = Snapshot()
+    snapshot.lesson_names = {1: "Ders1", 2: "Ders2"}
+    for lesson_id in snapshot.lesson_names:
+        course_ids = [lesson_id * 10 + index for index in range(3)]
+        program_ids = [lesson_id * 100 + index for index in range(2)]
+        snapshot.course_outcomes += [(course_id, f"DÇ {course_id}", lesson_id) for course_id in course_ids]
+        snapshot.program_outcomes += [(program_id, f"PÇ {program_id}", lesson_id) for program_id in program_ids]
+        snapshot.program_course_relations += [
+            (program_id, course_id, (program_id + course_id) % 3 / 2, lesson_id)
+            for program_id in program_ids for course_id in course_ids
+        ]
+        snapshot.evaluation_criteria += [(criteria, weight, lesson_id) for criteria, weight in CRITERIA]
+        snapshot.course_evaluation_relations += [
+            (course_id, criteria, (course_id + index) % 2, lesson_id)
+            for course_id in course_ids for index, (criteria, _) in enumerate(CRITERIA)
+        ]
+        students = [1000 + lesson_id * 10 + index for index in range(4)]
+        snapshot.students += [(student_id, lesson_id) for student_id in students]
+        snapshot.student_scores += [
+            (student_id, lesson_id, criteria, float((student_id * 7 + index * 13) % 101))
+            for student_id in students for index, (criteria, _) in enumerate(CRITERIA)
+        ]
+        snapshot.table3 += [(lesson_id, course_id, 0.4 + course_id % 2 * 0.6) for course_id in course_ids]
+        snapshot.table4 += [
+            (student_id, lesson_id, course_id, float((student_id + course_id) % 100))
+            for student_id in students for course_id in course_ids
+        ]
+    snapshot._build_index()
+    return snapshot
+
+
+class ParallelReportsTest(unittest.TestCase):
+    def setUp(self):
+        # Rapor dosyaları çalışma dizinine yazılır
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_openpyxl_version(self):
+        self.assertEqual(openpyxl.__version__, OPENPYXL_VERSION)
+
+    def test_parallel_output_matches_serial(self):
+        self.assertEqual(check_parallel_output(list(REPORTS), _snapshot(), workers=2), [])
+
+    def test_scoped_parallel_output_matches_serial(self):
+        # Kapsamlı üretim mevcut kitapların yalnızca bir dersin sayfalarını yeniler
+        snapshot = _snapshot()
+        create_reports_parallel(list(REPORTS), snapshot, workers=1)
+        self.assertEqual(check_parallel_output(list(REPORTS), snapshot, {2}, workers=2), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+import re
+
+import pyodbc
+from openpyxl import load_workbook
+
+from change_journal import record_change
+from connection_pool import get_connection
+from lesson_catalog import invalidate_lessons
+from relation_matrix import RelationMatrixError, upsert_relation_matrix
+from reports import LOOKUP_SHEET
+
+# create_table1 / create_table2 düzeni: her ders bir sayfa, A1 "Table N - <ders adı>".
+# A sütunu (3. satırdan itibaren) ve 2. satır (C sütunundan itibaren) çıktı kimlikleridir.
+# Kimlik yerine metin yazılırsa o metinle yeni bir çıktı eklenir (aynı metin derste varsa o kullanılır).
+# "Rel Value" / "Total" sütunları hesaplanmış değerlerdir, okunmaz; çıktı metinlerinin arama sayfası da okunmaz.
+TITLE_PATTERN = re.compile(r"^Table\s*[12]\s*-\s*(.+)$")
+SUMMARY_HEADERS = ("Rel Value", "Total")
+SKIPPED_SHEETS = ("Sheet", "DefaultSheet", LOOKUP_SHEET)
+
+
+class WorkbookImportError(ValueError):
+    """Kitap içe aktarılamadı; errors sayfa/hücre bazında hata mesajlarını içerir"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} problems in workbook:\n" + "\n".join(errors))
+
+
+def _read_sheets(path):
+    """Kitaptaki her ders sayfası için (sayfa adı, ders adı, satırlar) üretir (read_only)"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            if sheet.title in SKIPPED_SHEETS:
+                continue
+            rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+            if not rows:
+                continue
+            match = TITLE_PATTERN.match(str(rows[0][0] or "").strip())
+            lesson_name = match.group(1).strip() if match else sheet.title
+            yield sheet.title, lesson_name, rows
+    finally:
+        workbook.close()
+
+
+def _cell(rows, row, column):
+    """1 tabanlı satır/sütun; sayfa dışındaysa None"""
+    if row > len(rows) or column > len(rows[row - 1]):
+        return None
+    return rows[row - 1][column - 1]
+
+
+def _is_blank(value):
+    return value is None or str(value).strip() == ""
+
+
+def _header_columns(rows):
+    """2. satırdaki C sütunundan itibaren başlıklar: [(sütun, değer)]; özet sütununda durur"""
+    if len(rows) < 2:
+        return []
+    columns = []
+    for column in range(3, len(rows[1]) + 1):
+        value = _cell(rows, 2, column)
+        if _is_blank(value) or str(value).strip() in SUMMARY_HEADERS:
+            break
+        columns.append((column, value))
+    return columns
+
+
+def _header_rows(rows):
+    """A sütununda 3. satırdan itibaren başlıklar: [(satır, değer)]"""
+    return [(row, _cell(rows, row, 1)) for row in range(3, len(rows) + 1) if not _is_blank(_cell(rows, row, 1))]
+
+
+class _LessonState:
+    """Bir dersin veritabanındaki çıktıları; yeni eklenenler de buraya işlenir"""
+
+    def __init__(self, cursor, lesson_id):
+        self.lesson_id = lesson_id
+        cursor.execute("""
+            SET NOCOUNT ON;
+            SELECT id, data FROM ProgramOutcomes WHERE LessonID = ?;
+            SELECT id, data FROM CourseOutcomes WHERE LessonID = ?;
+            SELECT Criteria, Weight FROM EvaluationCriteria WHERE LessonID = ?;
+        """, lesson_id, lesson_id, lesson_id)
+        self.outcomes = {"ProgramOutcomes": dict(cursor.fetchall())}
+        cursor.nextset()
+        self.outcomes["CourseOutcomes"] = dict(cursor.fetchall())
+        cursor.nextset()
+        self.criteria = dict(cursor.fetchall())
+
+    def resolve_outcome(self, cursor, table_name, value, errors, location):
+        """Kimlik ise dersin çıktısı olduğunu doğrular; metin ise çıktıyı bulur ya da ekler"""
+        outcomes = self.outcomes[table_name]
+        if isinstance(value, (int, float)) or str(value).strip().isdigit():
+            outcome_id = int(float(value))
+            if outcome_id not in outcomes:
+                errors.append(f"{location}: {table_name} {outcome_id} does not belong to this lesson")
+                return None
+            return outcome_id
+
+        text = str(value).strip()
+        for outcome_id, data in outcomes.items():
+            if str(data).strip() == text:
+                return outcome_id
+        cursor.execute(f"INSERT INTO {table_name} (data, LessonID) OUTPUT inserted.id VALUES (?, ?);",
+                       text, self.lesson_id)
+        outcome_id = cursor.fetchone()[0]
+        outcomes[outcome_id] = text
+        record_change(cursor, self.lesson_id, table_name)
+        return outcome_id
+
+
+def _lesson_ids(cursor, lesson_names):
+    """Ders adlarını kimliklere çevirir; olmayan dersleri ekler. (kimlikler, ders eklendi mi) döndürür"""
+    cursor.execute("SELECT id, name FROM Lessons;")
+    ids = {name: lesson_id for lesson_id, name in cursor.fetchall()}
+    added = False
+    for name in lesson_names:
+        if name not in ids:
+            cursor.execute("INSERT INTO Lessons (name) OUTPUT inserted.id VALUES (?);", name)
+            ids[name] = cursor.fetchone()[0]
+            added = True
+            print(f"Lesson '{name}' with ID {ids[name]} has been added.")
+    return ids, added
+
+
+def _lesson_state(cursor, states, lesson_id):
+    if lesson_id not in states:
+        states[lesson_id] = _LessonState(cursor, lesson_id)
+    return states[lesson_id]
+
+
+def _import_table1_sheet(cursor, state, sheet_title, rows, errors):
+    course_columns = {}
+    for column, value in _header_columns(rows):
+        outcome_id = state.resolve_outcome(cursor, "CourseOutcomes", value, errors, f"{sheet_title}!row 2")
+        if outcome_id is not None:
+            course_columns[column] = outcome_id
+
+    cells = {}
+    for row, value in _header_rows(rows):
+        program_id = state.resolve_outcome(cursor, "ProgramOutcomes", value, errors, f"{sheet_title}!A{row}")
+        if program_id is None:
+            continue
+        for column, course_id in course_columns.items():
+            relation_value = _cell(rows, row, column)
+            if not _is_blank(relation_value):
+                cells[(program_id, course_id)] = relation_value
+
+    return upsert_relation_matrix(cursor, "ProgramCourseRelations", state.lesson_id, cells)
+
+
+def _import_table2_sheet(cursor, state, sheet_title, rows, errors):
+    criteria_columns = {}
+    weights = {}
+    for column, criteria in _header_columns(rows):
+        criteria = str(criteria).strip()
+        weight = _cell(rows, 1, column)
+        try:
+            weight = int(weight)
+            if weight < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"{sheet_title}!row 1: weight of {criteria} must be a non-negative integer")
+            continue
+        criteria_columns[column] = criteria
+        weights[criteria] = weight
+
+    if weights and sum(weights.values()) != 100:
+        errors.append(f"{sheet_title}: total weight must be 100, found {sum(weights.values())}")
+    if errors:
+        return 0
+
+    # Kriterler önce yazılır; ilişki hücreleri bunlara başvurur
+    changed = {criteria: weight for criteria, weight in weights.items() if state.criteria.get(criteria) != weight}
+    for criteria, weight in changed.items():
+        if criteria in state.criteria:
+            cursor.execute("UPDATE EvaluationCriteria SET Weight = ? WHERE Criteria = ? AND LessonID = ?;",
+                           weight, criteria, state.lesson_id)
+        else:
+            cursor.execute("INSERT INTO EvaluationCriteria (Criteria, Weight, LessonID) VALUES (?, ?, ?);",
+                           criteria, weight, state.lesson_id)
+        state.criteria[criteria] = weight
+    if changed:
+        record_change(cursor, state.lesson_id, "EvaluationCriteria")
+
+    cells = {}
+    for row, value in _header_rows(rows):
+        course_id = state.resolve_outcome(cursor, "CourseOutcomes", value, errors, f"{sheet_title}!A{row}")
+        if course_id is None:
+            continue
+        for column, criteria in criteria_columns.items():
+            relation_value = _cell(rows, row, column)
+            if not _is_blank(relation_value):
+                cells[(course_id, criteria)] = relation_value
+
+    return upsert_relation_matrix(cursor, "CourseEvaluationRelations", state.lesson_id, cells)
+
+
+def import_relation_workbooks(table1_path=None, table2_path=None):
+    """Table1 ve/veya Table2 düzenindeki kitapları tek transaction içinde içe aktarır.
+    Program/ders çıktıları, kriterler ve ilişki matrisleri eklenir ya da güncellenir.
+    Herhangi bir hata varsa hiçbir şey yazılmaz ve WorkbookImportError fırlatılır.
+    {ders id: yazılan ilişki hücresi sayısı} döndürür."""
+    sheets = []
+    if table1_path:
+        sheets.extend(("table1", *sheet) for sheet in _read_sheets(table1_path))
+    if table2_path:
+        sheets.extend(("table2", *sheet) for sheet in _read_sheets(table2_path))
+    if not sheets:
+        return {}
+
+    conn = get_connection("RelationMatrix")
+    conn.autocommit = False
+    cursor = conn.cursor()
+
+    errors = []
+    written = {}
+    states = {}
+    try:
+        lesson_ids, lessons_added = _lesson_ids(cursor, dict.fromkeys(lesson_name for _, _, lesson_name, _ in sheets))
+        # Table1 önce işlenir; Table2'de metinle verilen ders çıktıları aynı kayıtlara eşleşir
+        for layout, sheet_title, lesson_name, rows in sheets:
+            state = _lesson_state(cursor, states, lesson_ids[lesson_name])
+            sheet_errors = []
+            try:
+                if layout == "table1":
+                    count = _import_table1_sheet(cursor, state, sheet_title, rows, sheet_errors)
+                else:
+                    count = _import_table2_sheet(cursor, state, sheet_title, rows, sheet_errors)
+                written[state.lesson_id] = written.get(state.lesson_id, 0) + count
+            except RelationMatrixError as e:
+                sheet_errors.extend(f"{layout}/{sheet_title}: {error}" for error in e.errors)
+            errors.extend(sheet_errors)
+
+        if errors:
+            raise WorkbookImportError(errors)
+        conn.commit()
+        if lessons_added:
+            invalidate_lessons()
+    except (pyodbc.Error, WorkbookImportError):
+        conn.rollback()
+        print("Workbook import failed; no changes were saved.")
+        raise
+    finally:
+        conn.close()
+
+    print(f"Workbook import finished for lessons {sorted(written)}.")
+    return written
@@ -1,503 +1,25 @@
 from tkinter import *
 from PIL import Image, ImageTk
-from tkinter import ttk, messagebox
-import pyodbc
+from tkinter import ttk, messagebox, filedialog
 import pandas as pd
-from openpyxl.reader.excel import load_workbook
-from openpyxl.workbook import Workbook
-from openpyxl.comments import Comment
 
-
-def create_connection():
-    """Veritabanı bağlantısını oluşturur ve geri döndürür"""
-    conn = pyodbc.connect('DRIVER={ODBC Driver 17 for SQL Server};'
-                          'SERVER=ASUS\\SQLEXPRESS;'
-                          'DATABASE=RelationMatrix;'
-                          'Trusted_Connection=yes')
-    return conn
-
-
-def check_database():
-    conn = get_connection("master")
-    conn.autocommit = True
-
-    cursor = conn.cursor()
-
-    cursor.execute(f"SELECT database_id FROM sys.databases WHERE Name = 'RelationMatrix'")
-    database_exists = cursor.fetchone()
-
-    if database_exists:
-        print("There is already a database called RelationMatrix")
-    else:
-        cursor.execute("CREATE DATABASE RelationMatrix")
-        print("RelationMatrix database created")
-
-    conn.close()
-
-
-def check_tables():
-    conn = get_connection("RelationMatrix")
-    conn.autocommit = True
-    cursor = conn.cursor()
-
-    cursor.execute("""
-            IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Students')
-            CREATE TABLE Students (
-                Student INT,
-                lesson_id INT,
-                PRIMARY KEY (Student, lesson_id)
-            );
-        """)
-    print("Students table checked/created.")
-
-    cursor.execute("""
-        IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Lessons')
-        CREATE TABLE Lessons (
-            id INT PRIMARY KEY IDENTITY(1,1),
-            name NVARCHAR(255) NOT NULL
-        );
-    """)
-    print("Lessons table checked/created.")
-
-    tables = ["CourseOutcomes", "ProgramOutcomes", "ProgramCourseRelations", "EvaluationCriteria",
-              "CourseEvaluationRelations"]
-    for table in tables:
-        cursor.execute(f"SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = '{table}'")
-        table_exists = cursor.fetchone()[0]
-        if table_exists:
-            print(f"{table} table already exists.")
-        else:
-            if table == 'CourseOutcomes':
-                cursor.execute('''
-                    CREATE TABLE CourseOutcomes (
-                        id INT PRIMARY KEY IDENTITY(1,1),
-                        data TEXT NOT NULL,
-                        LessonID INT NOT NULL,
-                        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
-                    );
-                ''')
-            elif table == 'ProgramOutcomes':
-                cursor.execute('''
-                    CREATE TABLE ProgramOutcomes (
-                        id INT PRIMARY KEY IDENTITY(1,1),
-                        data TEXT NOT NULL,
-                        LessonID INT NOT NULL,
-                        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
-                    );
-                ''')
-            elif table == 'ProgramCourseRelations':
-                cursor.execute('''
-                    CREATE TABLE ProgramCourseRelations (
-                        ProgramOutcomeID INT NOT NULL,
-                        CourseOutcomeID INT NOT NULL,
-                        RelationValue FLOAT NOT NULL CHECK (RelationValue BETWEEN 0 AND 1),
-                        LessonID INT NOT NULL,
-                        PRIMARY KEY (ProgramOutcomeID, CourseOutcomeID, LessonID),
-                        FOREIGN KEY (ProgramOutcomeID) REFERENCES ProgramOutcomes(id),
-                        FOREIGN KEY (CourseOutcomeID) REFERENCES CourseOutcomes(id),
-                        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
-                    );
-                ''')
-            elif table == 'EvaluationCriteria':
-                cursor.execute('''
-                    CREATE TABLE EvaluationCriteria (
-                        Criteria NVARCHAR(25) NOT NULL,
-                        Weight INT NOT NULL,
-                        LessonID INT NOT NULL,
-                        PRIMARY KEY (Criteria, LessonID),
-                        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
-                    );
-                ''')
-            elif table == 'CourseEvaluationRelations':
-                cursor.execute('''
-                    CREATE TABLE CourseEvaluationRelations (
-                        CourseOutcomeID INT NOT NULL,
-                        Criteria NVARCHAR(25),
-                        RelationValue INT NOT NULL CHECK (RelationValue IN (0, 1)),
-                        LessonID INT NOT NULL,
-                        PRIMARY KEY (CourseOutcomeID, Criteria, LessonID),
-                        FOREIGN KEY (CourseOutcomeID) REFERENCES CourseOutcomes(id),
-                        FOREIGN KEY (Criteria, LessonID) REFERENCES EvaluationCriteria(Criteria, LessonID),
-                        FOREIGN KEY (LessonID) REFERENCES Lessons(id)
-                    );
-                ''')
-            print(f"{table} table created.")
-
-    conn.close()
-
-
-def create_table3():
-    workbook = Workbook()
-
-    # Ders ID'lerine göre veri filtreleme işlemi
-    lesson_names = fetch_lesson_names()
-    course_evaluation_relations = fetch_evaluation_relations()
-    course_outcomes = fetch_table_data("CourseOutcomes")
-    evaluation_criteria = fetch_evaluation_data()
-
-    # EvaluationCriteria verilerinin LessonID bazında gruplanması
-    criteria_weights = {
-        (lesson_id, criteria): weight
-        for criteria, weight, lesson_id in evaluation_criteria
-    }
-
-    for lesson_id, lesson_name in lesson_names.items():
-        sheet = workbook.create_sheet(lesson_name)
-
-        sheet.merge_cells('A1:B1')
-        sheet['A1'] = f"Table 3 - {lesson_name}"
-        sheet['C1'] = "Weighted Evaluation"
-
-        sheet.merge_cells('A2:B2')
-        sheet['A2'] = "Course Outcomes"
-
-        filtered_criteria = [
-            criteria for _, criteria, _, relation_lesson_id in course_evaluation_relations
-            if relation_lesson_id == lesson_id and (relation_lesson_id, criteria) in criteria_weights
-        ]
-
-        for col, criteria in enumerate(set(filtered_criteria), start=3):
-            sheet.cell(row=2, column=col, value=criteria)
-
-        total_col = len(set(filtered_criteria)) + 3
-        sheet.cell(row=2, column=total_col, value="Total")
-
-        weighted_data = {}
-        filtered_course_evaluation_relations = [
-            (course_outcome_id, criteria, relation_value)
-            for course_outcome_id, criteria, relation_value, relation_lesson_id in course_evaluation_relations
-            if relation_lesson_id == lesson_id
-        ]
-
-        filtered_course_outcomes = [
-            (course_outcome_id, program_text)
-            for course_outcome_id, program_text, course_lesson_id in course_outcomes
-            if course_lesson_id == lesson_id
-        ]
-
-        for course_outcome_id, criteria, relation_value in filtered_course_evaluation_relations:
-            weight = criteria_weights.get((lesson_id, criteria), 0)
-            weighted_value = (relation_value * weight) / 100
-
-            if course_outcome_id not in weighted_data:
-                weighted_data[course_outcome_id] = {}
-
-            weighted_data[course_outcome_id][criteria] = weighted_value
-
-        for row_idx, (course_outcome_id, program_text) in enumerate(filtered_course_outcomes, start=3):
-            sheet.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=2)
-            cell = sheet.cell(row=row_idx, column=1, value=course_outcome_id)
-            comment = Comment(program_text, "Database")
-            cell.comment = comment
-
-            total = 0
-            # Her kriterin değerinin eklenmesi
-            for col_idx, criteria in enumerate(set(filtered_criteria), start=3):
-                value = weighted_data.get(course_outcome_id, {}).get(criteria, 0)
-                sheet.cell(row=row_idx, column=col_idx, value=value)
-                total += value
-
-            sheet.cell(row=row_idx, column=total_col, value=total)
-
-    if 'Sheet' in workbook.sheetnames:
-        del workbook['Sheet']
-
-    workbook.save("table3.xlsx")
-
-
-def create_table4():
-    conn = get_connection("RelationMatrix")
-    cursor = conn.cursor()
-
-    # Ders kriter ağırlıklarının çekilmesi
-    cursor.execute("SELECT Criteria, Weight, LessonID FROM EvaluationCriteria;")
-    evaluation_weights = {}
-    for criteria, weight, lesson_id in cursor.fetchall():
-        if lesson_id not in evaluation_weights:
-            evaluation_weights[lesson_id] = {}
-        evaluation_weights[lesson_id][criteria] = weight
-
-    # Öğrenci verilerinin çekilmesi
-    cursor.execute("SELECT * FROM Students;")
-    student_columns = [column[0] for column in cursor.description]
-    student_data = cursor.fetchall()
-
-    # Ders çıktıları (CourseOutcomes) bilgilerinin çekilmesi
-    cursor.execute("SELECT id, data, LessonID FROM CourseOutcomes;")
-    course_outcomes = {}
-    outcome_descriptions = {}
-    for outcome_id, data, lesson_id in cursor.fetchall():
-        if lesson_id not in course_outcomes:
-            course_outcomes[lesson_id] = []
-        course_outcomes[lesson_id].append((outcome_id, data))
-        outcome_descriptions[outcome_id] = data
-
-    # Ders değerlendirme ilişkilerinin çekilmesi
-    cursor.execute("SELECT CourseOutcomeID, Criteria, RelationValue, LessonID FROM CourseEvaluationRelations;")
-    course_evaluation_relations = {}
-    for outcome_id, criteria, relation_value, lesson_id in cursor.fetchall():
-        if lesson_id not in course_evaluation_relations:
-            course_evaluation_relations[lesson_id] = {}
-        if outcome_id not in course_evaluation_relations[lesson_id]:
-            course_evaluation_relations[lesson_id][outcome_id] = {}
-        course_evaluation_relations[lesson_id][outcome_id][criteria] = relation_value
-
-    cursor.execute("SELECT lesson_id, course_outcome_id, total_score FROM Table3;")
-    total_scores = {}
-    for lesson_id, course_outcome_id, total_score in cursor.fetchall():
-        if lesson_id not in total_scores:
-            total_scores[lesson_id] = {}
-        total_scores[lesson_id][course_outcome_id] = total_score
-
-    conn.close()
-
-    lesson_names = fetch_lesson_names()
-
-    workbook = Workbook()
-    sheet_created = {}
-
-    for student in student_data:
-        student_lesson_id = student[student_columns.index("lesson_id")]
-        student_id = student[student_columns.index("Student")]
-        lesson_name = lesson_names.get(student_lesson_id, f"Lesson {student_lesson_id}")
-
-        if student_lesson_id not in sheet_created:
-            sheet = workbook.create_sheet(title=lesson_name)
-            sheet_created[student_lesson_id] = sheet
-
-            sheet.merge_cells("A1:B1")
-            sheet["A1"] = f"{lesson_name} - Table 4"
-
-            sheet["A2"] = "Student ID"
-            sheet["B2"] = "Course Outcomes"
-
-            # Kriterler, toplam, maksimum başarı oranı başlıklarının oluşturulması
-            headers = [*evaluation_weights[student_lesson_id].keys(), "Total", "Max", "% Success"]
-            for col_index, header in enumerate(headers, start=3):
-                sheet.cell(row=2, column=col_index, value=header)
-
-        sheet = sheet_created[student_lesson_id]
-        current_row = sheet.max_row + 1
-
-        for outcome_id, outcome_text in course_outcomes[student_lesson_id]:
-            sheet.cell(row=current_row, column=1, value=student_id)
-            sheet.cell(row=current_row, column=2, value=outcome_text)
-
-            sheet.cell(row=current_row, column=2).comment = Comment(outcome_descriptions[outcome_id], "System")
-
-            row = []
-            total = 0
-
-            for criteria, weight in evaluation_weights[student_lesson_id].items():
-                score = student[student_columns.index(criteria)]
-                relation_value = course_evaluation_relations[student_lesson_id].get(outcome_id, {}).get(criteria, 0)
-
-                if score is not None and relation_value != 0:
-
-                    weighted_score = score * weight * relation_value / 100
-                else:
-                    weighted_score = 0
-                row.append(weighted_score)
-                total += weighted_score
-
-            max_score = total_scores.get(student_lesson_id, {}).get(outcome_id, 0) * 100
-            success_rate = (total / max_score * 100) if max_score > 0 else 0
-
-            row.extend([total, max_score, round(success_rate, 1)])
-
-            for col_index, value in enumerate(row, start=3):
-                sheet.cell(row=current_row, column=col_index, value=value)
-
-            current_row += 1
-
-    if 'Sheet' in workbook.sheetnames:
-        if len(workbook.sheetnames) == 1:
-            # Yeni bir sayfa eklemeden önce varsayılan sayfayı silmeyin
-            workbook.create_sheet(title="DefaultSheet")
-        del workbook['Sheet']
-    workbook.save("table4.xlsx")
+from change_journal import record_change, regenerate_changed_lessons
+from columnar_export import export_lessons, read_lesson
+from connection_pool import get_connection
+from db_worker import DatabaseWorker
+from grade_import import GradeImportError, import_grades
+from lesson_catalog import get_lesson_name, get_lessons, invalidate_lessons
+from migrations import migrate_schema
+from relation_matrix import RelationMatrixError, save_relation_matrix
+from reports import create_table1, create_table2, create_table3, recompute_student
+from snapshot import load_snapshot
+from student_scores import insert_student_scores
+from workbook_import import WorkbookImportError, import_relation_workbooks
 
 
-def create_table5():
-    conn = get_connection("RelationMatrix")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT id, name FROM Lessons;")
-    lessons = {row[0]: row[1] for row in cursor.fetchall()}
-
-    cursor.execute("SELECT * FROM Students;")
-    student_columns = [column[0] for column in cursor.description]
-    student_data = cursor.fetchall()
-
-    cursor.execute("SELECT id, data, LessonID FROM ProgramOutcomes;")
-    program_outcomes = {}
-    for program_id, data, lesson_id in cursor.fetchall():
-        if lesson_id not in program_outcomes:
-            program_outcomes[lesson_id] = {}
-        program_outcomes[lesson_id][program_id] = data
-
-    cursor.execute("SELECT id, data, LessonID FROM CourseOutcomes;")
-    course_outcomes = {}
-    for outcome_id, data, lesson_id in cursor.fetchall():
-        if lesson_id not in course_outcomes:
-            course_outcomes[lesson_id] = []
-        course_outcomes[lesson_id].append((outcome_id, data))
-
-    cursor.execute("SELECT ProgramOutcomeID, CourseOutcomeID, RelationValue, LessonID FROM ProgramCourseRelations;")
-    relations = {}
-    for program_id, course_id, relation_value, lesson_id in cursor.fetchall():
-        if lesson_id not in relations:
-            relations[lesson_id] = {}
-        if program_id not in relations[lesson_id]:
-            relations[lesson_id][program_id] = {}
-        relations[lesson_id][program_id][course_id] = relation_value
-
-    cursor.execute("SELECT student_id, course_outcome_id, success_rate FROM Table4;")
-    success_rates = {}
-    for student_id, course_outcome_id, success_rate in cursor.fetchall():
-        if student_id not in success_rates:
-            success_rates[student_id] = {}
-        success_rates[student_id][course_outcome_id] = success_rate
-
-    conn.close()
-    workbook = Workbook()
-
-    for lesson_id, lesson_name in lessons.items():
-        sheet = workbook.create_sheet(title=f"{lesson_name}")
-        sheet.merge_cells("A1:C1")
-        sheet["A1"] = f"{lesson_name} - Table 5"
-
-        sheet["A2"] = "Student ID"
-        sheet["B2"] = "Program Outcomes"
-        lesson_course_outcomes = course_outcomes.get(lesson_id, [])
-        for idx, (_, course_outcome_text) in enumerate(lesson_course_outcomes, start=3):
-            sheet.cell(row=2, column=idx, value=course_outcome_text)
-
-        sheet.cell(row=2, column=len(lesson_course_outcomes) + 3, value="Success Rate")
-
-        current_row = 3
-        for student in student_data:
-            student_id = student[student_columns.index("Student")]
-            student_lesson_id = student[student_columns.index("lesson_id")]
-
-            if student_lesson_id != lesson_id:
-                continue
-
-            lesson_program_outcomes = program_outcomes.get(lesson_id, {})
-
-            for program_outcome_id, program_outcome_text in lesson_program_outcomes.items():
-                relation_values = []
-                row_values = []
-
-                for course_outcome_id, _ in lesson_course_outcomes:
-                    relation_value = relations.get(lesson_id, {}).get(program_outcome_id, {}).get(course_outcome_id, 0)
-                    success_rate = success_rates.get(student_id, {}).get(course_outcome_id, 0)
-                    weighted_value = relation_value * success_rate
-                    relation_values.append(relation_value)
-                    row_values.append(weighted_value)
-
-                total_success = sum(row_values)
-                num_course_outcomes = len(lesson_course_outcomes)
-                avg_success = total_success / num_course_outcomes if num_course_outcomes else 0
-                avg_relation_value = sum(relation_values) / len(relation_values) if relation_values else 0
-                ratio = avg_success / avg_relation_value if avg_relation_value else 0
-
-                sheet.cell(row=current_row, column=1, value=student_id)
-                sheet.cell(row=current_row, column=2, value=program_outcome_text)
-                for col_index, value in enumerate(row_values, start=3):
-                    sheet.cell(row=current_row, column=col_index, value=round(value, 1))
-                sheet.cell(row=current_row, column=len(lesson_course_outcomes) + 3, value=round(ratio, 1))
-
-                current_row += 1
-
-    del workbook["Sheet"]
-    workbook.save("table5.xlsx")
-
-
-def create_notes():
-    workbook = Workbook()
-    conn = get_connection("RelationMatrix")
-    cursor = conn.cursor()
-
-    # Ders adlarını almak için fetch_lesson_names fonksiyonu kullanımı
-    lesson_names = fetch_lesson_names()
-
-    # Öğrenciler tablosundaki derslerin alınması
-    cursor.execute("SELECT DISTINCT lesson_id FROM Students;")
-    lesson_ids = [row[0] for row in cursor.fetchall()]
-
-    if not lesson_ids:
-        print("No lessons found in Students table.")
-        return
-
-    for lesson_id in lesson_ids:
-        lesson_name = lesson_names.get(lesson_id, "Unknown Lesson")
-
-        sheet = workbook.create_sheet(title=f"Lesson {lesson_id}")
-        sheet.merge_cells('A1:B1')
-        sheet['A1'] = f"Table Note - {lesson_name}"
-        sheet['C1'] = "Notes"
-
-        cursor.execute("""
-            SELECT ec.Criteria, ec.Weight
-            FROM EvaluationCriteria ec
-            WHERE ec.LessonID = ?;
-        """, (lesson_id,))
-        criteria_weights = {row[0]: row[1] for row in cursor.fetchall()}
-
-        if not criteria_weights:
-            print(f"No criteria found for Lesson ID {lesson_id}.")
-            continue
-
-        criteria_columns = [f"[{criterion}]" for criterion in criteria_weights.keys()]
-        columns_str = ", ".join(criteria_columns)
-
-        cursor.execute(f"""
-            SELECT s.Student, s.lesson_id, {columns_str}
-            FROM Students s
-            WHERE s.lesson_id = ?;
-        """, (lesson_id,))
-        rows = cursor.fetchall()
-
-        if not rows:
-            print(f"No data found for Lesson ID {lesson_id}.")
-            continue
-
-        columns = ["Student "] + list(criteria_weights.keys()) + ["Average"]
-        for col_idx, column_name in enumerate(columns, start=1):
-            sheet.cell(row=2, column=col_idx, value=column_name)
-
-        for row_idx, row in enumerate(rows, start=3):
-            student_id = row[0]
-            sheet.cell(row=row_idx, column=1, value=student_id)
-
-            total_score = 0
-            weight_sum = 0
-            for col_idx, (criterion, value) in enumerate(zip(criteria_weights.keys(), row[2:]), start=2):
-                if value is not None:
-                    sheet.cell(row=row_idx, column=col_idx, value=value)
-                    weight = criteria_weights.get(criterion, 0)
-                    total_score += value * weight
-                    weight_sum += weight
-                else:
-                    sheet.cell(row=row_idx, column=col_idx, value=0)
-
-            average = total_score / 100 if weight_sum == 100 else total_score / weight_sum
-            sheet.cell(row=row_idx, column=len(columns), value=round(average, 2))
-
-    del workbook['Sheet']
-    workbook.save("notlar.xlsx")
-    conn.close()
-
-
-def get_connection(database=None):
-    connection_string = (
-        "Driver={ODBC Driver 17 for SQL Server};"
-        "Server=ASUS\\SQLEXPRESS;"
-        f"Database={database or 'master'};"
-        "Trusted_Connection=yes;"
-    )
-    return pyodbc.connect(connection_string)
+def create_connection():
+    """Veritabanı bağlantısını havuzdan alır ve geri döndürür"""
+    return get_connection("RelationMatrix")
 
 
 def insert_data_into_table(table_name, data, lesson_id):
@@ -509,6 +31,7 @@ def insert_data_into_table(table_name, data, lesson_id):
         cursor.execute("INSERT INTO CourseOutcomes (data, LessonID) VALUES (?, ?)", (data, lesson_id))
     elif table_name == 'ProgramOutcomes':
         cursor.execute("INSERT INTO ProgramOutcomes (data, LessonID) VALUES (?, ?)", (data, lesson_id))
+    record_change(cursor, lesson_id, table_name)
 
     conn.close()
 
@@ -519,10 +42,18 @@ def delete_data_from_table_by_id(table_name, record_id):
     cursor = conn.cursor()
     print("id", record_id)
 
+    # Silinen satırın dersi journal'a yazılmak üzere OUTPUT ile alınır
     if table_name == 'CourseOutcomes':
-        cursor.execute("DELETE FROM CourseOutcomes WHERE id = ?", (record_id,))
+        cursor.execute("DELETE FROM CourseOutcomes OUTPUT deleted.LessonID WHERE id = ?", (record_id,))
     elif table_name == 'ProgramOutcomes':
-        cursor.execute("DELETE FROM ProgramOutcomes WHERE id = ?", (record_id,))
+        cursor.execute("DELETE FROM ProgramOutcomes OUTPUT deleted.LessonID WHERE id = ?", (record_id,))
+    else:
+        conn.close()
+        return
+
+    deleted = cursor.fetchone()
+    if deleted:
+        record_change(cursor, deleted[0], table_name)
     conn.close()
 
 
@@ -537,13 +68,63 @@ def get_data_from_table(table_name):
     return data, cursor.description
 
 
+def show_loading(frame):
+    """Arka plan işi sürerken çerçevenin sağ üstünde hareketli bir gösterge gösterir"""
+    indicator = Frame(frame)
+    Label(indicator, text="Yükleniyor...", font=("Arial", 9)).pack(side=LEFT, padx=5)
+    progress = ttk.Progressbar(indicator, mode="indeterminate", length=80)
+    progress.pack(side=LEFT)
+    progress.start(15)
+    indicator.place(relx=1.0, x=-10, y=5, anchor="ne")
+    return indicator
+
+
+def run_in_background(func, *args, frame=None, on_success=None, on_error=None, key=None,
+                      error_message="Bir hata oluştu. Veriler alınamadı."):
+    """func'ı veritabanı iş parçacığında çalıştırır; sonucu Tk thread'inde on_success'e verir.
+    frame verilmişse iş sürerken gösterge gösterilir ve çerçeve kapatılmışsa sonuç atılır.
+    on_error verilmezse hata error_message ile gösterilir."""
+    indicator = show_loading(frame) if frame is not None else None
+
+    def deliver(result):
+        if on_success is not None and (frame is None or frame.winfo_exists()):
+            on_success(result)
+
+    def deliver_error(e):
+        if on_error is not None:
+            if frame is None or frame.winfo_exists():
+                on_error(e)
+        else:
+            messagebox.showerror("Hata", error_message)
+
+    def on_done():
+        if indicator is not None and indicator.winfo_exists():
+            indicator.destroy()
+
+    return db_worker.submit(func, *args, on_success=deliver, on_error=deliver_error, on_done=on_done, key=key)
+
+
+def fetch_lesson_name(l_id):
+    # Ders adları önbellekten okunur
+    lesson_name = get_lesson_name(l_id)
+    if lesson_name is None:
+        print("Lesson not found for the selected_id:", l_id)
+    return lesson_name
+
+
 def display_data_in_treeview(table_name, frame, x, y, l_id):
+    # Aynı çerçeve için verilmiş eski istek varsa sonucu gösterilmez
+    run_in_background(
+        get_data_from_table_with_filter, table_name, l_id, frame=frame, key=f"treeview{frame}",
+        on_success=lambda result: render_treeview(table_name, frame, x, y, l_id, *result),
+    )
+
+
+def render_treeview(table_name, frame, x, y, l_id, data, description):
     for widget in frame.winfo_children():
         if isinstance(widget, ttk.Treeview):
             widget.destroy()
 
-    data, description = get_data_from_table_with_filter(table_name, l_id)
-
     columns = [desc[0] for desc in description]
 
     if table_name == 'Students':
@@ -584,133 +165,104 @@ def display_data_in_treeview(table_name, frame, x, y, l_id):
 
 
 def on_row_select(event, frame, tree, student_no, l_id):
-    conn = get_connection("RelationMatrix")
-    conn.autocommit = True
-    cursor = conn.cursor()
+    """Bir satır seçildiğinde ilgili verileri gösterir"""
+    selected_item = tree.selection()
+    if not selected_item:
+        return
 
-    query = "SELECT name FROM Lessons WHERE id = ?"
-    cursor.execute(query, (l_id,))
-    result = cursor.fetchone()
+    row_values = tree.item(selected_item[0], "values")
+    if student_no is None:
+        print("Error: Student No index is None")
+        return
+    student_no = row_values[student_no]
+    print(f"Selected Student No: {student_no}")
 
-    if result:
-        lesson_name = result[0]
-        print("Lesson Name:", lesson_name)
-    else:
-        print("Lesson not found for the selected_id:", l_id)
+    # Yalnızca son seçilen öğrencinin sonuçları gösterilir
+    run_in_background(
+        load_student_results, l_id, student_no, frame=frame, key=f"student_results{frame}",
+        on_success=lambda results: render_student_results(frame, results),
+    )
 
-    cursor.close()
-    conn.close()
 
-    """Bir satır seçildiğinde ilgili verileri gösterir"""
-    selected_item = tree.selection()[0]
-    row_index = tree.index(selected_item)
+def _read_student_sheet(file_path, lesson_name, student_no):
+    """Tablo sayfasının başlık metnini, sütunlarını ve öğrencinin satırlarını okur"""
+    df = pd.read_excel(file_path, sheet_name=lesson_name, header=None)
+    df = df.dropna(how="all", axis=0)
+    df = df.dropna(how="all", axis=1)
 
-    selected_item = tree.selection()
-    if selected_item:
-        selected_item_id = selected_item[0]
-        row_values = tree.item(selected_item_id, "values")
+    df = df.fillna("")
 
-        if student_no is not None:
-            student_no = row_values[student_no]
-            print(f"Selected Student No: {student_no}")
-        else:
-            print("Error: Student No index is None")
+    df_reset = df.reset_index(drop=True)
 
-    file_path1 = "table4.xlsx"
-    file_path2 = "table5.xlsx"
+    if df.empty:
+        return None, [], []
 
-    wb = load_workbook(file_path1, data_only=True)
-    sheet_names = wb.sheetnames
+    # Öğrenci numarasına göre filtreleme, 3. satırdan itibaren (ilk sütun öğrenci numarası)
+    df_filtered = df_reset.iloc[2:]
+    df_filtered = df_filtered[df_filtered.iloc[:, 0].astype(str) == str(student_no)]
 
-    if lesson_name in sheet_names:
-        sheet1 = wb[lesson_name]
+    non_empty_values = [str(value) for value in df.iloc[0].values if pd.notnull(value)]
+    header_text = " ".join(non_empty_values)
 
-    df1 = pd.read_excel(file_path1, sheet_name=lesson_name, header=None)
-    df1 = df1.dropna(how="all", axis=0)
-    df1 = df1.dropna(how="all", axis=1)
+    # Sütun başlıkları ikinci satırdadır
+    if len(df) > 1:
+        columns = list(df.iloc[1].values)
+        rows = [list(row) for _, row in df_filtered.iterrows()]
+    else:
+        columns = []
+        rows = []
 
-    df1 = df1.fillna("")
+    return header_text, columns, rows
 
-    df1_reset = df1.reset_index(drop=True)
 
-    if not df1.empty:
-        df1_filtered = df1_reset.iloc[2:]
-        df1_filtered = df1_filtered[df1_filtered.iloc[:, 0].astype(str) == str(student_no)]
-    else:
-        df1_filtered = pd.DataFrame()
+def _student_partition_rows(df, header_text, student_no):
+    """Sütunlu dosyadaki öğrencinin satırları; _read_student_sheet ile aynı biçimde"""
+    rows = df[df["Student ID"].astype(str) == str(student_no)]
+    return header_text, list(df.columns), rows.astype(object).where(rows.notna(), "").values.tolist()
 
-    if not df1.empty:
-        non_empty_values1 = [str(value) for value in df1.iloc[0].values if pd.notnull(value)]
-        header_label_text1 = " ".join(non_empty_values1)
-        header_label1 = Label(frame, text=header_label_text1, font=("Arial", 12, "bold"))
-        header_label1.place(x=10, y=200)
 
-    if len(df1) > 1:
-        columns1 = list(df1.iloc[1].values)
-        data1 = df1_filtered.reset_index(drop=True)  # Yeni index ile veriyi sıfırla
-    else:
-        columns1 = []
-        data1 = pd.DataFrame()
+def load_student_results(l_id, student_no):
+    """Arka planda çalışır: öğrencinin table4 ve table5 satırları.
+    Dersin sütunlu dosyaları varsa onlardan, yoksa Excel'den okunur."""
+    lesson_name = fetch_lesson_name(l_id)
+    if lesson_name is None:
+        return None
 
-    table4 = ttk.Treeview(frame, columns=columns1, show='headings', height=20)
-    for col in columns1:
-        table4.heading(col, text=col)
-        table4.column(col, width=100)
+    table4 = read_lesson("table4", l_id)
+    table5 = read_lesson("table5", l_id)
+    if table4 is None or table5 is None:
+        return (_read_student_sheet("table4.xlsx", lesson_name, student_no),
+                _read_student_sheet("table5.xlsx", lesson_name, student_no))
 
-    for _, row in data1.iterrows():
-        table4.insert("", "end", values=list(row))
+    # Tablo 5'in sütunları ders çıktısı kimlikleridir; Excel'deki gibi metinleri gösterilir
+    course_texts = dict(zip(table4["Course Outcome ID"].astype(str), table4["Course Outcomes"]))
+    return (
+        _student_partition_rows(table4.drop(columns="Course Outcome ID"), f"{lesson_name} - Table 4", student_no),
+        _student_partition_rows(table5.drop(columns="Program Outcome ID").rename(columns=course_texts),
+                                f"{lesson_name} - Table 5", student_no),
+    )
 
-    row_height = 20
-    total_height = (len(data1) + 4) * row_height
-    table4.place(x=10, y=230, height=total_height)
-
-    # İkinci tabloyu (table5) yükle
-    df2 = pd.read_excel(file_path2, sheet_name=lesson_name, header=None)
-    df2 = df2.dropna(how="all", axis=0)
-    df2 = df2.dropna(how="all", axis=1)
-
-    # Boş hücreleri 0 ile doldur
-    df2 = df2.fillna("")
-
-    # Dataframe index'ini sıfırlıyoruz
-    df2_reset = df2.reset_index(drop=True)
-
-    # Öğrenci numarasına göre filtreleme, 3. satırdan itibaren
-    if not df2.empty:
-        # 3. satırdan itibaren ilk sütun ile öğrenci numarasını karşılaştır
-        df2_filtered = df2_reset.iloc[2:]  # 3. satırdan sonrasını al
-        df2_filtered = df2_filtered[
-            df2_filtered.iloc[:, 0].astype(str) == str(student_no)]  # İlk sütun öğrenci numarası
-    else:
-        df2_filtered = pd.DataFrame()
-
-    if not df2.empty:
-        non_empty_values2 = [str(value) for value in df2.iloc[0].values if pd.notnull(value)]
-        header_label_text2 = " ".join(non_empty_values2)
-        header_label2 = Label(frame, text=header_label_text2, font=("Arial", 12, "bold"))
-        header_label2.place(x=10, y=470)
-
-    # Sütun başlıklarını ikinci satırdan al
-    if len(df2) > 1:
-        columns2 = list(df2.iloc[1].values)
-        data2 = df2_filtered.reset_index(drop=True)  # Yeni index ile veriyi sıfırla
-    else:
-        columns2 = []
-        data2 = pd.DataFrame()
 
-    # İkinci tabloyu (table5) oluştur
-    table5 = ttk.Treeview(frame, columns=columns2, show='headings', height=20)
-    for col in columns2:
-        table5.heading(col, text=col)
-        table5.column(col, width=100)
+def render_student_results(frame, results):
+    if results is None:
+        return
 
-    # Satırları ekle
-    for _, row in data2.iterrows():
-        table5.insert("", "end", values=list(row))
+    for (header_text, columns, rows), header_y, table_y in zip(results, (200, 470), (230, 500)):
+        if header_text is not None:
+            header_label = Label(frame, text=header_text, font=("Arial", 12, "bold"))
+            header_label.place(x=10, y=header_y)
 
-    row_height = 20
-    total_height2 = (len(data2) + 4) * row_height
-    table5.place(x=10, y=500, height=total_height2)
+        table = ttk.Treeview(frame, columns=columns, show='headings', height=20)
+        for col in columns:
+            table.heading(col, text=col)
+            table.column(col, width=100)
+
+        for row in rows:
+            table.insert("", "end", values=row)
+
+        row_height = 20
+        total_height = (len(rows) + 4) * row_height
+        table.place(x=10, y=table_y, height=total_height)
 
 
 def validate_input(value):
@@ -763,10 +315,16 @@ def get_data_from_table_with_filter(table_name, l_id):
         return data, description
 
 
+# Şema, ders listesi okunmadan önce son sürüme getirilir
+migrate_schema()
+
 root = Tk()
 root.title("KOCAELİ SAĞLIK VE TEKNOLOJİ ÜNİVERSİTESİ - Ders Verileri Giriş Ekranı")
 root.geometry("1500x790+0+0")
 
+# Sorgular Tk thread'ini bekletmez; sonuçlar root.after ile geri gelir
+db_worker = DatabaseWorker(root)
+
 frame1 = Frame(root)
 frame2 = Frame(root)
 
@@ -796,23 +354,7 @@ title_label.pack(pady=10)
 # Dropdown menü
 
 def check_lessons():
-    conn = get_connection("RelationMatrix")
-    conn.autocommit = True
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'Lessons')
-        CREATE TABLE Lessons (
-            id INT PRIMARY KEY IDENTITY(1,1),
-            name NVARCHAR(255) NOT NULL
-        );
-    """)
-
-    cursor.execute("SELECT id, name FROM Lessons")
-    courses = [f"{row[0]} - {row[1]}" for row in cursor.fetchall()]
-
-    conn.close()
-    return courses
+    return [f"{lesson_id} - {name}" for lesson_id, name in get_lessons().items()]
 
 
 selected_course = StringVar()
@@ -834,21 +376,29 @@ new_course_entry = Entry(frame1, width=30)
 new_course_entry.pack(pady=5)
 
 
-def add_course():
+def insert_lesson(new_course):
+    """Arka planda çalışır: dersi ekler, (yeni id, güncel ders listesi) döndürür"""
     conn = get_connection("RelationMatrix")
     conn.autocommit = True
     cursor = conn.cursor()
+    cursor.execute("INSERT INTO Lessons (name) OUTPUT inserted.id VALUES (?)", (new_course,))
+    new_id = cursor.fetchone()[0]
+    conn.close()
+    invalidate_lessons()
+    return new_id, check_lessons()
+
 
+def add_course():
     new_course = new_course_entry.get()
     if new_course:
-        cursor.execute("INSERT INTO Lessons (name) VALUES (?)", (new_course))
-
-        courses = check_lessons()
-        dropdown['values'] = courses
+        def on_added(result):
+            new_id, courses = result
+            dropdown['values'] = courses
+            selected_course.set(f"{new_id} - {new_course}")
+            new_course_entry.delete(0, END)
 
-        selected_course.set(f"{cursor.id} - {new_course}")
-
-        new_course_entry.delete(0, END)
+        run_in_background(insert_lesson, new_course, frame=frame1, on_success=on_added,
+                          error_message="Bir hata oluştu. Ders eklenemedi.")
 
     else:
         status_label.config(text="Lütfen bir ders adı girin.", fg="red")
@@ -877,15 +427,21 @@ next_button.pack(pady=10)
 
 
 def insert_table(table_name, data, lesson_id, frame):
-    insert_data_into_table(table_name, data, lesson_id)
-    print(f"Data has been inserted into {table_name}.")
-    display_data_in_treeview(table_name, frame, 10, 40, lesson_id)
+    def on_inserted(_):
+        print(f"Data has been inserted into {table_name}.")
+        display_data_in_treeview(table_name, frame, 10, 40, lesson_id)
+
+    run_in_background(insert_data_into_table, table_name, data, lesson_id, frame=frame, on_success=on_inserted,
+                      error_message="Bir hata oluştu. Veriler kaydedilemedi.")
 
 
 def del_from_table(table_name, id, lesson_id, frame):
-    delete_data_from_table_by_id(table_name, id)
-    print(f"Data has been deleted from {table_name}, {id}.")
-    display_data_in_treeview(table_name, frame, 10, 40, lesson_id)
+    def on_deleted(_):
+        print(f"Data has been deleted from {table_name}, {id}.")
+        display_data_in_treeview(table_name, frame, 10, 40, lesson_id)
+
+    run_in_background(delete_data_from_table_by_id, table_name, id, frame=frame, on_success=on_deleted,
+                      error_message="Bir hata oluştu. Veri silinemedi.")
 
 
 def show_frame1():
@@ -904,22 +460,56 @@ def validate_input(value):
         return False
 
 
+def show_relation_error(e):
+    if isinstance(e, RelationMatrixError):
+        messagebox.showerror("Geçersiz Değer", "\n".join(e.errors))
+    else:
+        print("Hata:", e)
+        messagebox.showerror("Hata", "Bir hata oluştu. Veriler kaydedilemedi.")
+
+
 # İliski Ekleme
-def insert_relation_value(program_outcome_id, course_outcome_id, relation_value, lesson_id):
-    conn = get_connection("RelationMatrix")
-    conn.autocommit = True
-    cursor = conn.cursor()
+def insert_relation_value(program_outcome_id, course_outcome_id, relation_value, lesson_id, frame=None):
     if not validate_input(relation_value):
         return
 
-    cursor.execute('''
-        INSERT INTO ProgramCourseRelations (ProgramOutcomeID, CourseOutcomeID, RelationValue, LessonID)
-        VALUES (?, ?, ?, ?);
-    ''', program_outcome_id, course_outcome_id, relation_value, lesson_id)
+    def on_saved(_):
+        print(
+            f"Relation between ProgramOutcome {program_outcome_id} and CourseOutcome {course_outcome_id} for Lesson {lesson_id} has been saved.")
+        messagebox.showinfo("Kaydedildi", "İlişki değeri kaydedildi.")
+
+    # Hücre varsa güncellenir, yoksa eklenir
+    run_in_background(save_relation_matrix, "ProgramCourseRelations", lesson_id,
+                      {(program_outcome_id, course_outcome_id): relation_value},
+                      frame=frame, on_success=on_saved, on_error=show_relation_error)
+
+
+def create_report_file(create_table, lesson_id, frame):
+    """Dersin rapor dosyasını arka planda oluşturur"""
+    run_in_background(
+        create_table, None, {lesson_id}, frame=frame, key=f"{create_table.__name__}{frame}",
+        on_success=lambda _: messagebox.showinfo("Tablo Oluşturuldu", "Tablo dosyası oluşturuldu."),
+        error_message="Bir hata oluştu. Tablo oluşturulamadı.",
+    )
 
-    print(
-        f"Relation between ProgramOutcome {program_outcome_id} and CourseOutcome {course_outcome_id} for Lesson {lesson_id} has been inserted.")
-    conn.close()
+
+# Table1 / Table2 düzenindeki kitaptan toplu yükleme
+def import_relation_workbook_file(layout):
+    path = filedialog.askopenfilename(title="Excel Dosyası Seçiniz", filetypes=[("Excel", "*.xlsx")])
+    if not path:
+        return
+
+    def on_error(e):
+        if isinstance(e, WorkbookImportError):
+            messagebox.showerror("Hata", "Dosya yüklenemedi:\n" + "\n".join(e.errors[:20]))
+        else:
+            print("Hata:", e)
+            messagebox.showerror("Hata", "Bir hata oluştu. Veriler kaydedilemedi.")
+
+    run_in_background(
+        import_relation_workbooks, *((path, None) if layout == "table1" else (None, path)), on_error=on_error,
+        on_success=lambda written: messagebox.showinfo("Excel'den Yükleme", f"{len(written)} dersin verileri yüklendi."),
+    )
 
 
 def fetch_table_data(table_name):
@@ -938,18 +528,7 @@ def fetch_table_data(table_name):
 
 
 def fetch_lesson_names():
-    conn = get_connection("RelationMatrix")
-    cursor = conn.cursor()
-
-    query = "SELECT id, name FROM Lessons;"
-    cursor.execute(query)
-
-    lesson_names = dict(cursor.fetchall())
-
-    cursor.close()
-    conn.close()
-
-    return lesson_names
+    return get_lessons()
 
 
 def fetch_evaluation_data():
@@ -1002,204 +581,57 @@ def fetch_relations():
     return relations
 
 
-def create_table1():
-    workbook = Workbook()
-    lesson_names = fetch_lesson_names()
-
-    program_outcomes = fetch_table_data("ProgramOutcomes")
-    course_outcomes = fetch_table_data("CourseOutcomes")
-
-    program_row_count = len(program_outcomes)
-    course_row_count = len(course_outcomes)
-
-    for lesson_id, lesson_name in lesson_names.items():
-        sheet = workbook.create_sheet(lesson_name)
-
-        sheet.merge_cells('A1:B1')
-        sheet['A1'] = f"Table 1 - {lesson_name}"
-        sheet.merge_cells('A2:B2')
-        sheet['A2'] = "Program Outcomes"
-        sheet.merge_cells(start_row=1, start_column=3, end_row=1, end_column=course_row_count + 2)
-        sheet['C1'] = "Course Outcomes"
-
-        for i, (program_id, program_text, program_lesson_id) in enumerate(program_outcomes, start=1):
-            if program_lesson_id == lesson_id:  # LessonID'ye göre filtreleme işlemi
-                sheet.merge_cells(f"A{i + 2}:B{i + 2}")
-                cell = sheet[f"A{i + 2}"]
-                cell.value = program_id
-                comment = Comment(program_text, "Database")
-                cell.comment = comment
-
-        for j, (course_id, course_text, course_lesson_id) in enumerate(course_outcomes, start=1):
-            if course_lesson_id == lesson_id:  # LessonID'ye göre filtreleme işlemi
-                c = sheet.cell(row=2, column=j + 2)
-                c.value = course_id
-                comment = Comment(course_text, "Database")
-                c.comment = comment
-
-        relations = fetch_relations()
-        for relation in relations:
-            program_outcome_id, course_outcome_id, relation_value, relation_lesson_id = relation
-            if relation_lesson_id == lesson_id:
-                row = program_outcome_id + 2
-                col = course_outcome_id + 2
-                sheet.cell(row=row, column=col, value=relation_value)
-
-        for i in range(3, program_row_count + 3):
-            course_outcomes_count = sum(
-                1 for (course_id, _, course_lesson_id) in course_outcomes if course_lesson_id == lesson_id
-            )
-
-            total = sum(sheet.cell(row=i, column=j).value or 0 for j in range(3, course_row_count + 3))
-            result = round((total / course_outcomes_count), 2) if course_outcomes_count > 0 else 0
-            sheet.cell(row=i, column=course_row_count + 3, value=result)
-
-        sheet.cell(row=2, column=course_row_count + 3, value="Rel Value")
-    del workbook['Sheet']
-
-    workbook.save(filename="table1.xlsx")
-
-
-def create_table2():
-    workbook = Workbook()
-    lesson_names = fetch_lesson_names()
-
-    for lesson_id, lesson_name in lesson_names.items():
-        sheet = workbook.create_sheet(lesson_name)
-
-        sheet.merge_cells('A1:B1')
-        sheet['A1'] = f"Table 2 - {lesson_name}"
-        sheet.merge_cells('A2:B2')
-        sheet['A2'] = "Course Outcomes"
-
-        course_outcomes = fetch_table_data("CourseOutcomes")
-        filtered_course_outcomes = [
-            (course_id, course_text) for course_id, course_text, course_lesson_id in course_outcomes
-            if course_lesson_id == lesson_id
-        ]
-        for i, (course_id, course_text) in enumerate(filtered_course_outcomes, start=1):
-            sheet.merge_cells(f"A{i + 2}:B{i + 2}")
-            cell = sheet[f"A{i + 2}"]
-            cell.value = course_id
-            comment = Comment(course_text, "Database")
-            cell.comment = comment
-
-        evaluation_criteria = fetch_evaluation_data()
-        filtered_criteria = [
-            (criteria, weight) for criteria, weight, criteria_lesson_id in evaluation_criteria
-            if criteria_lesson_id == lesson_id
-        ]
-        for index, (criteria, weight) in enumerate(filtered_criteria, start=3):
-            sheet.cell(row=1, column=index, value=weight)
-            sheet.cell(row=2, column=index, value=criteria)
-
-        evaluation_relations = fetch_evaluation_relations()
-        for relation in evaluation_relations:
-            course_outcome_id, criteria, relation_value, relation_lesson_id = relation
-            if relation_lesson_id == lesson_id:
-                row = None
-                for i, (course_id, _) in enumerate(filtered_course_outcomes, start=3):
-                    if course_outcome_id == course_id:
-                        row = i
-                        break
-
-                col = None
-                for j, (crit, _) in enumerate(filtered_criteria, start=3):
-                    if crit == criteria:
-                        col = j
-                        break
-
-                if row and col:
-                    sheet.cell(row=row, column=col, value=relation_value)
-
-        total_col = len(filtered_criteria) + 3
-        sheet.cell(row=2, column=total_col, value="Total")
-        for row_idx in range(3, len(filtered_course_outcomes) + 3):
-            total = sum(sheet.cell(row=row_idx, column=col_idx).value or 0 for col_idx in range(3, total_col))
-            sheet.cell(row=row_idx, column=total_col, value=total)
-
-    del workbook['Sheet']
-    workbook.save(filename="table2.xlsx")
-
-
-def show_excel(table, frame, lesson_name):
-    create_table2()
-    create_table1()
-
-    file_path = table + ".xlsx"
-    wb = load_workbook(file_path, data_only=True)
-    sheet_names = wb.sheetnames
-
-    if lesson_name in sheet_names:
-        sheet = wb[lesson_name]
-
-    df = pd.read_excel(file_path, sheet_name=lesson_name, header=None)
-
-    df = df.dropna(how="all", axis=0)
-    df = df.dropna(how="all", axis=1)
-    df = df[df.iloc[:, 0].notna()]
-
-    second_row = df.iloc[1]
-    non_empty_columns = second_row.dropna().index.tolist()
+def show_excel(table, frame, lesson_id):
+    run_in_background(
+        load_excel, table, lesson_id, frame=frame, key=f"excel{frame}",
+        on_success=lambda result: render_excel(table, frame, *result),
+    )
 
-    df = df[non_empty_columns]
 
-    if len(df) > 1:
-        columns = list(df.iloc[1].values)
-        data = df.iloc[2:].reset_index(drop=True)
+def load_excel(table, lesson_id):
+    """Arka planda çalışır: dersin sayfasını ve sütunlu dosyasını yeniden oluşturur,
+    (sütunlar, satırlar) döndürür. Satırlar Excel yerine dersin sütunlu dosyasından okunur (bkz. columnar_export)."""
+    # Yalnızca görüntülenen dersin sayfası yeniden oluşturulur
+    snapshot = load_snapshot({lesson_id})
+    if table == "table1":
+        create_table1(snapshot, {lesson_id})
     else:
-        columns = []
-        data = pd.DataFrame()
+        create_table2(snapshot, {lesson_id})
+    export_lessons(snapshot, {lesson_id}, [table])
 
-    treeview = ttk.Treeview(frame, columns=columns, show='headings', height=10)
+    df = read_lesson(table, lesson_id)
+    if df is None or df.empty:
+        return [], []
 
+    # Çıktı metinleri Table 2'de kimliğin yanında gösterilir
+    texts = df.pop("Text")
     if table == "table2":
-        for idx, col in enumerate(columns):
-            treeview.heading(col, text=col)
-
-            if idx == 0:
-                treeview.column(col, width=900)
-            else:
-                treeview.column(col, width=50)
-        comments_dict = {}
-
-        for row_num, row in enumerate(sheet.iter_rows()):
-            for col_num, cell in enumerate(row):
-                if cell.comment:
-                    comments_dict[(row_num, col_num)] = cell.comment.text
-
-        for row_index, row in data.iterrows():
-            row_values = list(row)
-            for col_index, value in enumerate(row_values):
-                if pd.isna(value):
-                    value = ""
+        df[df.columns[0]] = [
+            f"{outcome_id}. {text}" if isinstance(text, str) and text else outcome_id
+            for outcome_id, text in zip(df[df.columns[0]], texts)
+        ]
 
-                comment = comments_dict.get((row_index + 2, col_index))
-                if comment:
-                    value = f"{value}. {comment}"
-                row_values[col_index] = value
+    columns = list(df.columns)
+    rows = df.astype(object).where(df.notna(), "").values.tolist()
+    return columns, rows
 
-            treeview.insert("", "end", values=row_values)
 
-    else:
-        for idx, col in enumerate(columns):
-            treeview.heading(col, text=col)
+def render_excel(table, frame, columns, rows):
+    treeview = ttk.Treeview(frame, columns=columns, show='headings', height=10)
 
-            if idx == 0:
-                treeview.column(col, width=100)
-            else:
-                treeview.column(col, width=100)
+    for idx, col in enumerate(columns):
+        treeview.heading(col, text=col)
 
-        for row_index, row in data.iterrows():
-            row_values = list(row)
+        if table == "table2" and idx == 0:
+            treeview.column(col, width=900)
+        elif table == "table2":
+            treeview.column(col, width=50)
+        else:
+            treeview.column(col, width=100)
 
-            for col_index, value in enumerate(row_values):
-                if pd.isna(value):
-                    value = ""
-                row_values[col_index] = value
-            treeview.insert("", "end", values=row_values)
+    for row_values in rows:
+        treeview.insert("", "end", values=row_values)
 
-    row_height = 20
     treeview.grid(row=2, column=0, padx=5, pady=5)
 
 
@@ -1281,23 +713,6 @@ def show_frame2(l_id, text):
 
 
 def show_other_frames(targetf, frame2, selected_id):
-    conn = get_connection("RelationMatrix")
-    conn.autocommit = True
-    cursor = conn.cursor()
-
-    query = "SELECT name FROM Lessons WHERE id = ?"
-    cursor.execute(query, (selected_id,))
-    result = cursor.fetchone()
-
-    if result:
-        lesson_name = result[0]  # 'name' sütunu ilk sırada olacaktır
-        print("Lesson Name:", lesson_name)
-    else:
-        print("Lesson not found for the selected_id:", selected_id)
-
-    cursor.close()
-    conn.close()
-
     if not hasattr(show_other_frames, "active_frames"):
         show_other_frames.active_frames = []
 
@@ -1378,7 +793,7 @@ def show_other_frames(targetf, frame2, selected_id):
         frame.place(x=100, y=400)
 
         show_button = Button(kri_frame, text="Tablo 1 Görüntüle", font=("Arial", 10),
-                             command=lambda: show_excel("table1", kri_frame, lesson_name))
+                             command=lambda: show_excel("table1", kri_frame, selected_id))
         show_button.grid(row=0, column=0, padx=5, pady=5)
 
         dk1_info = Label(frame, text="Ders ID'sini giriniz:", font=("Arial", 10))
@@ -1407,13 +822,17 @@ def show_other_frames(targetf, frame2, selected_id):
 
         save_button = Button(frame, text="Kaydet", font=("Arial", 10),
                              command=lambda: insert_relation_value(dk2_entry.get(), dk3_entry.get(), dk4_entry.get(),
-                                                                   dk1_entry.get()))
+                                                                   dk1_entry.get(), frame5))
         save_button.grid(row=5, column=0, padx=5, pady=5)
 
         create_button = Button(frame, text="Tablo 1 oluştur", font=("Arial", 10),
-                               command=lambda: create_table1())
+                               command=lambda: create_report_file(create_table1, selected_id, frame5))
         create_button.grid(row=5, column=1, padx=5, pady=5)
 
+        import_button = Button(frame, text="Excel'den Yükle", font=("Arial", 10),
+                               command=lambda: import_relation_workbook_file("table1"))
+        import_button.grid(row=6, column=0, padx=5, pady=5)
+
         frame5.pack(side=LEFT, fill=BOTH, expand=True, padx=5, pady=5)
 
     elif targetf == 6:
@@ -1471,29 +890,37 @@ def show_other_frames(targetf, frame2, selected_id):
             except ValueError as e:
                 messagebox.showerror("Hata", f"Geçerli bir sayı girin! Hata: {str(e)}")
 
-        def save_data1(criteria_data):
-
-            total = sum(int(entry[2].get() or 0) for entry in criteria_data)
-            if total != 100:
-                messagebox.showerror("Hata", f"Toplam ağırlık 100 olmalıdır! Şu anki toplam: {total}")
-                return
-
+        def write_criteria(data, lesson_ids):
+            # Arka planda çalışır; widget'lara dokunmaz
             conn = get_connection("RelationMatrix")
             conn.autocommit = True
             cursor = conn.cursor()
 
-            data = [(int(entry[0]), entry[1].get(), int(entry[2].get()))
-                    for entry in criteria_data if entry[1].get() and entry[2].get()]
-
             for lesson_id, criterion, weight in data:
                 cursor.execute('''
                             INSERT INTO EvaluationCriteria (LessonID, Criteria, Weight)
                             VALUES (?, ?, ?);
                         ''', lesson_id, criterion, weight)
+                record_change(cursor, lesson_id, "EvaluationCriteria")
 
-            create_table3()
+            create_table3(lesson_ids=lesson_ids)
             conn.close()
 
+        def save_data1(criteria_data):
+
+            total = sum(int(entry[2].get() or 0) for entry in criteria_data)
+            if total != 100:
+                messagebox.showerror("Hata", f"Toplam ağırlık 100 olmalıdır! Şu anki toplam: {total}")
+                return
+
+            # Giriş değerleri Tk thread'inde okunur, yazma ve Tablo 3 arka planda yapılır
+            data = [(int(entry[0]), entry[1].get(), int(entry[2].get()))
+                    for entry in criteria_data if entry[1].get() and entry[2].get()]
+
+            run_in_background(write_criteria, data, {int(entry[0]) for entry in criteria_data}, frame=frame7,
+                              on_success=lambda _: print("Evaluation criteria saved."),
+                              error_message="Bir hata oluştu. Kriterler kaydedilemedi.")
+
         dk_count = Label(kri_frame, text="Kaç Adet Değerlendirme Kriteri girilecek?.(Minimum 5 olmalı.)",
                          font=("Arial", 10))
         dk_count.grid(row=3, column=0, padx=5, pady=5)
@@ -1518,33 +945,37 @@ def show_other_frames(targetf, frame2, selected_id):
         no_entry = Entry(frame8, width=40, font=("Arial", 10))
         no_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        conn = get_connection("RelationMatrix")
-        conn.autocommit = True
-        cursor = conn.cursor()
+        def fetch_criteria(lesson_id):
+            conn = get_connection("RelationMatrix")
+            cursor = conn.cursor()
 
-        query = """
-                SELECT [Criteria]
-                FROM [RelationMatrix].[dbo].[EvaluationCriteria]
-                WHERE [LessonID] = ?
-            """
+            query = """
+                    SELECT [Criteria]
+                    FROM [RelationMatrix].[dbo].[EvaluationCriteria]
+                    WHERE [LessonID] = ?
+                """
 
-        cursor.execute(query, (selected_id,))
-        rows = cursor.fetchall()
+            cursor.execute(query, (lesson_id,))
+            rows = cursor.fetchall()
+            conn.close()
+            return [row.Criteria for row in rows]
 
-        criteria_list = [row.Criteria for row in rows]
-        entries = [no_entry.get(), selected_id]
+        def create_score_entries(criteria_list):
+            kriter_var_list = []
 
-        kriter_var_list = []
+            for idx, criteria in enumerate(criteria_list, start=2):
+                kriter_var = StringVar()
+                Label(frame8, text=f"{criteria}:", font=("Arial", 10)).grid(row=idx, column=0, sticky="e", padx=5, pady=5)
+                kriter_entry = Entry(frame8, textvariable=kriter_var, width=20, font=("Arial", 10))
+                kriter_entry.grid(row=idx, column=1, padx=5, pady=5)
+                kriter_var_list.append(kriter_var)
 
-        for idx, criteria in enumerate(criteria_list, start=2):
-            kriter_var = StringVar()
-            Label(frame8, text=f"{criteria}:", font=("Arial", 10)).grid(row=idx, column=0, sticky="e", padx=5, pady=5)
-            kriter_entry = Entry(frame8, textvariable=kriter_var, width=20, font=("Arial", 10))
-            kriter_entry.grid(row=idx, column=1, padx=5, pady=5)
-            kriter_var_list.append(kriter_var)
+            Button(frame8, text="Kaydet", command=lambda: save_data(no_entry, kriter_var_list, criteria_list, frame8)).grid(
+                row=len(criteria_list) + 2, column=1, padx=5, pady=5)
+            Button(frame8, text="Dosyadan Yükle", command=lambda: import_grade_file(selected_id)).grid(
+                row=len(criteria_list) + 2, column=0, padx=5, pady=5)
 
-        Button(frame8, text="Kaydet", command=lambda: save_data(no_entry, kriter_var_list, criteria_list, frame8)).grid(
-            row=len(criteria_list) + 2, column=1, padx=5, pady=5)
+        run_in_background(fetch_criteria, selected_id, frame=frame8, on_success=create_score_entries)
 
     elif targetf == 9:
         frame9 = Frame(frame2)
@@ -1559,7 +990,7 @@ def show_other_frames(targetf, frame2, selected_id):
         frame.place(x=100, y=400)
 
         show_button = Button(kri_frame, text="Tablo2 Görüntüle", font=("Arial", 10),
-                             command=lambda: show_excel("table2", kri_frame, lesson_name))
+                             command=lambda: show_excel("table2", kri_frame, selected_id))
         show_button.grid(row=0, column=0, padx=5, pady=5)
 
         dk1_info = Label(frame, text="Ders ID'sini giriniz:", font=("Arial", 10))
@@ -1588,29 +1019,27 @@ def show_other_frames(targetf, frame2, selected_id):
 
         save_button = Button(frame, text="Kaydet", font=("Arial", 10),
                              command=lambda: insert_evaluation_relation_value(dk2_entry.get(), dk3_entry.get(),
-                                                                              dk4_entry.get(), dk1_entry.get()))
+                                                                              dk4_entry.get(), dk1_entry.get(), frame9))
         save_button.grid(row=5, column=0, padx=5, pady=5)
 
         create_button = Button(frame, text="Tablo 2 Ekle", font=("Arial", 10),
-                               command=lambda: create_table2())
+                               command=lambda: create_report_file(create_table2, selected_id, frame9))
         create_button.grid(row=5, column=1, padx=5, pady=5)
 
-        frame9.pack(side=LEFT, fill=BOTH, expand=True, padx=5, pady=5)
+        import_button = Button(frame, text="Excel'den Yükle", font=("Arial", 10),
+                               command=lambda: import_relation_workbook_file("table2"))
+        import_button.grid(row=6, column=0, padx=5, pady=5)
 
-    def insert_evaluation_relation_value(course_outcome_id, criteria, relation_value, lesson_id):
-        conn = get_connection("RelationMatrix")
-        conn.autocommit = True
-        cursor = conn.cursor()
+        frame9.pack(side=LEFT, fill=BOTH, expand=True, padx=5, pady=5)
 
+    def insert_evaluation_relation_value(course_outcome_id, criteria, relation_value, lesson_id, frame):
         if not validate_input(relation_value):
             return
 
-        cursor.execute('''
-            INSERT INTO CourseEvaluationRelations (CourseOutcomeID, Criteria, RelationValue, LessonID)
-            VALUES (?, ?, ?, ?);
-        ''', course_outcome_id, criteria, relation_value, lesson_id)
-
-        conn.close()
+        run_in_background(save_relation_matrix, "CourseEvaluationRelations", lesson_id,
+                          {(course_outcome_id, criteria): relation_value}, frame=frame,
+                          on_success=lambda _: messagebox.showinfo("Kaydedildi", "İlişki değeri kaydedildi."),
+                          on_error=show_relation_error)
 
      
 
@@ -1629,46 +1058,73 @@ def show_other_frames(targetf, frame2, selected_id):
             messagebox.showerror("Hata", "Tüm kriterler için geçerli bir değer giriniz.")
             return
 
-        conn = get_connection("RelationMatrix")
-        cursor = conn.cursor()
-        conn.autocommit = True
-
-        # Prepare SQL query
-        columns = ["Student", "lesson_id"] + [f"[{c}]" for c in criteria_list]
-        columns_str = ', '.join(columns)
-        placeholders = ', '.join(['?'] * len(columns))
-
-        query = f"""
-            INSERT INTO Students ({columns_str})
-            VALUES ({placeholders})
-        """
-
-        try:
-            # Prepare parameters for SQL query
-            parameters = [student_no, lesson_id] + criteria_values
-
-            cursor.execute(query, parameters)
-
+        def on_saved(_):
             info_label = Label(frame8, text="Veriler başarıyla kaydedildi.", font=("Arial", 10))
             info_label.grid(row=len(criteria_list) + 3, column=1, padx=5, pady=5)
 
-
             for kriter_var in kriter_var_list:
                 kriter_var.set("")
             no_entry.delete(0, END)
 
-        except Exception as e:
+        def on_error(e):
             print("Hata:", e)
             info_label = Label(frame8, text="Bir hata oluştu. Veriler kaydedilemedi.", font=("Arial", 10), fg="red")
             info_label.grid(row=len(criteria_list) + 3, column=1, padx=5, pady=5)
 
+        run_in_background(write_student_scores, int(student_no), int(lesson_id),
+                          dict(zip(criteria_list, criteria_values)),
+                          frame=frame8, on_success=on_saved, on_error=on_error)
+
+    def write_student_scores(student_no, lesson_id, scores):
+        # Arka planda çalışır: öğrenci ve notları tek transaction içinde, kriter başına bir satır olarak yazılır
+        conn = get_connection("RelationMatrix")
+        conn.autocommit = False
+        cursor = conn.cursor()
+
+        try:
+            insert_student_scores(cursor, student_no, lesson_id, scores)
+            record_change(cursor, lesson_id, "Students")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         finally:
             conn.close()
 
-check_database()
-check_tables()
-create_table4()
-create_notes()
-create_table5()
+        # Notlar kaydedildi; yalnızca bu öğrencinin Tablo 4 / Tablo 5 satırları yenilenir.
+        # Başarısız olursa ders bir sonraki açılışta değişiklik kaydından yeniden üretilir.
+        try:
+            recompute_student(student_no, lesson_id)
+        except Exception as e:
+            print(f"Report rows for Student ID {student_no} could not be refreshed: {e}")
+
+    def import_grade_file(lesson_id):
+        # Başlık: öğrenci no, ardından dersin kriterleri; notlar 0-100
+        path = filedialog.askopenfilename(
+            title="Not Dosyası Seçiniz",
+            filetypes=[("Not dosyaları", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx")])
+        if not path:
+            return
+
+        def on_imported(result):
+            imported, rejected, report_path = result
+            message = f"{imported} öğrencinin notları yüklendi."
+            if rejected:
+                message += f"\n{rejected} satır reddedildi. Hata raporu:\n{report_path}"
+            messagebox.showinfo("Not Yükleme", message)
+
+        def on_error(e):
+            if isinstance(e, GradeImportError):
+                messagebox.showerror("Hata", f"Dosya yüklenemedi: {e}")
+            else:
+                print("Hata:", e)
+                messagebox.showerror("Hata", "Bir hata oluştu. Veriler kaydedilemedi.")
+
+        run_in_background(import_grades, path, lesson_id, frame=frame8, on_success=on_imported, on_error=on_error)
+
+# Değişen derslerin raporları pencere açıldıktan sonra veritabanı iş parçacığında yenilenir
+root.after(0, lambda: run_in_background(regenerate_changed_lessons, frame=frame1,
+                                        error_message="Bir hata oluştu. Raporlar güncellenemedi."))
 frame1.tkraise()
-root.mainloop()
\ No newline at end of file
+root.mainloop()
+db_worker.shutdown()
\ No newline at end of file